@@ -1,99 +1,424 @@
 import os
+import json
+import time
+import uuid
 import logging
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from werkzeug.utils import secure_filename
 from sender import WhatsAppBulkSender
-from utils.file_handler import allowed_file, validate_excel_file
+from campaigns import CampaignScheduler
+from driver_manager import DriverManager
+from job_store import JobStore, SENT, INVALID, FAILED, UNKNOWN, PENDING
+from recipient_loader import RecipientLoader, SUPPORTED_FORMATS, start_campaign_load
+from metrics import PROCESS_METRICS
+from log_buffer import LogBuffer
+from results_export import EXPORT_FORMATS, export_report
+from campaign_planner import plan_campaign
+from worker_process import SUPERVISOR
+from startup import STARTUP
+from config import CONFIG
+from utils.file_handler import allowed_file
 
 # Create blueprint
 api_bp = Blueprint('api', __name__)
 
-# Global sender instance
-sender = WhatsAppBulkSender()
+# Long-lived browser sessions shared by every campaign (started by the app)
+driver_manager = DriverManager() if CONFIG['warm_sessions'] else None
 
+# Durable campaign state so interrupted campaigns can be resumed
+job_store = JobStore()
+
+# Queues campaigns and runs each one on free sessions (started by the app)
+scheduler = CampaignScheduler(job_store, driver_manager)
+
+def _save_upload(file):
+    """Save an upload in a directory of its own, so concurrent campaigns don't overwrite each other
+
+    The file keeps its name, since attachments are sent to recipients under it.
+    """
+    filename = secure_filename(file.filename)
+    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], uuid.uuid4().hex)
+    os.makedirs(directory)
+    path = os.path.join(directory, filename)
+    file.save(path, buffer_size=CONFIG['upload_buffer_size'])
+    return filename, path
+
+def _remove_upload(path):
+    """Delete an upload saved by _save_upload along with its directory"""
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+def _parse_int(name, default=None):
+    """Read an optional integer form field, raising ValueError with a readable message"""
+    value = request.form.get(name, '')
+    if value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+@api_bp.route('/campaigns', methods=['POST'])
 @api_bp.route('/send', methods=['POST'])
 def send_messages():
-    """Start the message sending process"""
+    """Accept a new campaign and return its ID before the recipients file is parsed"""
     try:
-        # Check if process is already active
-        if sender.is_active:
-            return jsonify({'error': 'A sending process is already active'}), 400
-        
         # Check if files are present
         if 'recipientsFile' not in request.files:
             return jsonify({'error': 'Recipients file is required'}), 400
-        
+
         recipients_file = request.files['recipientsFile']
         attachment_file = request.files.get('attachmentFile')
-        
+
+        # Per-campaign pacing settings override the global defaults
+        try:
+            settings = WhatsAppBulkSender.parse_settings(request.form)
+            priority = _parse_int('priority', 0)
+            sessions = _parse_int('sessions')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if sessions is not None and sessions < 1:
+            return jsonify({'error': 'sessions must be at least 1'}), 400
+        if sessions is not None:
+            settings['sessions'] = sessions  # Stored with the campaign so a resume runs on as many sessions
+
         if recipients_file.filename == '':
             return jsonify({'error': 'No recipients file selected'}), 400
-        
+
         # Validate recipients file
-        if not allowed_file(recipients_file.filename, ['xlsx', 'xls']):
-            return jsonify({'error': 'Recipients file must be Excel format (.xlsx or .xls)'}), 400
-        
+        if not allowed_file(recipients_file.filename, SUPPORTED_FORMATS):
+            return jsonify({'error': 'Recipients file must be Excel, CSV or Parquet (.xlsx, .xls, .csv, .parquet)'}), 400
+
         # Save recipients file
         if not recipients_file.filename:
             return jsonify({'error': 'Recipients file name is invalid'}), 400
-        recipients_filename = secure_filename(recipients_file.filename)
-        recipients_path = os.path.join(current_app.config['UPLOAD_FOLDER'], recipients_filename)
-        recipients_file.save(recipients_path)
-        
-        # Validate Excel file structure
-        try:
-            recipients_df = sender.load_recipient_data(recipients_path)
-            if recipients_df.empty:
-                return jsonify({'error': 'Recipients file is empty or has no valid contacts'}), 400
-        except Exception as e:
-            return jsonify({'error': f'Invalid Excel file: {str(e)}'}), 400
-        
+        recipients_filename, recipients_path = _save_upload(recipients_file)
+
         # Handle attachment file
         attachment_path = None
         if attachment_file and attachment_file.filename != '':
             if not allowed_file(attachment_file.filename, ['pdf', 'jpg', 'jpeg', 'png', 'gif', 'doc', 'docx', 'txt']):
                 return jsonify({'error': 'Invalid attachment file format'}), 400
-            
+
             if not attachment_file.filename:
                 return jsonify({'error': 'Attachment file name is invalid'}), 400
-            attachment_filename = secure_filename(attachment_file.filename)
-            attachment_path = os.path.join(current_app.config['UPLOAD_FOLDER'], attachment_filename)
-            attachment_file.save(attachment_path)
-        
-        # Start processing
-        sender.process_recipients(recipients_df, attachment_path)
-        
+            _, attachment_path = _save_upload(attachment_file)
+
+        # ?dry_run=1 checks the file and estimates the run without storing or sending anything
+        if request.values.get('dry_run', '').lower() in ('1', 'true'):
+            try:
+                plan = plan_campaign(
+                    recipients_path, request.form.get('template', ''), settings, sessions,
+                    os.path.getsize(attachment_path) if attachment_path else 0, job_store
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            finally:
+                for path in (recipients_path, attachment_path):
+                    if path:
+                        _remove_upload(path)
+            return jsonify(plan), 200
+
+        # Parse the file off the request thread; the campaign is queued once its first chunk is stored
+        campaign_id = start_campaign_load(
+            recipients_path, job_store, lambda campaign_id: scheduler.submit(campaign_id, priority),
+            attachment_path, settings, recipients_filename, priority, request.form.get('template', '')
+        )
+
         return jsonify({
-            'message': 'Message sending process started successfully',
-            'total_recipients': len(recipients_df)
-        }), 200
-        
+            'message': 'Campaign accepted, loading recipients',
+            'campaign_id': campaign_id,
+            'status': 'loading'
+        }), 202
+
     except Exception as e:
         logging.error(f"Error starting send process: {str(e)}")
         return jsonify({'error': f'Failed to start sending process: {str(e)}'}), 500
 
+@api_bp.route('/templates/preview', methods=['POST'])
+def preview_template():
+    """Render a template against the first rows of a recipients file without storing anything"""
+    from message_template import MessageTemplate  # Pulls in pandas, so only when a preview is asked for
+    try:
+        if 'recipientsFile' not in request.files or request.files['recipientsFile'].filename == '':
+            return jsonify({'error': 'Recipients file is required'}), 400
+        recipients_file = request.files['recipientsFile']
+        if not allowed_file(recipients_file.filename, SUPPORTED_FORMATS):
+            return jsonify({'error': 'Recipients file must be Excel, CSV or Parquet (.xlsx, .xls, .csv, .parquet)'}), 400
+        limit = max(1, min(request.form.get('limit', 5, type=int), 50))
+
+        _, recipients_path = _save_upload(recipients_file)
+        try:
+            template = MessageTemplate(request.form.get('template', ''))
+            loader = RecipientLoader(recipients_path, chunk_size=limit)
+            missing = loader.select_fields(template.fields)
+            if missing:
+                loader.close()
+                return jsonify({'fields': template.fields, 'missing_fields': missing, 'rows': []}), 400
+            chunk = next(loader.chunks(), [])
+            loader.close()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        finally:
+            _remove_upload(recipients_path)
+
+        # Point out rows where a field is blank, since they render with a gap
+        blank = {field: sum(1 for record in chunk if not record[2 + i]) for i, field in enumerate(template.fields)}
+        return jsonify({
+            'fields': template.fields,
+            'missing_fields': [],
+            'blank_fields': {field: count for field, count in blank.items() if count},
+            'rows': [{'contact': contact, 'message': message} for contact, message in template.render_records(chunk)]
+        }), 200
+    except Exception as e:
+        logging.error(f"Error previewing template: {str(e)}")
+        return jsonify({'error': f'Failed to preview template: {str(e)}'}), 500
+
+@api_bp.route('/campaigns', methods=['GET'])
+def list_campaigns():
+    """List recent campaigns, optionally filtered by ?status="""
+    try:
+        campaigns = job_store.list_campaigns(request.args.get('status'), request.args.get('limit', 100, type=int))
+        return jsonify({'campaigns': campaigns}), 200
+    except Exception as e:
+        logging.error(f"Error listing campaigns: {str(e)}")
+        return jsonify({'error': 'Failed to list campaigns'}), 500
+
+@api_bp.route('/campaigns/<campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    """Get a stored campaign with per-status recipient counts"""
+    campaign = job_store.get_campaign(campaign_id)
+    if campaign is None:
+        return jsonify({'error': 'Campaign not found'}), 404
+    return jsonify(campaign), 200
+
+@api_bp.route('/campaigns/<campaign_id>/progress', methods=['GET'])
+def get_campaign_progress(campaign_id):
+    """Get a campaign's progress; ?since=<log_cursor> pages through its log records"""
+    try:
+        progress = scheduler.get_progress(campaign_id, *_log_page())
+        if progress is None:
+            return jsonify({'error': 'Campaign not found'}), 404
+        return jsonify(progress), 200
+    except Exception as e:
+        logging.error(f"Error getting progress: {str(e)}")
+        return jsonify({'error': 'Failed to get progress'}), 500
+
+@api_bp.route('/campaigns/<campaign_id>/timings', methods=['GET'])
+def get_campaign_timings(campaign_id):
+    """Per-step timing report for a campaign, live while it runs and from its saved report after"""
+    try:
+        runner = scheduler.get_runner(campaign_id)
+        path = os.path.join(CONFIG['log_spill_dir'], f"{secure_filename(campaign_id)}.timings.json")
+        if runner is not None and (runner.is_active or not os.path.exists(path)):
+            return jsonify(dict(runner.metrics.report(), campaign_id=campaign_id, status='running')), 200
+        if not os.path.exists(path):
+            return jsonify({'error': 'No timing report for this campaign'}), 404
+        with open(path, encoding='utf-8') as f:
+            return jsonify(json.load(f)), 200
+    except Exception as e:
+        logging.error(f"Error getting timings: {str(e)}")
+        return jsonify({'error': 'Failed to get timings'}), 500
+
+def _statuses(default=None, allowed=(SENT, INVALID, FAILED, UNKNOWN, PENDING)):
+    """Read a comma separated ?status= filter, raising ValueError for unknown statuses"""
+    value = request.values.get('status', '')
+    statuses = [status.strip() for status in value.split(',') if status.strip()] or default
+    unknown = sorted(set(statuses or []) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown status: {', '.join(unknown)} (expected {', '.join(allowed)})")
+    return statuses
+
+@api_bp.route('/campaigns/<campaign_id>/report', methods=['GET'])
+def export_campaign_report(campaign_id):
+    """Stream every recipient's outcome as CSV, XLSX or Parquet; ?status=failed,invalid narrows it"""
+    try:
+        if job_store.get_campaign(campaign_id) is None:
+            return jsonify({'error': 'Campaign not found'}), 404
+        file_format = request.args.get('format', 'csv').lower()
+        try:
+            statuses = _statuses()
+            body = export_report(job_store.iter_results(campaign_id, statuses), file_format)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        file_name = f"campaign_{secure_filename(campaign_id)}_report.{file_format}"
+        return Response(stream_with_context(body), mimetype=EXPORT_FORMATS[file_format],
+                        headers={'Content-Disposition': f'attachment; filename="{file_name}"'})
+    except Exception as e:
+        logging.error(f"Error exporting report: {str(e)}")
+        return jsonify({'error': 'Failed to export report'}), 500
+
+@api_bp.route('/campaigns/<campaign_id>/retry', methods=['POST'])
+def retry_campaign(campaign_id):
+    """Queue a new campaign with only the recipients that failed; ?status=failed,unknown widens it"""
+    try:
+        runner = scheduler.get_runner(campaign_id)
+        if runner is not None and runner.is_active:
+            return jsonify({'error': 'Campaign is still running'}), 400
+        try:
+            statuses = _statuses([FAILED], allowed=(FAILED, UNKNOWN, INVALID))
+            retry_id = job_store.create_retry_campaign(campaign_id, statuses)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if retry_id is None:
+            return jsonify({'error': f"No {' or '.join(statuses)} recipients to retry"}), 400
+        campaign = job_store.get_campaign(retry_id)
+        scheduler.submit(retry_id, campaign['priority'])
+        return jsonify({
+            'message': f"Retrying {campaign['total']} recipients",
+            'campaign_id': retry_id,
+            'status': 'queued',
+            'retry_of': campaign_id
+        }), 202
+    except KeyError:
+        return jsonify({'error': 'Campaign not found'}), 404
+    except Exception as e:
+        logging.error(f"Error retrying campaign {campaign_id}: {str(e)}")
+        return jsonify({'error': f'Failed to retry campaign: {str(e)}'}), 500
+
+@api_bp.route('/invalid-numbers', methods=['DELETE'])
+def forget_invalid_numbers():
+    """Let numbers cached as not on WhatsApp be sent to again, e.g. after they joined"""
+    contacts = (request.get_json(silent=True) or {}).get('contacts')
+    if not isinstance(contacts, list) or not contacts:
+        return jsonify({'error': 'Expected a JSON body with a non-empty contacts list'}), 400
+    try:
+        import pandas as pd
+        from phone_numbers import normalize_numbers
+        # Cached in the same normalized form the cleaner stores recipients in
+        raw = pd.Series([str(contact) for contact in contacts])
+        numbers, valid = normalize_numbers(raw)
+        forgotten = job_store.forget_invalid(numbers.where(valid, raw.str.strip()).unique().tolist())
+        return jsonify({'message': f"Forgot {forgotten} cached invalid numbers", 'forgotten': forgotten}), 200
+    except Exception as e:
+        logging.error(f"Error forgetting invalid numbers: {str(e)}")
+        return jsonify({'error': f'Failed to forget invalid numbers: {str(e)}'}), 500
+
+def _log_page():
+    """Read the ?since= log cursor and ?limit= page size for progress responses"""
+    since = request.args.get('since', type=int)
+    limit = request.args.get('limit', CONFIG['log_page_size'], type=int)
+    return since, max(1, min(limit, CONFIG['max_log_page_size']))
+
+def _campaign_action(action, campaign_id, done_message, error_message):
+    try:
+        if not action(campaign_id):
+            return jsonify({'error': error_message}), 400
+        return jsonify({'message': done_message, 'campaign_id': campaign_id}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError:
+        return jsonify({'error': 'Campaign not found'}), 404
+    except Exception as e:
+        logging.error(f"Error updating campaign {campaign_id}: {str(e)}")
+        return jsonify({'error': f'Failed to update campaign: {str(e)}'}), 500
+
+@api_bp.route('/campaigns/<campaign_id>/pause', methods=['POST'])
+def pause_campaign(campaign_id):
+    """Pause a queued or running campaign; resume picks up where it left off"""
+    return _campaign_action(scheduler.pause, campaign_id, 'Campaign paused', 'Campaign is not queued or running')
+
+@api_bp.route('/campaigns/<campaign_id>/cancel', methods=['POST'])
+def cancel_campaign(campaign_id):
+    """Cancel a queued or running campaign"""
+    return _campaign_action(scheduler.cancel, campaign_id, 'Campaign cancelled', 'Campaign is not queued or running')
+
+@api_bp.route('/campaigns/<campaign_id>/resume', methods=['POST'])
+def resume_campaign(campaign_id):
+    """Queue a paused, stopped or interrupted campaign to continue from its last checkpoint"""
+    return _campaign_action(scheduler.resume, campaign_id, 'Campaign resumed', 'Campaign cannot be resumed')
+
+def _sse(event, data, event_id=None):
+    """Format one Server-Sent Event"""
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _progress_stream(campaign_id=None):
+    """Stream counter changes and new log records; Last-Event-ID resumes after the last record seen"""
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since') or 0)
+    except ValueError:
+        since = 0
+    campaign_id = campaign_id or scheduler.latest_id
+
+    def generate(since):
+        yield f"retry: {CONFIG['stream_retry_ms']}\n\n"
+        last_progress = None
+        while True:
+            runner = scheduler.get_runner(campaign_id)
+            if runner is not None:
+                version, progress, new_logs = runner.get_changes(since)
+            else:
+                # Queued or finished before this process started: stored counts only
+                progress = scheduler.get_progress(campaign_id)
+                if progress is None:
+                    yield _sse('not_found', {'error': 'Campaign not found'})
+                    return
+                progress.pop('logs', None)
+                progress.pop('log_cursor', None)
+                new_logs = []
+
+            for record in new_logs:
+                yield _sse('log', record, record['seq'])
+                since = record['seq']
+            if progress != last_progress:
+                yield _sse('progress', progress, since)
+                last_progress = progress
+            if not progress['is_active']:
+                yield _sse('done', progress, since)
+                return
+
+            if runner is None:
+                time.sleep(CONFIG['stream_min_interval'] * 4)
+            elif runner.wait_for_change(version, CONFIG['stream_keepalive']) == version:
+                yield ": keepalive\n\n"
+            else:
+                time.sleep(CONFIG['stream_min_interval'])  # Coalesce bursts of updates into one push
+
+    return Response(
+        stream_with_context(generate(since)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api_bp.route('/campaigns/<campaign_id>/progress/stream', methods=['GET'])
+def stream_campaign_progress(campaign_id):
+    """Server-Sent Events progress stream for a campaign"""
+    return _progress_stream(campaign_id)
+
+# Single-campaign endpoints kept for the dashboard; they follow the most recent campaign
+
 @api_bp.route('/progress', methods=['GET'])
 def get_progress():
     """Get current progress status"""
     try:
-        progress = sender.get_progress()
+        progress = scheduler.get_progress(None, *_log_page())
         return jsonify(progress), 200
     except Exception as e:
         logging.error(f"Error getting progress: {str(e)}")
         return jsonify({'error': 'Failed to get progress'}), 500
 
+@api_bp.route('/progress/stream', methods=['GET'])
+def stream_progress():
+    """Server-Sent Events progress stream for the most recent campaign"""
+    return _progress_stream()
+
 @api_bp.route('/status', methods=['GET'])
 def get_status():
-    """Get final status after completion"""
+    """Get final status after completion; ?log_format=text returns logs as the old one-line strings"""
     try:
-        progress = sender.get_progress()
+        progress = scheduler.get_progress(None, *_log_page())
+        if request.args.get('log_format') == 'text':
+            progress['logs'] = [LogBuffer.format(record) for record in progress['logs']]
         return jsonify({
+            'campaign_id': progress['campaign_id'],
             'is_active': progress['is_active'],
             'completed': not progress['is_active'] and progress['total'] > 0,
             'total_processed': progress['current'],
             'success_count': progress['success_count'],
             'failure_count': progress['failure_count'],
-            'logs': progress['logs']
+            'logs': progress['logs'],
+            'log_cursor': progress['log_cursor']
         }), 200
     except Exception as e:
         logging.error(f"Error getting status: {str(e)}")
@@ -103,16 +428,31 @@ def get_status():
 def stop_process():
     """Stop the current sending process"""
     try:
-        sender.stop_process()
+        runner = scheduler.get_runner()
+        if runner is not None:
+            scheduler.stop(runner.campaign_id)
         return jsonify({'message': 'Sending process stopped'}), 200
     except Exception as e:
         logging.error(f"Error stopping process: {str(e)}")
         return jsonify({'error': 'Failed to stop process'}), 500
 
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Process-wide step timings, failures and throughput in Prometheus text format"""
+    active = sum(1 for runner in list(scheduler.runners.values()) if runner.is_active)
+    return Response(PROCESS_METRICS.prometheus(active), mimetype='text/plain; version=0.0.4')
+
+@api_bp.route('/startup', methods=['GET'])
+def get_startup():
+    """Cold start breakdown: setup phases, deferred imports, chromedriver resolution and first ready session"""
+    return jsonify(STARTUP.report()), 200
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'is_active': sender.is_active if sender else False
+        'is_active': scheduler.is_active(),
+        'sessions': driver_manager.get_status() if driver_manager else [],
+        'workers': SUPERVISOR.get_status() if CONFIG['session_isolation'] == 'process' else []
     }), 200
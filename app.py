@@ -1,14 +1,17 @@
 import os
 import logging
-from flask import Flask
-from flask_cors import CORS
-from werkzeug.middleware.proxy_fix import ProxyFix
+from startup import STARTUP
+
+with STARTUP.phase('import_flask'):
+    from flask import Flask
+    from flask_cors import CORS
+    from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
 # Create the app
-app = Flask(__name__, static_folder='dist/public', static_url_path='/')
+app = Flask(__name__, static_folder=None)  # The frontend is served by StaticFiles below
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
@@ -28,10 +31,32 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 # Create uploads directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Import and register API routes
-from api.routes import api_bp
+# Import and register API routes; pandas and Selenium are only imported once they are needed
+with STARTUP.phase('import_routes'):
+    from api.routes import api_bp, driver_manager, scheduler
+    from sender import session_configs
+    from static_files import StaticFiles
+    from config import CONFIG
 app.register_blueprint(api_bp, url_prefix='/api')
 
+# Start warm WhatsApp sessions and the campaign queue once for the lifetime of the app
+with STARTUP.phase('start_scheduler'):
+    if driver_manager is not None:
+        driver_manager.start(session_configs())  # Resolves chromedriver and logs in off the startup path
+    scheduler.start()
+
+# Index the built frontend once instead of checking the disk on every request
+with STARTUP.phase('index_static_files'):
+    static_files = StaticFiles()
+
+STARTUP.record('api_ready')
+logging.info(f"API ready {STARTUP.elapsed():.2f}s after process start ({STARTUP.report()['phases']})")
+
+# Warm the imports the first campaign needs while the API is idle
+if CONFIG['preload_modules']:
+    STARTUP.preload(['pandas', 'phone_numbers', 'message_template']
+                    + (['selenium_transport'] if CONFIG['transport'] == 'selenium' else []))
+
 # Serve React app for all non-API routes
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -44,13 +69,10 @@ def serve_react_app(path):
             response="API endpoint not found"
         )
     
-    # Serve static files if they exist
-    if path and app.static_folder and os.path.exists(os.path.join(app.static_folder, path)):
-        return app.send_static_file(path)
-    
-    # Serve index.html for all other routes (React routing)
-    if app.static_folder and os.path.exists(os.path.join(app.static_folder, 'index.html')):
-        return app.send_static_file('index.html')
+    # Serve built files, or index.html for all other routes (React routing)
+    response = static_files.serve(path)
+    if response is not None:
+        return response
     
     # Fallback if no static files exist yet
     return '''
@@ -76,4 +98,4 @@ def serve_react_app(path):
     '''
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
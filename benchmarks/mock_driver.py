@@ -0,0 +1,161 @@
+"""
+A WebDriver stand-in that plays WhatsApp Web's page states with configurable latencies.
+
+Only the calls SeleniumTransport makes are implemented. Every call costs one WebDriver
+round trip; chats, uploads and delivery ticks appear after their own delays, so the
+transport's real polling and probing code is what gets measured.
+"""
+
+import time
+import zlib
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.keys import Keys
+from locators import LOCATORS, PROBE_SCRIPT, NAVIGATE_SCRIPT
+from selenium_transport import SeleniumTransport, INSERT_TEXT_SCRIPT
+
+# Locator values back to their names, so find_element and probes can be answered by name
+LOCATOR_NAMES = {value: name for name, (_, value) in LOCATORS.items()}
+
+DEFAULT_LATENCIES = {
+    'roundtrip_ms': 2,       # Every WebDriver command
+    'page_load_ms': 1500,    # driver.get of web.whatsapp.com
+    'chat_load_ms': 800,     # Chat ready after a reload
+    'in_page_ms': 150,       # Chat ready after an in-page switch
+    'keystroke_ms': 0.5,     # Per character typed with send_keys
+    'upload_ms': 600,        # Attachment preview ready after choosing the file
+    'delivery_ms': 300,      # Double tick after the message is sent
+}
+
+
+class MockElement:
+    def __init__(self, driver, name):
+        self.driver = driver
+        self.name = name
+
+    def is_displayed(self):
+        self.driver.roundtrip()
+        return True
+
+    def is_enabled(self):
+        self.driver.roundtrip()
+        return True
+
+    def click(self):
+        self.driver.roundtrip()
+        if self.name == 'send_button':
+            self.driver.message_sent()
+
+    def send_keys(self, *values):
+        self.driver.roundtrip()
+        text = ''.join(values)
+        self.driver.pause(self.driver.latencies['keystroke_ms'] * len(text))
+        if self.name == 'file_input':
+            self.driver.upload_ready_at = time.monotonic() + self.driver.latencies['upload_ms'] / 1000
+        elif text == Keys.ENTER:
+            self.driver.message_sent()
+
+
+class MockWebDriver:
+    """Answers SeleniumTransport's WebDriver calls from a simulated WhatsApp Web page"""
+
+    def __init__(self, latencies=None, invalid_rate=0.0):
+        self.latencies = dict(DEFAULT_LATENCIES, **(latencies or {}))
+        self.invalid_rate = invalid_rate
+        self.loaded_at = None
+        self.chat_ready_at = None
+        self.chat_invalid = False
+        self.upload_ready_at = None
+        self.delivered_at = None
+        self.commands = 0
+        self.sent = 0
+
+    def pause(self, ms):
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def roundtrip(self):
+        self.commands += 1
+        self.pause(self.latencies['roundtrip_ms'])
+
+    def _is_invalid(self, phone):
+        return zlib.crc32(phone.encode()) % 1000 < self.invalid_rate * 1000
+
+    def _open(self, phone, delay_ms):
+        self.chat_ready_at = time.monotonic() + delay_ms / 1000
+        self.chat_invalid = self._is_invalid(phone)
+        self.upload_ready_at = None
+
+    def message_sent(self):
+        self.sent += 1
+        self.upload_ready_at = None
+        self.delivered_at = time.monotonic() + self.latencies['delivery_ms'] / 1000
+
+    def present(self, name):
+        now = time.monotonic()
+        loaded = self.loaded_at is not None and now >= self.loaded_at
+        chat = loaded and self.chat_ready_at is not None
+        ready = chat and now >= self.chat_ready_at
+        if name == 'chat_list':
+            return loaded
+        if name in ('chat_panel', 'composer'):
+            return chat and not (ready and self.chat_invalid)
+        if name == 'invalid_number':
+            return ready and self.chat_invalid
+        if name in ('fresh_composer', 'attach_button', 'file_input'):
+            return ready and not self.chat_invalid
+        if name in ('send_button', 'caption_box'):
+            return self.upload_ready_at is not None and now >= self.upload_ready_at
+        if name == 'delivered':
+            return self.delivered_at is not None and now >= self.delivered_at
+        return False
+
+    def get(self, url):
+        self.roundtrip()
+        self.pause(self.latencies['page_load_ms'])
+        self.loaded_at = time.monotonic()
+        self.chat_ready_at = None
+        if 'phone=' in url:
+            self._open(url.split('phone=', 1)[1], self.latencies['chat_load_ms'])
+
+    def execute_script(self, script, *args):
+        self.roundtrip()
+        if script == PROBE_SCRIPT:
+            for state, _, value in args[0]:
+                if self.present(LOCATOR_NAMES[value]):
+                    return state
+            return None
+        if script == NAVIGATE_SCRIPT:
+            if not self.present('chat_list'):
+                return False
+            self._open(args[0], self.latencies['in_page_ms'])
+            return True
+        if script == INSERT_TEXT_SCRIPT:
+            return 'paste'
+        return None
+
+    def find_element(self, by, value):
+        self.roundtrip()
+        name = LOCATOR_NAMES.get(value)
+        if name is None or not self.present(name):
+            raise NoSuchElementException(value)
+        return MockElement(self, name)
+
+    def find_elements(self, by, value):
+        try:
+            return [self.find_element(by, value)]
+        except NoSuchElementException:
+            return []
+
+    def quit(self):
+        self.loaded_at = None
+
+
+class MockSeleniumTransport(SeleniumTransport):
+    """SeleniumTransport running against MockWebDriver instead of Chrome"""
+
+    latencies = None
+    invalid_rate = 0.0
+
+    def start(self):
+        self.driver = MockWebDriver(self.latencies, self.invalid_rate)
+        return True
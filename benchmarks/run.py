@@ -0,0 +1,258 @@
+"""
+Benchmarks for the sender pipeline and API, with results comparable against a saved baseline.
+
+    python benchmarks/run.py                              # everything, table output
+    python benchmarks/run.py loading --rows 1000 100000   # one group
+    python benchmarks/run.py --save benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --tolerance 0.2
+
+Groups:
+  loading   RecipientLoader + RecipientCleaner over generated CSV/XLSX files, and dry-run planning
+  progress  get_progress() and /api/progress serialization with large log buffers
+  campaign  End-to-end throughput of SeleniumTransport against a mocked WebDriver
+
+Each result is {name, value, unit, better}; --json prints them one per line. With
+--baseline, results more than --tolerance worse than the baseline are reported and the
+exit status is 1.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('JOB_STORE_PATH', os.path.join(tempfile.gettempdir(), 'benchmark_jobs.db'))
+os.environ.setdefault('LOG_SPILL_DIR', os.path.join(tempfile.gettempdir(), 'benchmark_logs'))
+os.environ.setdefault('WARM_SESSIONS', '0')  # The progress group imports the app, which would start real browsers
+
+from config import CONFIG
+
+
+def result(name, value, unit, better='lower'):
+    return {'name': name, 'value': round(value, 6), 'unit': unit, 'better': better}
+
+
+def best_of(repeat, fn):
+    """Fastest of repeat runs of fn(), in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def write_recipients(path, rows):
+    """A recipients file with messy numbers, some duplicates and a template column"""
+    numbers = ['98{:08d}', '+91 98{:08d}', '098{:08d}', '0091-98{:08d}']
+    if path.endswith('.csv'):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('Phone,Name,Message\n')
+            for i in range(rows):
+                f.write(f"{numbers[i % 4].format(i % (rows - rows // 50))},Name {i},Hello there\n")
+    else:
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(['Phone', 'Name', 'Message'])
+        for i in range(rows):
+            sheet.append([numbers[i % 4].format(i % (rows - rows // 50)), f'Name {i}', 'Hello there'])
+        workbook.save(path)
+
+
+def bench_loading(args):
+    from recipient_loader import RecipientLoader, prepared_chunks
+    from phone_numbers import RecipientCleaner
+    from message_template import MessageTemplate
+    from campaign_planner import plan_campaign
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            formats = ['csv'] + (['xlsx'] if rows <= args.max_xlsx_rows else [])
+            for file_format in formats:
+                path = os.path.join(directory, f'recipients_{rows}.{file_format}')
+                write_recipients(path, rows)
+                for templated in (False, True):
+                    def load():
+                        template = MessageTemplate('Hi {{Name}}, order {{Phone}}') if templated else None
+                        loader = RecipientLoader(path)
+                        if template is not None:
+                            loader.select_fields(template.fields)
+                        for _ in prepared_chunks(loader, RecipientCleaner(), template):
+                            pass
+                    seconds = best_of(args.repeat, load)
+                    name = f"loading.{file_format}{'.template' if templated else ''}.{rows}"
+                    results.append(result(f'{name}.seconds', seconds, 's'))
+                    results.append(result(f'{name}.rows_per_second', rows / seconds, 'rows/s', 'higher'))
+                # The /api/send?dry_run=1 pipeline, which should stay under a second at 100k rows
+                seconds = best_of(args.repeat, lambda: plan_campaign(path, 'Hi {{Name}}, order {{Phone}}'))
+                name = 'loading.dry_run' if file_format == 'csv' else f'loading.dry_run.{file_format}'
+                results.append(result(f'{name}.{rows}.seconds', seconds, 's'))
+    return results
+
+
+def bench_progress(args):
+    from sender import WhatsAppBulkSender
+    from log_buffer import LogBuffer
+    from app import app
+    from api.routes import scheduler, job_store
+
+    results = []
+    client = app.test_client()
+    for size in args.log_sizes:
+        runner = WhatsAppBulkSender()
+        runner.campaign_id = job_store.create_campaign([('919800000000', 'benchmark')], None, None, 'benchmark')
+        runner.logs = LogBuffer(size)
+        for i in range(size):
+            runner.logs.append(f"✅ Message sent successfully to 98{i:08d}", 'success', f'98{i:08d}', 'sent', 'session-1')
+        runner.thread = object()  # Looks dispatched, so the scheduler reports it as is
+        scheduler.runners[runner.campaign_id] = runner
+        scheduler.latest_id = runner.campaign_id
+
+        for limit in (CONFIG['log_page_size'], CONFIG['max_log_page_size']):
+            seconds = best_of(args.repeat, lambda: json.dumps(runner.get_progress(None, limit)))
+            results.append(result(f'progress.get_progress.logs{size}.limit{limit}.seconds', seconds, 's'))
+            seconds = best_of(args.repeat, lambda: runner.get_progress(0, limit))
+            results.append(result(f'progress.since.logs{size}.limit{limit}.seconds', seconds, 's'))
+            seconds = best_of(args.repeat, lambda: client.get(f'/api/progress?limit={limit}').get_data())
+            results.append(result(f'progress.api.logs{size}.limit{limit}.seconds', seconds, 's'))
+        scheduler.runners.pop(runner.campaign_id, None)
+    return results
+
+
+def bench_campaign(args):
+    import pandas as pd
+    import sender
+    from mock_driver import MockSeleniumTransport
+
+    latencies = {key: getattr(args, key) for key in ('roundtrip_ms', 'page_load_ms', 'chat_load_ms', 'in_page_ms',
+                                                       'upload_ms', 'delivery_ms')}
+    MockSeleniumTransport.latencies = latencies
+    MockSeleniumTransport.invalid_rate = args.invalid_rate
+    original = sender.create_transport
+    sender.create_transport = lambda config, log=None: MockSeleniumTransport(config, log)
+
+    results = []
+    attachment = None
+    try:
+        if args.attachment:
+            attachment = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+            attachment.write(b'%PDF-1.4\n' + b'0' * 1024)
+            attachment.close()
+        for navigation in args.navigation:
+            runner = sender.WhatsAppBulkSender()
+            recipients = pd.DataFrame({
+                'Contact': [f'9198{i:08d}' for i in range(args.recipients)],
+                'Message': [f'Hello {i}\nThis is a benchmark message' for i in range(args.recipients)]
+            })
+            settings = {
+                'messages_per_hour': 0, 'pacing_jitter': 0, 'retry_delay': 0, 'delivery_timeout': 1,
+                'navigation_mode': navigation, 'profiles': [f'bench-{i + 1}' for i in range(args.sessions)]
+            }
+            started = time.perf_counter()
+            runner.process_recipients(recipients, attachment.name if attachment else None, settings)
+            runner.thread.join()
+            seconds = time.perf_counter() - started
+
+            name = f"campaign.{navigation}.{args.sessions}sessions"
+            results.append(result(f'{name}.seconds', seconds, 's'))
+            results.append(result(f'{name}.messages_per_hour', runner.success_count * 3600 / seconds, 'msg/h', 'higher'))
+            results.append(result(f'{name}.failures', runner.failure_count, 'count'))
+            for step, timing in runner.metrics.report()['steps'].items():
+                if 'p50' in timing:
+                    results.append(result(f'{name}.{step}.p50', timing['p50'], 's'))
+                    results.append(result(f'{name}.{step}.p95', timing['p95'], 's'))
+    finally:
+        sender.create_transport = original
+        if attachment is not None:
+            os.unlink(attachment.name)
+    return results
+
+
+BENCHMARKS = {'loading': bench_loading, 'progress': bench_progress, 'campaign': bench_campaign}
+
+
+def compare(results, baseline, tolerance):
+    """Print each result next to its baseline; returns the names that regressed beyond tolerance"""
+    previous = {entry['name']: entry for entry in baseline}
+    regressions = []
+    print(f"{'benchmark':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for entry in results:
+        base = previous.get(entry['name'])
+        if base is None or not base['value']:
+            print(f"{entry['name']:<60} {'-':>12} {entry['value']:>12.4g}")
+            continue
+        change = (entry['value'] - base['value']) / base['value']
+        worse = change > tolerance if entry['better'] == 'lower' else change < -tolerance
+        if worse:
+            regressions.append(entry['name'])
+        print(f"{entry['name']:<60} {base['value']:>12.4g} {entry['value']:>12.4g} {change:>+7.0%}{' !' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the sender pipeline and API')
+    parser.add_argument('groups', nargs='*', help=f"benchmark groups to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print one JSON result per line')
+    parser.add_argument('--save', help='write results to this file as the new baseline')
+    parser.add_argument('--baseline', help='compare against results saved with --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a result counts as a regression')
+
+    loading = parser.add_argument_group('loading')
+    loading.add_argument('--rows', type=int, nargs='+', default=[1000, 100000, 1000000])
+    loading.add_argument('--max-xlsx-rows', type=int, default=100000, help='larger sizes are only generated as CSV')
+
+    progress = parser.add_argument_group('progress')
+    progress.add_argument('--log-sizes', type=int, nargs='+', default=[500, 10000, 100000])
+
+    campaign = parser.add_argument_group('campaign')
+    campaign.add_argument('--recipients', type=int, default=50)
+    campaign.add_argument('--sessions', type=int, default=1)
+    campaign.add_argument('--navigation', nargs='+', default=['in_page', 'reload'], choices=['in_page', 'reload'])
+    campaign.add_argument('--attachment', action='store_true', help='send a small PDF with every message')
+    campaign.add_argument('--invalid-rate', type=float, default=0.02)
+    campaign.add_argument('--roundtrip-ms', type=float, default=2)
+    campaign.add_argument('--page-load-ms', type=float, default=1500)
+    campaign.add_argument('--chat-load-ms', type=float, default=800)
+    campaign.add_argument('--in-page-ms', type=float, default=150)
+    campaign.add_argument('--upload-ms', type=float, default=600)
+    campaign.add_argument('--delivery-ms', type=float, default=300)
+    args = parser.parse_args()
+    unknown = set(args.groups) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark group(s): {', '.join(sorted(unknown))}")
+    logging.disable(logging.WARNING)  # Per-message logs would dominate the timings
+
+    results = []
+    for group in args.groups or list(BENCHMARKS):
+        group_results = BENCHMARKS[group](args)
+        results += group_results
+        if args.json:
+            for entry in group_results:
+                print(json.dumps(entry))
+            sys.stdout.flush()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+    elif not args.json:
+        for entry in results:
+            print(f"{entry['name']:<60} {entry['value']:>12.4g} {entry['unit']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-message text entry time: one-call bulk insertion vs typing with send_keys.
+
+Drives SeleniumTransport.send_text against a local contenteditable composer in
+headless Chrome, so no WhatsApp login is needed:
+
+    python benchmarks/text_entry.py --lengths 50 200 500 1000 2000 --repeat 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from config import CONFIG
+from transport import resolve_chromedriver_path
+from selenium_transport import SeleniumTransport
+
+# Minimal stand-in for the chat composer: Enter "sends" by clearing the box
+COMPOSER_PAGE = """data:text/html;charset=utf-8,
+<div role="textbox" contenteditable="true" style="white-space: pre-wrap" id="box"></div>
+<script>
+document.getElementById('box').addEventListener('keydown', e => {
+  if (e.key === 'Enter' && !e.shiftKey) { e.preventDefault(); e.target.textContent = ''; }
+});
+</script>
+"""
+
+
+def make_message(length, line_length=60):
+    """A multi-line message of exactly length characters"""
+    words = ('Hello there, this is a reminder about your upcoming appointment. ' * (length // 40 + 2))
+    lines = [words[i:i + line_length - 1] for i in range(0, length, line_length)]
+    return '\n'.join(lines)[:length]
+
+
+def time_send(transport, message, mode, repeat):
+    transport.config = dict(transport.config, text_input_mode=mode)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        transport.send_text(message)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk text insertion against send_keys typing')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[50, 200, 500, 1000, 2000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print one JSON object per length')
+    args = parser.parse_args()
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    driver = webdriver.Chrome(service=Service(resolve_chromedriver_path(CONFIG)), options=options)
+    try:
+        driver.get(COMPOSER_PAGE)
+        transport = SeleniumTransport(dict(CONFIG))
+        transport.driver = driver
+
+        if not args.json:
+            print(f"{'chars':>6} {'keys (s)':>10} {'paste (s)':>10} {'saved (s)':>10} {'speedup':>8}")
+        for length in args.lengths:
+            message = make_message(length)
+            keys = time_send(transport, message, 'keys', args.repeat)
+            paste = time_send(transport, message, 'paste', args.repeat)
+            result = {
+                'chars': length, 'keys_s': round(keys, 4), 'paste_s': round(paste, 4),
+                'saved_s': round(keys - paste, 4), 'speedup': round(keys / paste, 1) if paste else None
+            }
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{length:>6} {keys:>10.3f} {paste:>10.3f} {keys - paste:>10.3f} {result['speedup']:>7}x")
+    finally:
+        driver.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import os
+import json
+import glob
+import time
+from config import CONFIG
+from metrics import PROCESS_METRICS
+from job_store import PENDING, INVALID, FAILED
+from recipient_loader import open_recipients
+
+# Mean seconds per step assumed until real sends have been timed
+DEFAULT_STEP_SECONDS = {
+    'driver_start': 8.0,
+    'login': 10.0,
+    'open_chat': 4.0,
+    'text': 1.0,
+    'attachment': 6.0,
+}
+
+# Finished campaigns whose outcomes feed the failure and invalid rate estimates
+HISTORY_CAMPAIGNS = 5
+
+
+def step_latencies():
+    """Mean seconds per step from this process's metrics, else from the newest saved timing report
+
+    Returns (source, {step: seconds}) where source is 'live', a report file name, or 'defaults'.
+    """
+    steps = PROCESS_METRICS.report()['steps']
+    source = 'live'
+    if not steps.get('open_chat', {}).get('count'):
+        reports = glob.glob(os.path.join(CONFIG['log_spill_dir'], '*.timings.json'))
+        steps, source = {}, 'defaults'
+        if reports:
+            newest = max(reports, key=os.path.getmtime)
+            try:
+                with open(newest, encoding='utf-8') as f:
+                    steps = json.load(f).get('steps', {})
+                source = os.path.basename(newest)
+            except (OSError, ValueError):
+                pass
+    means = {step: timing['mean_seconds'] for step, timing in steps.items() if timing.get('mean_seconds') is not None}
+    return source, dict(DEFAULT_STEP_SECONDS, **means)
+
+
+def estimate(to_send, settings=None, sessions=None, attachment_size=0, job_store=None):
+    """ETA and expected outcomes for to_send recipients from pacing settings and recorded latencies"""
+    config = dict(CONFIG, **(settings or {}))
+    sessions = max(1, sessions or len(config['profiles']) or 1)
+    source, steps = step_latencies()
+
+    # Outcome rates of recipients recent campaigns actually tried
+    history = job_store.outcome_history(HISTORY_CAMPAIGNS) if job_store is not None else {}
+    tried = sum(count for count, _ in history.values())
+    invalid_rate = history.get(INVALID, (0, 0))[0] / tried if tried else 0.0
+    failure_rate = history.get(FAILED, (0, 0))[0] / tried if tried else 0.0
+    attempts = sum(attempts for _, attempts in history.values()) / tried if tried else 1.0
+
+    # One attempt costs the chat switch plus the attachment (captioned) or the text
+    service = steps['open_chat'] + (steps['attachment'] if attachment_size else steps['text'])
+    backoff = steps.get('retry_backoff', config['retry_delay'])
+
+    def seconds(messages_per_hour, attempts_per_recipient):
+        interval = 3600.0 / messages_per_hour if messages_per_hour > 0 else 0.0
+        per_recipient = (attempts_per_recipient * max(interval, service)
+                         + (attempts_per_recipient - 1) * backoff)
+        return to_send * per_recipient / sessions
+
+    startup = 0.0 if config['warm_sessions'] else steps['driver_start'] + steps['login']
+    eta = startup + seconds(config['messages_per_hour'], attempts)
+    best = startup + seconds(max(config['max_messages_per_hour'], config['messages_per_hour']), 1.0)
+    return {
+        'sessions': sessions,
+        'messages_per_hour': config['messages_per_hour'],
+        'seconds_per_attempt': round(service, 2),
+        'attempts_per_recipient': round(attempts, 2),
+        'eta_seconds': round(eta),
+        'eta_best_seconds': round(best),
+        'expected_sent': round(to_send * max(0.0, 1 - invalid_rate - failure_rate)),
+        'expected_invalid': round(to_send * invalid_rate),
+        'expected_failed': round(to_send * failure_rate),
+        'latency_source': source,
+        'history_recipients': tried
+    }
+
+
+def plan_campaign(path, template_text='', settings=None, sessions=None, attachment_size=0, job_store=None,
+                  preview_rows=None):
+    """Run a recipients file through loading, templating and cleaning without storing or sending anything
+
+    Returns counts, template gaps, the first preview_rows rendered rows and problem rows, and an estimate.
+    Raises ValueError for a file or template that a real campaign would also reject.
+    """
+    from phone_numbers import RecipientCleaner, INVALID_FORMAT, KNOWN_INVALID
+    started = time.perf_counter()
+    preview_rows = preview_rows or CONFIG['dry_run_preview_rows']
+    loader, template = open_recipients(path, template_text, CONFIG['dry_run_chunk_size'])
+    cleaner = RecipientCleaner(job_store)
+    fields = template.fields if template is not None else []
+    blank = dict.fromkeys(fields, 0)
+    to_send = empty_messages = 0
+    preview, problems = [], []
+    try:
+        for chunk in loader.chunks():
+            if template is not None:
+                for i, field in enumerate(fields):
+                    blank[field] += sum(1 for record in chunk if not record[2 + i])
+                chunk = template.render_records(chunk)
+            for contact, message, status, error in cleaner.clean(chunk):
+                if status == PENDING:
+                    to_send += 1
+                    if not message and not attachment_size:
+                        empty_messages += 1
+                        error = 'empty_message'
+                row = {'contact': contact, 'message': message, 'status': status, 'error': error}
+                if len(preview) < preview_rows:
+                    preview.append(row)
+                if error and len(problems) < preview_rows:
+                    problems.append(row)
+    finally:
+        loader.close()
+    if not loader.loaded:
+        raise ValueError("Recipients file is empty or has no valid contacts")
+
+    return {
+        'dry_run': True,
+        'rows': loader.loaded,
+        'duplicates': cleaner.duplicates,
+        INVALID_FORMAT: cleaner.invalid,
+        KNOWN_INVALID: cleaner.known_invalid,
+        'to_send': to_send,
+        'empty_messages': empty_messages,
+        'fields': fields,
+        'blank_fields': {field: count for field, count in blank.items() if count},
+        'preview': preview,
+        'problems': problems,
+        'estimate': estimate(to_send, settings, sessions, attachment_size, job_store),
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
@@ -0,0 +1,243 @@
+import time
+import heapq
+import logging
+import itertools
+import threading
+from config import CONFIG
+from sender import WhatsAppBulkSender
+from send_windows import SendSchedule
+from job_store import LOAD_INTERRUPTED, LOAD_FAILED
+
+# Campaign statuses a campaign can be (re)queued from
+RESUMABLE_STATUSES = ('paused', 'stopped', 'failed', 'running')
+
+# Timer actions: put a scheduled campaign back in the queue, or pause a running one at its window's end
+WAKE = 'wake'
+CLOSE = 'close'
+
+
+class CampaignScheduler:
+    """Queues campaigns and dispatches them to free sessions in priority order"""
+
+    def __init__(self, job_store, driver_manager=None, config=CONFIG, max_finished=20):
+        self.job_store = job_store
+        self.driver_manager = driver_manager
+        self.config = config
+        self.profiles = config.get('profiles') or [config.get('profile_name', 'Default')]
+        self.free_profiles = list(self.profiles)
+        self.queue = []
+        self.timers = []            # (epoch seconds, sequence, action, campaign_id, runner) heap
+        self.sequence = itertools.count()
+        self.runners = {}
+        self.finished = []
+        self.max_finished = max_finished
+        self.latest_id = None
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        """Re-queue campaigns left queued by a previous run, re-arm scheduled ones and start dispatching"""
+        if self.thread is not None:
+            return
+        for campaign in reversed(self.job_store.list_campaigns(status='queued', limit=1000)):
+            self.submit(campaign['id'], campaign['priority'])
+        with self.condition:
+            for campaign in self.job_store.list_campaigns(status='scheduled', limit=1000):
+                self._add_timer(campaign['next_run_at'] or 0, WAKE, campaign['id'])
+        self.thread = threading.Thread(target=self._dispatch_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, campaign_id, priority=0):
+        """Queue a stored campaign; higher priority runs first, then first come first served"""
+        with self.condition:
+            heapq.heappush(self.queue, (-priority, next(self.sequence), campaign_id))
+            if self.latest_id is None or not self.is_active():
+                self.latest_id = campaign_id
+            self.condition.notify()
+
+    def _add_timer(self, at, action, campaign_id, runner=None):
+        """Fire action for a campaign at epoch seconds at; caller holds the condition"""
+        heapq.heappush(self.timers, (at, next(self.sequence), action, campaign_id, runner))
+        self.condition.notify()
+
+    def _fire_timers(self):
+        """Run due timers; returns seconds until the next one, or None. Caller holds the condition"""
+        while self.timers:
+            at, _, action, campaign_id, runner = self.timers[0]
+            delay = at - time.time()
+            if delay > 0:
+                return delay
+            heapq.heappop(self.timers)
+            try:
+                if action == WAKE:
+                    self._wake(campaign_id, at)
+                elif runner is self.runners.get(campaign_id) and runner.is_active and not runner.cancel.cancelled:
+                    runner.add_log("Send window closed, pausing until it opens again", event='window_closed')
+                    runner.stop_process('scheduled')
+            except Exception as e:
+                logging.error(f"Scheduled {action} of campaign {campaign_id} failed: {str(e)}")
+        return None
+
+    def _wake(self, campaign_id, at):
+        """Queue a scheduled campaign whose time has come, unless it was rescheduled or cancelled since"""
+        campaign = self.job_store.get_campaign(campaign_id)
+        if campaign is None or campaign['status'] != 'scheduled' or (campaign['next_run_at'] or 0) > at:
+            return
+        if self.job_store.set_campaign_status(campaign_id, 'queued', expected='scheduled'):
+            heapq.heappush(self.queue, (-campaign['priority'], next(self.sequence), campaign_id))
+
+    def _defer(self, campaign_id, run_at, expected=None):
+        """Park a campaign until run_at and wake it then, if it is still in status expected; caller holds the condition"""
+        if not self.job_store.schedule_campaign(campaign_id, run_at, expected):
+            return
+        self._add_timer(run_at, WAKE, campaign_id)
+        logging.info(f"Campaign {campaign_id} scheduled for {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run_at))}")
+
+    def _dispatch_loop(self):
+        while True:
+            with self.condition:
+                # Sleep until a campaign can run or the next timer is due, never polling
+                delay = self._fire_timers()
+                while not (self.queue and self.free_profiles):
+                    self.condition.wait(delay)
+                    delay = self._fire_timers()
+                _, _, campaign_id = heapq.heappop(self.queue)
+                campaign = self.job_store.get_campaign(campaign_id)
+                if campaign is None or campaign['status'] != 'queued':
+                    continue  # Cancelled or paused while waiting
+                schedule = SendSchedule.from_config(dict(self.config, **campaign['settings']))
+                run_at = schedule.next_open()
+                if run_at > time.time():
+                    self._defer(campaign_id, run_at, expected='queued')  # Before its start time or outside its window
+                    continue
+                # Claim it before taking sessions, so a duplicate queue entry or another scheduler on the
+                # same job store can't dispatch it twice
+                if not self.job_store.set_campaign_status(campaign_id, 'running', expected='queued'):
+                    continue
+                # Sessions asked for at submission are kept in the campaign's settings, so resumes get them too
+                requested = campaign['settings'].get('sessions') or len(self.free_profiles)
+                profiles = self.free_profiles[:requested]
+                self.free_profiles = self.free_profiles[requested:]
+                runner = WhatsAppBulkSender(self.driver_manager, self.job_store)
+                self.runners[campaign_id] = runner
+                self.latest_id = campaign_id
+                close_at = schedule.window_close()
+                if close_at is not None:
+                    self._add_timer(close_at, CLOSE, campaign_id, runner)
+            try:
+                runner.resume_campaign(campaign_id, profiles, self._on_finish)
+            except Exception as e:
+                logging.error(f"Failed to start campaign {campaign_id}: {str(e)}")
+                self.job_store.set_campaign_status(campaign_id, 'failed')
+                runner.profiles = profiles
+                self._on_finish(runner, 'failed')
+
+    def _on_finish(self, runner, status):
+        """Give the runner's profiles back, reschedule it if a window or cap paused it, and keep its logs a while
+
+        Sessions only release their browsers, so warm ones stay logged in for the next window.
+        """
+        with self.condition:
+            self.free_profiles.extend(runner.profiles or [])
+            if status == 'scheduled':
+                schedule = SendSchedule.from_config(runner.config)
+                self._defer(runner.campaign_id, schedule.next_open(cap_reached=runner.cap_reached))
+            if runner.campaign_id in self.finished:
+                self.finished.remove(runner.campaign_id)
+            self.finished.append(runner.campaign_id)
+            while len(self.finished) > self.max_finished:
+                campaign_id = self.finished.pop(0)
+                if not self.runners[campaign_id].is_active:
+                    self.runners.pop(campaign_id, None)
+            self.condition.notify()
+
+    def is_active(self):
+        return any(runner.is_active for runner in list(self.runners.values()))
+
+    def get_runner(self, campaign_id=None):
+        """Runner for a campaign, or for the most recently dispatched one"""
+        return self.runners.get(campaign_id or self.latest_id)
+
+    def get_progress(self, campaign_id=None, since=None, limit=None):
+        """Live progress for a running campaign, or stored counts for an idle one"""
+        campaign_id = campaign_id or self.latest_id
+        runner = self.runners.get(campaign_id)
+        if runner is not None:
+            progress = runner.get_progress(since, limit)
+            campaign = self.job_store.get_campaign(campaign_id)
+            progress['status'] = campaign['status']
+            progress['next_run_at'] = campaign['next_run_at'] if campaign['status'] == 'scheduled' else None
+            if runner.thread is None and progress['status'] == 'running':
+                progress['is_active'] = True  # Dispatched, its thread is about to start
+            return progress
+        if campaign_id is None:
+            return {
+                'campaign_id': None, 'status': None, 'is_active': False, 'current': 0, 'total': 0,
+                'success_count': 0, 'failure_count': 0, 'sessions': [], 'logs': [], 'log_cursor': 0
+            }
+        campaign = self.job_store.get_campaign(campaign_id)
+        if campaign is None:
+            return None
+        counts = campaign['counts']
+        success = counts.get('sent', 0)
+        failure = sum(count for status, count in counts.items() if status not in ('sent', 'pending', 'sending'))
+        return {
+            'campaign_id': campaign_id,
+            'status': campaign['status'],
+            'is_active': campaign['status'] in ('loading', 'queued'),  # Not finished, just waiting for a session
+            'error': campaign['error'],
+            'next_run_at': campaign['next_run_at'] if campaign['status'] == 'scheduled' else None,
+            'current': success + failure,
+            'total': campaign['total'],
+            'success_count': success,
+            'failure_count': failure,
+            'sessions': [],
+            'logs': [],
+            'log_cursor': since or 0
+        }
+
+    def _stop(self, campaign_id, status):
+        """Stop a queued, scheduled or running campaign, recording status; False if it isn't any of those"""
+        campaign = self.job_store.get_campaign(campaign_id)
+        if campaign is None:
+            raise KeyError(campaign_id)
+        runner = self.runners.get(campaign_id)
+        if runner is not None and runner.is_active:
+            runner.stop_process(status)
+            return True
+        if campaign['status'] in ('loading', 'queued', 'scheduled'):
+            self.job_store.set_campaign_status(campaign_id, status)
+            return True
+        return False
+
+    def stop(self, campaign_id):
+        return self._stop(campaign_id, 'stopped')
+
+    def pause(self, campaign_id):
+        return self._stop(campaign_id, 'paused')
+
+    def cancel(self, campaign_id):
+        return self._stop(campaign_id, 'cancelled')
+
+    def resume(self, campaign_id):
+        """Put a paused, stopped or interrupted campaign back in the queue
+
+        Raises ValueError for a campaign whose recipients file never finished loading, which
+        would otherwise send to a partial list.
+        """
+        campaign = self.job_store.get_campaign(campaign_id)
+        if campaign is None:
+            raise KeyError(campaign_id)
+        if campaign['status'] == 'failed' and (campaign['error'] or '').startswith((LOAD_INTERRUPTED, LOAD_FAILED)):
+            raise ValueError(f"Campaign's recipients never finished loading ({campaign['error']}); upload the file again")
+        runner = self.runners.get(campaign_id)
+        if runner is not None and runner.is_active and runner.cancel.cancelled and runner.thread is not None:
+            # Paused a moment ago; give its sessions time to reach their next checkpoint
+            runner.thread.join(self.config['stop_grace'])
+            campaign = self.job_store.get_campaign(campaign_id)
+        if (runner is not None and runner.is_active) or campaign['status'] not in RESUMABLE_STATUSES:
+            return False
+        self.job_store.set_campaign_status(campaign_id, 'queued')
+        self.submit(campaign_id, campaign['priority'])
+        return True
@@ -0,0 +1,33 @@
+import threading
+
+
+class Cancelled(Exception):
+    """Raised at a checkpoint once the campaign has been asked to stop"""
+
+
+class CancelToken:
+    """Cooperative stop signal shared by a campaign's sessions and their transports
+
+    Nothing is interrupted from outside: the send loop and transports call check() between
+    WebDriver steps and wait() instead of sleeping, so a stop lands at the next safe point
+    and never while the browser is mid-command.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def cancel(self):
+        self.event.set()
+
+    def check(self):
+        """Raise Cancelled if a stop has been requested"""
+        if self.event.is_set():
+            raise Cancelled()
+
+    def wait(self, seconds):
+        """Sleep up to seconds, returning early (True) if a stop is requested"""
+        return self.event.wait(seconds) if seconds > 0 else self.event.is_set()
@@ -1,11 +1,6 @@
 import React, { useEffect, useRef } from 'react';
 import { Activity, Users, CheckCircle, XCircle, Info, Clock, List, X } from 'lucide-react';
-
-interface LogEntry {
-  message: string;
-  type: 'success' | 'error' | 'info';
-  timestamp: string;
-}
+import type { LogRecord } from '@shared/schema';
 
 interface ProgressLogProps {
   isActive: boolean;
@@ -13,7 +8,7 @@ interface ProgressLogProps {
   total: number;
   successCount: number;
   failureCount: number;
-  logs: string[];
+  logs: LogRecord[];
   onClose?: () => void;
 }
 
@@ -37,17 +32,7 @@ export const ProgressLog: React.FC<ProgressLogProps> = ({
 
   const progressPercentage = total > 0 ? Math.round((current / total) * 100) : 0;
 
-  const parseLogEntry = (log: string): LogEntry => {
-    const timestamp = new Date().toLocaleTimeString();
-    
-    if (log.includes('✓') || log.includes('successfully') || log.includes('Success')) {
-      return { message: log, type: 'success', timestamp };
-    } else if (log.includes('✗') || log.includes('Failed') || log.includes('Error')) {
-      return { message: log, type: 'error', timestamp };
-    } else {
-      return { message: log, type: 'info', timestamp };
-    }
-  };
+  const formatTime = (time: number) => new Date(time * 1000).toLocaleTimeString();
 
   const getLogIcon = (type: string) => {
     switch (type) {
@@ -167,18 +152,17 @@ export const ProgressLog: React.FC<ProgressLogProps> = ({
               <p>No activity logs yet. Start sending messages to see real-time updates.</p>
             </div>
           ) : (
-            logs.map((log, index) => {
-              const logEntry = parseLogEntry(log);
+            logs.map((log) => {
               return (
-                <div key={index} className={getLogClasses(logEntry.type)} data-testid={`log-entry-${index}`}>
-                  {getLogIcon(logEntry.type)}
+                <div key={log.seq} className={getLogClasses(log.level)} data-testid={`log-entry-${log.seq}`}>
+                  {getLogIcon(log.level)}
                   <div className="flex-1">
-                    <p className="font-medium">{logEntry.message}</p>
+                    <p className="font-medium">{log.message}</p>
                     <p className={`text-xs mt-1 ${
-                      logEntry.type === 'success' ? 'text-green-600' :
-                      logEntry.type === 'error' ? 'text-red-600' : 'text-blue-600'
+                      log.level === 'success' ? 'text-green-600' :
+                      log.level === 'error' ? 'text-red-600' : 'text-blue-600'
                     }`}>
-                      {logEntry.timestamp}
+                      {formatTime(log.time)}
                     </p>
                   </div>
                 </div>
@@ -0,0 +1,50 @@
+import * as React from "react"
+import type { LogRecord, ProgressResponse } from "@shared/schema"
+
+type StreamProgress = Omit<ProgressResponse, "logs" | "log_cursor">
+
+// Keep the dashboard bounded on very long campaigns
+const MAX_LOG_LINES = 1000
+
+/**
+ * Subscribe to a Server-Sent Events progress stream. The server only pushes
+ * counter changes and new log records; EventSource resends Last-Event-ID on
+ * reconnect so nothing is replayed or missed.
+ */
+export function useProgressStream(url: string | null) {
+  const [progress, setProgress] = React.useState<StreamProgress | null>(null)
+  const [logs, setLogs] = React.useState<LogRecord[]>([])
+  const [isDone, setIsDone] = React.useState(false)
+
+  React.useEffect(() => {
+    if (!url) return
+
+    setLogs([])
+    setIsDone(false)
+    const source = new EventSource(url)
+
+    source.addEventListener("progress", (event) => {
+      setProgress(JSON.parse((event as MessageEvent).data))
+    })
+    source.addEventListener("log", (event) => {
+      const record: LogRecord = JSON.parse((event as MessageEvent).data)
+      setLogs((prev) => {
+        const next = [...prev, record]
+        return next.length > MAX_LOG_LINES ? next.slice(next.length - MAX_LOG_LINES) : next
+      })
+    })
+    source.addEventListener("done", (event) => {
+      setProgress(JSON.parse((event as MessageEvent).data))
+      setIsDone(true)
+      source.close()
+    })
+    source.addEventListener("not_found", () => {
+      setIsDone(true)
+      source.close()
+    })
+
+    return () => source.close()
+  }, [url])
+
+  return { progress, logs, isDone }
+}
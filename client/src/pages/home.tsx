@@ -1,27 +1,31 @@
 import React, { useState, useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { Send, HelpCircle, ShieldCheck, Zap, Users, Download, RefreshCw, X } from 'lucide-react';
+import { Send, HelpCircle, ShieldCheck, Zap, Users, Download, RefreshCw, RotateCcw, X } from 'lucide-react';
 import { FileDropzone } from '@/components/FileDropzone';
 import { ProgressLog } from '@/components/ProgressLog';
 import { ToastContainer } from '@/components/Toast';
 import { useToast } from '@/hooks/use-toast';
-import type { ProgressResponse, StatusResponse } from '@shared/schema';
+import { useProgressStream } from '@/hooks/use-progress-stream';
+import type { DryRunResponse, ProgressResponse, SendResponse, StatusResponse, TemplatePreviewResponse } from '@shared/schema';
 
 export default function Home() {
   const [recipientsFile, setRecipientsFile] = useState<File | null>(null);
   const [attachmentFile, setAttachmentFile] = useState<File | null>(null);
+  const [template, setTemplate] = useState('');
+  const [preview, setPreview] = useState<TemplatePreviewResponse | null>(null);
   const [isProcessing, setIsProcessing] = useState(false);
+  const [campaignId, setCampaignId] = useState<string | null>(null);
   const [toasts, setToasts] = useState<Array<{ id: string; message: string; type: 'success' | 'error' | 'warning' | 'info' }>>([]);
   
   const { toast } = useToast();
   const queryClient = useQueryClient();
 
-  // Poll progress data when processing
-  const { data: progressData } = useQuery<ProgressResponse>({
-    queryKey: ['/api/progress'],
-    enabled: isProcessing,
-    refetchInterval: isProcessing ? 2000 : false,
-  });
+  // Stream progress of the campaign we queued while processing
+  const streamUrl = isProcessing && campaignId ? `/api/campaigns/${campaignId}/progress/stream` : null;
+  const { progress: streamProgress, logs: streamLogs, isDone } = useProgressStream(streamUrl);
+  const progressData: ProgressResponse | undefined = streamProgress
+    ? { ...streamProgress, logs: streamLogs }
+    : undefined;
 
   // Get final status
   const { data: statusData } = useQuery<StatusResponse>({
@@ -41,6 +45,9 @@ export default function Home() {
       if (attachmentFile) {
         formData.append('attachmentFile', attachmentFile);
       }
+      if (template.trim()) {
+        formData.append('template', template);
+      }
 
       const response = await fetch('/api/send', {
         method: 'POST',
@@ -52,26 +59,100 @@ export default function Home() {
         throw new Error(error.error || 'Failed to start sending process');
       }
 
-      return response.json();
+      return response.json() as Promise<SendResponse>;
     },
-    onSuccess: () => {
+    onSuccess: (data) => {
+      setCampaignId(data.campaign_id);
       setIsProcessing(true);
-      showToast('Message sending process started successfully!', 'success');
-      queryClient.invalidateQueries({ queryKey: ['/api/progress'] });
+      showToast('Campaign accepted, loading recipients...', 'success');
     },
     onError: (error) => {
       showToast(error.message || 'Failed to start sending process', 'error');
     },
   });
 
+  // Render the template against the first few rows before sending
+  const previewMutation = useMutation({
+    mutationFn: async () => {
+      if (!recipientsFile) {
+        throw new Error('Recipients file is required');
+      }
+
+      const formData = new FormData();
+      formData.append('recipientsFile', recipientsFile);
+      formData.append('template', template);
+
+      const response = await fetch('/api/templates/preview', {
+        method: 'POST',
+        body: formData,
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(
+          data.missing_fields?.length
+            ? `Columns not found for: ${data.missing_fields.join(', ')}`
+            : data.error || 'Failed to preview template'
+        );
+      }
+      return data as TemplatePreviewResponse;
+    },
+    onSuccess: (data) => setPreview(data),
+    onError: (error) => {
+      setPreview(null);
+      showToast(error.message || 'Failed to preview template', 'error');
+    },
+  });
+
+  // Check the whole file and estimate the run without sending anything
+  const dryRunMutation = useMutation({
+    mutationFn: async () => {
+      if (!recipientsFile) {
+        throw new Error('Recipients file is required');
+      }
+
+      const formData = new FormData();
+      formData.append('recipientsFile', recipientsFile);
+      if (attachmentFile) {
+        formData.append('attachmentFile', attachmentFile);
+      }
+      if (template.trim()) {
+        formData.append('template', template);
+      }
+
+      const response = await fetch('/api/send?dry_run=1', {
+        method: 'POST',
+        body: formData,
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || 'Dry run failed');
+      }
+      return data as DryRunResponse;
+    },
+    onSuccess: (data) => {
+      const skipped = data.duplicates + data.invalid_format + data.known_invalid;
+      const hours = (data.estimate.eta_seconds / 3600).toFixed(1);
+      showToast(`${data.to_send} to send, ${skipped} skipped, about ${hours}h`, data.empty_messages ? 'warning' : 'info');
+    },
+    onError: (error) => {
+      showToast(error.message || 'Dry run failed', 'error');
+    },
+  });
+
   // Monitor processing state
   useEffect(() => {
-    if (progressData && !progressData.is_active && isProcessing) {
+    if (isDone && isProcessing) {
       setIsProcessing(false);
-      showToast('Message sending process completed!', 'success');
+      if (streamProgress?.error) {
+        showToast(streamProgress.error, 'error');
+      } else if (streamProgress?.status === 'scheduled' && streamProgress.next_run_at) {
+        showToast(`Campaign paused until ${new Date(streamProgress.next_run_at * 1000).toLocaleString()}`, 'info');
+      } else {
+        showToast('Message sending process completed!', 'success');
+      }
       queryClient.invalidateQueries({ queryKey: ['/api/status'] });
     }
-  }, [progressData, isProcessing, queryClient]);
+  }, [isDone, isProcessing, streamProgress, queryClient]);
 
   const showToast = (message: string, type: 'success' | 'error' | 'warning' | 'info') => {
     const id = Date.now().toString();
@@ -98,6 +179,7 @@ export default function Home() {
   const handleClearFiles = () => {
     setRecipientsFile(null);
     setAttachmentFile(null);
+    setPreview(null);
     showToast('Files cleared successfully', 'success');
   };
 
@@ -106,11 +188,38 @@ export default function Home() {
     showToast('Logs cleared', 'info');
   };
 
+  // The campaign on screen: the one streaming, or the last one the server knows about
+  const reportCampaignId = campaignId || statusData?.campaign_id || null;
+
   const handleDownloadReport = () => {
-    // This would typically generate and download a report
-    showToast('Report downloaded', 'success');
+    if (!reportCampaignId) {
+      showToast('No campaign to export yet', 'error');
+      return;
+    }
+    // Streamed by the server as an attachment, so the browser downloads it directly
+    window.location.href = `/api/campaigns/${reportCampaignId}/report?format=xlsx`;
   };
 
+  // Queue a new campaign with only the recipients that failed
+  const retryFailedMutation = useMutation({
+    mutationFn: async () => {
+      const response = await fetch(`/api/campaigns/${reportCampaignId}/retry`, { method: 'POST' });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || 'Failed to retry failed recipients');
+      }
+      return data as SendResponse;
+    },
+    onSuccess: (data) => {
+      setCampaignId(data.campaign_id);
+      setIsProcessing(true);
+      showToast(data.message, 'success');
+    },
+    onError: (error) => {
+      showToast(error.message || 'Failed to retry failed recipients', 'error');
+    },
+  });
+
   const currentProgress = progressData || {
     is_active: false,
     current: 0,
@@ -168,9 +277,9 @@ export default function Home() {
             <div>
               <FileDropzone
                 onFileSelect={setRecipientsFile}
-                accept=".xlsx,.xls"
+                accept=".xlsx,.xls,.csv,.parquet"
                 label="Recipients Excel File *"
-                description="Supported formats: .xlsx, .xls"
+                description="Supported formats: .xlsx, .xls, .csv, .parquet"
                 icon="upload"
                 selectedFile={recipientsFile}
                 onRemoveFile={() => setRecipientsFile(null)}
@@ -199,6 +308,62 @@ export default function Home() {
             </div>
           </div>
 
+          {/* Message Template */}
+          <div className="mb-8">
+            <label htmlFor="message-template" className="block text-sm font-semibold text-gray-700 mb-2">
+              Message Template (Optional)
+            </label>
+            <textarea
+              id="message-template"
+              className="w-full min-h-24 p-4 border-2 border-gray-200 rounded-xl focus:outline-none focus:border-green-600 transition-colors"
+              placeholder="Hi {{Name}}, your order {{OrderId}} is ready."
+              value={template}
+              onChange={(e) => {
+                setTemplate(e.target.value);
+                setPreview(null);
+              }}
+              disabled={isProcessing}
+              data-testid="input-template"
+            />
+            <div className="mt-3 flex items-start justify-between gap-4 text-sm text-gray-600">
+              <div className="flex items-start space-x-2">
+                <HelpCircle className="w-4 h-4 text-green-600 mt-0.5 flex-shrink-0" />
+                <p>Use {'{{Column}}'} to insert a value from each row. Leave empty to send the 'Message' column as is.</p>
+              </div>
+              <button
+                className="px-4 py-2 border-2 border-green-300 text-green-700 rounded-lg hover:bg-green-50 disabled:opacity-50"
+                onClick={() => previewMutation.mutate()}
+                disabled={!recipientsFile || !template.trim() || previewMutation.isPending}
+                data-testid="button-preview-template"
+              >
+                {previewMutation.isPending ? 'Loading...' : 'Preview'}
+              </button>
+              <button
+                className="px-4 py-2 border-2 border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50 disabled:opacity-50"
+                onClick={() => dryRunMutation.mutate()}
+                disabled={!recipientsFile || dryRunMutation.isPending || isProcessing}
+                data-testid="button-dry-run"
+              >
+                {dryRunMutation.isPending ? 'Checking...' : 'Dry Run'}
+              </button>
+            </div>
+            {preview && (
+              <div className="mt-4 space-y-2" data-testid="template-preview">
+                {preview.rows.map((row, index) => (
+                  <div key={index} className="p-3 bg-green-50 rounded-lg text-sm">
+                    <span className="font-semibold text-gray-700">{row.contact}: </span>
+                    <span className="text-gray-800 whitespace-pre-wrap">{row.message}</span>
+                  </div>
+                ))}
+                {preview.blank_fields && Object.keys(preview.blank_fields).length > 0 && (
+                  <p className="text-sm text-amber-700">
+                    Empty values in the preview rows: {Object.entries(preview.blank_fields).map(([field, count]) => `${field} (${count})`).join(', ')}
+                  </p>
+                )}
+              </div>
+            )}
+          </div>
+
           {/* Quick Stats Display */}
           {showStats && (
             <div className="grid grid-cols-2 md:grid-cols-4 gap-6 mb-8 p-6 bg-gradient-to-r from-blue-50 to-indigo-50 rounded-xl" data-testid="stats-section">
@@ -260,6 +425,16 @@ export default function Home() {
               <Download className="w-5 h-5" />
               <span>Export Report</span>
             </button>
+
+            <button 
+              className="flex items-center space-x-2 px-6 py-4 border-2 border-red-300 text-red-700 rounded-xl hover:bg-red-50 hover:border-red-400 transition-all duration-200"
+              onClick={() => retryFailedMutation.mutate()}
+              disabled={isProcessing || !reportCampaignId || retryFailedMutation.isPending || (progressData?.failure_count ?? statusData?.failure_count ?? 0) === 0}
+              data-testid="button-retry-failed"
+            >
+              <RotateCcw className="w-5 h-5" />
+              <span>{retryFailedMutation.isPending ? 'Queuing...' : 'Retry Failed'}</span>
+            </button>
           </div>
 
           {/* Progress and Log Section */}
@@ -3,20 +3,107 @@ import os
 CONFIG = {
     # WebDriver settings
     'max_retries': 3,
-    'delay_between_messages': 30,  # seconds between messages
+    'retry_delay': float(os.environ.get('RETRY_DELAY', 2)),          # base seconds for retry backoff
+    'max_retry_delay': 60,         # cap on exponential retry backoff
     'upload_timeout': 60,          # seconds for file upload
     'chat_load_timeout': 45,       # seconds to wait for chat to load
     'message_send_timeout': 40,    # seconds to wait for message to send
+    'delivery_timeout': 10,        # max seconds spent on the double check, overlapped with pacing
+    'navigation_mode': os.environ.get('NAVIGATION_MODE', 'in_page'),  # 'in_page' switches chats without reloading, 'reload' uses driver.get
+    'in_page_timeout': 5,          # seconds to wait for an in-page chat switch before reloading instead
+    'in_page_max_failures': 3,     # consecutive in-page fallbacks before a session reloads for every chat
+    'stop_grace': 10,              # seconds a resume waits for a just-stopped campaign's sessions to wind down
+    'send_window': os.environ.get('SEND_WINDOW', ''),  # daily 'HH:MM-HH:MM' campaigns may send in, e.g. '09:00-20:00'; empty sends any time
+    'timezone': os.environ.get('SEND_TIMEZONE', 'UTC'),  # IANA zone send windows and daily caps are counted in
+    'daily_cap': int(os.environ.get('DAILY_CAP', 0)),  # messages per Chrome profile per window (or day) across campaigns before sending waits, 0 disables
+    'probe_interval': 0.25,        # seconds between page state probes while waiting
+    'drift_grace': 5,              # seconds a chat may show without a known composer before failing fast
+    'drift_check_phone': os.environ.get('DRIFT_CHECK_PHONE', ''),  # number opened at login to verify chat locators
+    'text_input_mode': os.environ.get('TEXT_INPUT_MODE', 'paste'),  # 'paste' inserts a message in one call, 'keys' types it
+
+    # Pacing settings (per session, overridable per campaign through /api/send)
+    'messages_per_hour': float(os.environ.get('MESSAGES_PER_HOUR', 120)),  # starting rate, 0 disables pacing
+    'max_messages_per_hour': float(os.environ.get('MAX_MESSAGES_PER_HOUR', 240)),
+    'min_messages_per_hour': 30,
+    'pacing_burst': 1,             # token bucket capacity
+    'pacing_jitter': 0.3,          # +/- fraction of randomness on each wait
+    'latency_target': 15,          # seconds; slower sends ease the rate off
+    'ban_failure_threshold': 3,    # consecutive timeouts/errors treated as a throttle signal
+    'ban_cooldown': 300,           # seconds to pause a session after a throttle signal
+
+    # Warm session settings
+    'warm_sessions': os.environ.get('WARM_SESSIONS', '1') == '1',  # keep browsers logged in between campaigns
+    'health_check_interval': 30,   # seconds between idle session health checks
+    'chromedriver_path': os.environ.get('CHROMEDRIVER_PATH', ''),  # skips the webdriver_manager lookup
+    'chromedriver_cache_dir': os.environ.get('CHROMEDRIVER_CACHE_DIR', 'drivers'),  # downloaded chromedriver, pinned so later starts need no network
+    'chromedriver_version': os.environ.get('CHROMEDRIVER_VERSION', ''),  # version to download and pin; empty matches the installed Chrome
+    'preload_modules': os.environ.get('PRELOAD_MODULES', '1') == '1',  # import pandas and Selenium in the background once the API is up
+
+    # Browser settings ('full' is a normal maximized Chrome; 'lean' is headless with a trimmed profile)
+    'browser_mode': os.environ.get('BROWSER_MODE', 'full'),  # log in once in 'full' mode to scan the QR code
+    'window_size': os.environ.get('WINDOW_SIZE', '1024,768'),  # lean mode; WhatsApp Web keeps its two-pane layout at this size
+    'renderer_process_limit': int(os.environ.get('RENDERER_PROCESS_LIMIT', 2)),  # lean mode
+    'js_heap_limit_mb': int(os.environ.get('JS_HEAP_LIMIT_MB', 512)),  # lean mode, V8 old-space cap per renderer
+    'block_images': os.environ.get('BLOCK_IMAGES', '1') == '1',  # lean mode; avatars and previews only, icons are inline SVG
+    'browser_memory_limit_mb': int(os.environ.get('BROWSER_MEMORY_LIMIT_MB', 0)),  # restart a browser whose processes use more, 0 disables
+    'memory_check_every': 25,      # messages between memory checks during a campaign
+
+    # Session worker settings ('thread' drives browsers inside the API process, 'process' gives each its own worker)
+    'session_isolation': os.environ.get('SESSION_ISOLATION', 'thread'),
+    'worker_call_timeout': 300,    # seconds a worker may spend on one transport call before it is killed as hung
+    'worker_stop_timeout': 10,     # seconds a closing worker gets to quit its browser before it is killed
+
+    # Transport settings ('selenium' drives Chrome, 'fake' talks to fake_whatsapp.py)
+    'transport': os.environ.get('WHATSAPP_TRANSPORT', 'selenium'),
+    'fake_whatsapp_url': os.environ.get('FAKE_WHATSAPP_URL', ''),  # empty starts one in-process
+    'fake_chat_latency_ms': float(os.environ.get('FAKE_CHAT_LATENCY_MS', 0)),
+    'fake_send_latency_ms': float(os.environ.get('FAKE_SEND_LATENCY_MS', 0)),
+    'fake_upload_latency_ms': float(os.environ.get('FAKE_UPLOAD_LATENCY_MS', 0)),
+    'fake_failure_rate': float(os.environ.get('FAKE_FAILURE_RATE', 0)),
+    'fake_invalid_rate': float(os.environ.get('FAKE_INVALID_RATE', 0)),
 
     # Chrome profile settings
     'user_data_dir': os.environ.get('CHROME_USER_DATA_DIR', ''),
     'profile_name': os.environ.get('CHROME_PROFILE_NAME', 'Default'),
+    # Comma separated profiles under user_data_dir, one parallel session each
+    'profiles': [p.strip() for p in os.environ.get('CHROME_PROFILES', '').split(',') if p.strip()],
     
+    # Campaign job store
+    'job_store_path': os.environ.get('JOB_STORE_PATH', 'whatsapp_jobs.db'),
+    'checkpoint_batch_size': 50,   # recipient outcomes per batched commit
+    'checkpoint_interval': 1.0,    # max seconds between commits
+
     # API settings
     'upload_folder': 'uploads',
     'max_file_size': 16 * 1024 * 1024,  # 16MB max file size
+    'upload_buffer_size': 1024 * 1024,  # bytes copied per write when saving uploads to disk
+    'static_folder': 'dist/public',  # built React app
+    'static_max_age': 365 * 86400,  # seconds hashed assets under assets/ may be cached; index.html is always revalidated
+    'static_precompress': os.environ.get('STATIC_PRECOMPRESS', '1') == '1',  # write missing .gz/.br copies of static files at startup
+    'loader_chunk_size': 1000,     # recipients parsed and stored per chunk; sending starts after the first
+    'default_country_code': os.environ.get('DEFAULT_COUNTRY_CODE', '91'),  # prepended to national numbers
+    'national_number_length': int(os.environ.get('NATIONAL_NUMBER_LENGTH', 10)),  # digits in a national number, 0 disables
+    'invalid_cache_days': 30,      # numbers found not on WhatsApp are skipped for this long
+    'dry_run_chunk_size': 10000,   # recipients per chunk in a dry run; bigger chunks mean fewer pandas passes
+    'dry_run_preview_rows': 20,    # rendered rows and problem rows returned by a dry run
+    'report_chunk_size': 5000,     # recipients read and written per chunk when exporting a results report
+
+    # Attachment settings
+    'media_cache_dir': os.environ.get('MEDIA_CACHE_DIR', 'media_cache'),  # compressed attachments by content hash
+    'media_max_dimension': 1600,   # pixels; larger images are scaled down before sending
+    'media_target_size': 1024 * 1024,  # bytes; JPEG quality steps down until an image fits
+    'media_jpeg_quality': 85,      # starting JPEG quality for re-encoded images
     
+    # Progress streaming (Server-Sent Events)
+    'stream_min_interval': 0.25,   # seconds; coalesces bursts of updates into one push
+    'stream_keepalive': 15,        # seconds between keepalive comments on idle streams
+    'stream_retry_ms': 3000,       # client reconnect delay sent to EventSource
+
     # Logging
+    'log_buffer_size': 500,        # log records kept in memory per campaign
+    'log_page_size': 100,          # default records per progress response
+    'max_log_page_size': 1000,     # cap on ?limit= for progress responses
+    'log_spill_dir': os.environ.get('LOG_SPILL_DIR', 'logs'),  # older records spill to <campaign_id>.jsonl here, timings to <campaign_id>.timings.json
     'log_level': 'DEBUG',
     'log_file': 'whatsapp_sender.log'
 }
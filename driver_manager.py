@@ -0,0 +1,195 @@
+import time
+import logging
+import threading
+from config import CONFIG
+from transport import create_transport, resolve_chromedriver_path
+from metrics import PROCESS_METRICS
+from startup import STARTUP
+
+
+class DriverSlot:
+    """A warm transport for one Chrome profile"""
+
+    def __init__(self, config):
+        self.config = config
+        self.profile_name = config.get('profile_name', 'Default')
+        self.transport = None
+        self.in_use = False
+        self.ready = False
+        self.lock = threading.Lock()
+
+
+class DriverManager:
+    """Keeps logged-in WhatsApp sessions alive between campaigns"""
+
+    def __init__(self, config=CONFIG):
+        self.config = config
+        self.slots = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = False
+
+    def log(self, message, log_type="info"):
+        logging.info(f"{log_type.upper()}: [driver-manager] {message}")
+
+    def _slot(self, config):
+        profile_name = config.get('profile_name', 'Default')
+        with self.lock:
+            slot = self.slots.get(profile_name)
+            if slot is None:
+                slot = DriverSlot(config)
+                self.slots[profile_name] = slot
+            return slot
+
+    def start(self, session_configs=None):
+        """Start warming up sessions and health checks in the background, so the API doesn't wait for a browser"""
+        if self.started:
+            return
+        self.started = True
+        for config in session_configs or []:
+            self._slot(config)
+
+        self.thread = threading.Thread(target=self._health_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _connect(self, slot):
+        """(Re)start a slot's transport and log in; caller holds slot.lock"""
+        if slot.transport is not None:
+            # Try to recover the existing browser before paying for a new one
+            try:
+                if slot.transport.login():
+                    slot.ready = True
+                    return True
+            except Exception:
+                pass
+            slot.transport.close()
+            slot.transport = None
+
+        slot.ready = False
+        transport = create_transport(slot.config, self.log)
+        with PROCESS_METRICS.span('driver_start'):
+            started = transport.start()
+        if not started:
+            return False
+        with PROCESS_METRICS.span('login'):
+            logged_in = transport.login()
+        if not logged_in:
+            transport.close()
+            return False
+        slot.transport = transport
+        slot.ready = True
+        STARTUP.record('first_session_ready', profile_name=slot.profile_name)
+        return True
+
+    def acquire(self, config, log=None):
+        """Hand out an already logged-in transport for a profile, or None if unavailable"""
+        slot = self._slot(config)
+        with slot.lock:
+            if slot.in_use:
+                return None
+            if not (slot.ready and slot.transport.is_healthy()):
+                if log:
+                    log(f"Connecting session for profile {slot.profile_name}...")
+                if not self._connect(slot):
+                    return None
+            elif log:
+                log(f"Reusing warm WhatsApp session for profile {slot.profile_name}")
+            slot.in_use = True
+            slot.transport.log = log or self.log
+            slot.transport.config = config
+            return slot.transport
+
+    def restart(self, transport, log=None):
+        """Replace an in-use transport with a fresh, logged-in browser on the same profile; None on failure"""
+        with self.lock:
+            slots = list(self.slots.values())
+        for slot in slots:
+            if slot.transport is transport:
+                with slot.lock:
+                    transport.close()
+                    slot.transport = None
+                    if not self._connect(slot):
+                        slot.in_use = False
+                        return None
+                    slot.transport.log = log or self.log
+                    slot.transport.config = transport.config
+                    return slot.transport
+        return None
+
+    def over_memory_limit(self, transport):
+        """Memory used by a transport's browser if it is above browser_memory_limit_mb, else None"""
+        limit = self.config.get('browser_memory_limit_mb', 0)
+        usage = transport.memory_usage_mb() if limit else None
+        return usage if usage is not None and usage > limit else None
+
+    def release(self, transport):
+        """Return a transport to the pool without quitting the browser"""
+        with self.lock:
+            slots = list(self.slots.values())
+        for slot in slots:
+            if slot.transport is transport:
+                with slot.lock:
+                    slot.in_use = False
+                    transport.log = self.log
+                return
+
+    def _health_loop(self):
+        """Resolve the chromedriver binary once, then check idle sessions periodically and reconnect dropped ones"""
+        if self.config.get('transport', 'selenium') == 'selenium':
+            try:
+                resolve_chromedriver_path(self.config)
+            except Exception as e:
+                self.log(f"Could not resolve chromedriver: {str(e)}", "error")
+
+        # Warm every known profile up front so the first campaign doesn't pay the cold start
+        interval = 0
+        while not self.stop_event.wait(interval):
+            interval = self.config.get('health_check_interval', 30)
+            with self.lock:
+                slots = list(self.slots.values())
+            for slot in slots:
+                if not slot.lock.acquire(blocking=False):
+                    continue  # Being connected or handed out right now
+                try:
+                    if slot.in_use:
+                        continue
+                    if slot.ready and slot.transport.is_healthy():
+                        usage = self.over_memory_limit(slot.transport)
+                        if usage is None:
+                            continue
+                        # Restart bloated idle browsers before a campaign has to
+                        self.log(f"Browser for profile {slot.profile_name} uses {usage:.0f}MB, restarting...")
+                        slot.transport.close()
+                        slot.transport = None
+                        slot.ready = False
+                    elif slot.ready:
+                        self.log(f"Session for profile {slot.profile_name} dropped, reconnecting...", "error")
+                    started = time.time()
+                    if self._connect(slot):
+                        self.log(f"Session for profile {slot.profile_name} ready in {time.time() - started:.1f}s")
+                except Exception as e:
+                    slot.ready = False
+                    self.log(f"Health check failed for profile {slot.profile_name}: {str(e)}", "error")
+                finally:
+                    slot.lock.release()
+
+    def get_status(self):
+        """Summarize the warm sessions"""
+        with self.lock:
+            slots = list(self.slots.values())
+        return [
+            {'profile_name': slot.profile_name, 'ready': slot.ready, 'in_use': slot.in_use}
+            for slot in slots
+        ]
+
+    def shutdown(self):
+        """Stop health checks and quit every browser"""
+        self.stop_event.set()
+        with self.lock:
+            slots = list(self.slots.values())
+            self.slots = {}
+        for slot in slots:
+            if slot.transport is not None:
+                slot.transport.close()
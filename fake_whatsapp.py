@@ -0,0 +1,344 @@
+"""
+Local stand-in for WhatsApp Web used for load testing the send pipeline.
+
+Run it standalone with `python fake_whatsapp.py --port 8765` and point the
+sender at it with WHATSAPP_TRANSPORT=fake FAKE_WHATSAPP_URL=http://127.0.0.1:8765,
+or leave FAKE_WHATSAPP_URL empty to have the transport start one in-process.
+"""
+
+import os
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse, parse_qs, urlencode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from transport import BaseTransport, CHAT_READY, CHAT_INVALID, CHAT_TIMEOUT
+
+
+class FakeWhatsAppHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Keep-alive round trips stall on delayed ACKs otherwise
+
+    def log_message(self, format, *args):
+        pass  # Keep load tests quiet
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/status':
+            self._reply(200, {'logged_in': True})
+        elif url.path == '/stats':
+            self._reply(200, self.server.get_stats())
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        body = self._read_body()
+        server = self.server
+
+        if url.path == '/chats':
+            phone = json.loads(body or b'{}').get('phone', '')
+            server.simulate_latency(server.chat_latency_ms)
+            if server.should_fail():
+                self._reply(200, {'state': CHAT_TIMEOUT})
+            elif server.is_invalid(phone):
+                self._reply(200, {'state': CHAT_INVALID})
+            else:
+                self._reply(200, {'state': CHAT_READY})
+        elif url.path == '/messages':
+            data = json.loads(body or b'{}')
+            server.simulate_latency(server.send_latency_ms)
+            if server.should_fail():
+                self._reply(503, {'error': 'send failed'})
+            else:
+                text = data.get('text', '')
+                self._reply(200, {'id': server.record_message(data.get('phone', ''), 'text', len(text), text)})
+        elif url.path == '/media':
+            server.simulate_latency(server.upload_latency_ms)
+            if server.should_fail():
+                self._reply(503, {'error': 'upload failed'})
+            else:
+                self._reply(200, {'media_id': server.store_media(len(body))})
+        elif url.path == '/attachments':
+            phone = query.get('phone', [''])[0]
+            media_id = query.get('media_id', [''])[0]
+            caption = query.get('caption', [''])[0]
+            if media_id:
+                # Forwarding already uploaded media costs a send, not an upload
+                server.simulate_latency(server.send_latency_ms)
+                if not server.has_media(media_id):
+                    self._reply(404, {'error': 'unknown media'})
+                elif server.should_fail():
+                    self._reply(503, {'error': 'send failed'})
+                else:
+                    self._reply(200, {'id': server.record_message(phone, 'attachment', 0, caption)})
+                return
+            server.simulate_latency(server.upload_latency_ms)
+            if server.should_fail():
+                self._reply(503, {'error': 'upload failed'})
+            else:
+                self._reply(200, {'id': server.record_message(phone, 'attachment', len(body), caption)})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+
+class FakeWhatsAppServer(ThreadingHTTPServer):
+    """HTTP server mimicking chat, textbox, attach and "not on WhatsApp" behaviour"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, chat_latency_ms=0, send_latency_ms=0,
+                 upload_latency_ms=0, failure_rate=0.0, invalid_rate=0.0, seed=None):
+        super().__init__((host, port), FakeWhatsAppHandler)
+        self.chat_latency_ms = chat_latency_ms
+        self.send_latency_ms = send_latency_ms
+        self.upload_latency_ms = upload_latency_ms
+        self.failure_rate = failure_rate
+        self.invalid_rate = invalid_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.message_count = 0
+        self.attachment_count = 0
+        self.uploaded_bytes = 0
+        self.uploads = 0
+        self.media = set()
+        self.recipients = {}
+        self.texts = {}             # Phone -> text (or attachment caption) of the latest message sent to it
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def simulate_latency(self, latency_ms):
+        """Sleep for roughly latency_ms with +/-20% jitter"""
+        if latency_ms > 0:
+            with self.lock:
+                jitter = self.random.uniform(0.8, 1.2)
+            time.sleep(latency_ms * jitter / 1000.0)
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.failure_rate
+
+    def is_invalid(self, phone):
+        """Numbers are deterministically "not on WhatsApp" so retries behave consistently"""
+        return (zlib.crc32(phone.encode('utf-8')) % 10000) < self.invalid_rate * 10000
+
+    def store_media(self, size):
+        with self.lock:
+            self.uploads += 1
+            self.uploaded_bytes += size
+            media_id = f"media-{self.uploads}"
+            self.media.add(media_id)
+            return media_id
+
+    def has_media(self, media_id):
+        with self.lock:
+            return media_id in self.media
+
+    def record_message(self, phone, kind, size, text=''):
+        with self.lock:
+            self.texts[phone] = text
+            self.message_count += 1
+            if kind == 'attachment':
+                self.attachment_count += 1
+                if size:
+                    self.uploads += 1
+                    self.uploaded_bytes += size
+            self.recipients[phone] = self.recipients.get(phone, 0) + 1
+            return self.message_count
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'messages': self.message_count,
+                'attachments': self.attachment_count,
+                'uploads': self.uploads,
+                'uploaded_bytes': self.uploaded_bytes,
+                'unique_recipients': len(self.recipients),
+                'duplicate_sends': sum(count - 1 for count in self.recipients.values())
+            }
+
+    def start(self):
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeWhatsAppTransport(BaseTransport):
+    """Transport that talks to a FakeWhatsAppServer instead of a browser"""
+
+    name = 'fake'
+
+    def __init__(self, config, log=None):
+        super().__init__(config, log)
+        self.server = None
+        self.connection = None
+        self.phone = None
+        self.last_message_id = None
+        self.media_ids = {}
+
+    def _request(self, method, path, body=None, headers=None):
+        if self.connection is None:
+            raise ConnectionError("Fake WhatsApp transport not started")
+        self.connection.request(method, path, body=body, headers=headers or {})
+        response = self.connection.getresponse()
+        payload = json.loads(response.read() or b'{}')
+        return response.status, payload
+
+    def start(self):
+        """Connect to the configured fake server, starting one in-process if needed"""
+        url = self.config.get('fake_whatsapp_url', '')
+        try:
+            if not url:
+                self.server = FakeWhatsAppServer(
+                    chat_latency_ms=self.config.get('fake_chat_latency_ms', 0),
+                    send_latency_ms=self.config.get('fake_send_latency_ms', 0),
+                    upload_latency_ms=self.config.get('fake_upload_latency_ms', 0),
+                    failure_rate=self.config.get('fake_failure_rate', 0.0),
+                    invalid_rate=self.config.get('fake_invalid_rate', 0.0)
+                ).start()
+                url = self.server.url
+            parsed = urlparse(url)
+            self.connection = http.client.HTTPConnection(
+                parsed.hostname, parsed.port, timeout=self.config['chat_load_timeout']
+            )
+            self.log(f"Connected to fake WhatsApp at {url}")
+            return True
+        except Exception as e:
+            self.log(f"Failed to start fake WhatsApp transport: {str(e)}", "error")
+            return False
+
+    def login(self):
+        status, payload = self._request('GET', '/status')
+        if status == 200 and payload.get('logged_in'):
+            self.log("Using existing WhatsApp session")
+            return True
+        self.log("Fake WhatsApp session is not logged in", "error")
+        return False
+
+    def open_chat(self, contact):
+        self.cancel.check()
+        status, payload = self._request(
+            'POST', '/chats', json.dumps({'phone': contact}).encode('utf-8'), {'Content-Type': 'application/json'}
+        )
+        self.phone = contact
+        return payload.get('state', CHAT_TIMEOUT) if status == 200 else CHAT_TIMEOUT
+
+    def send_text(self, message):
+        self.cancel.check()
+        status, payload = self._request(
+            'POST', '/messages', json.dumps({'phone': self.phone, 'text': message}).encode('utf-8'),
+            {'Content-Type': 'application/json'}
+        )
+        if status != 200:
+            raise RuntimeError(payload.get('error', 'send failed'))
+        self.last_message_id = payload['id']
+        return True
+
+    def stage_attachment(self, media):
+        """Upload the file once; sends then reference it by media ID"""
+        if media.digest in self.media_ids:
+            return True
+        with open(media.path, 'rb') as f:
+            data = f.read()
+        status, payload = self._request('POST', '/media', data, {'Content-Type': 'application/octet-stream'})
+        if status != 200:
+            self.log(f"Attachment staging failed: {payload.get('error')}", "error")
+            return False
+        self.media_ids[media.digest] = payload['media_id']
+        return True
+
+    def send_attachment(self, media, caption):
+        media_id = self.media_ids.get(media.digest)
+        if media_id is not None:
+            query = urlencode({'phone': self.phone, 'media_id': media_id, 'caption': caption or ''})
+            status, payload = self._request('POST', f'/attachments?{query}')
+            if status != 404:
+                if status != 200:
+                    raise RuntimeError(payload.get('error', 'send failed'))
+                self.last_message_id = payload['id']
+                return True
+            self.media_ids.pop(media.digest, None)  # Server forgot it; upload inline below
+        with open(media.path, 'rb') as f:
+            data = f.read()
+        status, payload = self._request(
+            'POST', f"/attachments?{urlencode({'phone': self.phone, 'caption': caption or ''})}", data,
+            {'Content-Type': 'application/octet-stream'}
+        )
+        if status != 200:
+            self.log(f"Attachment upload failed: {payload.get('error')}", "error")
+            return False
+        self.last_message_id = payload['id']
+        return True
+
+    def wait_for_delivery(self, timeout):
+        return self.last_message_id is not None
+
+    def is_healthy(self):
+        try:
+            status, payload = self._request('GET', '/status')
+            return status == 200 and payload.get('logged_in', False)
+        except Exception:
+            return False
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake WhatsApp Web server for load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('FAKE_WHATSAPP_PORT', 8765)))
+    parser.add_argument('--chat-latency-ms', type=float, default=0)
+    parser.add_argument('--send-latency-ms', type=float, default=0)
+    parser.add_argument('--upload-latency-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--invalid-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeWhatsAppServer(
+        args.host, args.port, args.chat_latency_ms, args.send_latency_ms,
+        args.upload_latency_ms, args.failure_rate, args.invalid_rate
+    )
+    print(f"Fake WhatsApp listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
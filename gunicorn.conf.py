@@ -0,0 +1,21 @@
+"""Production server settings: gunicorn -c gunicorn.conf.py main:app"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Campaigns, the scheduler and the warm browsers live in the serving process, so exactly one worker
+# owns them; WEB_CONCURRENCY is ignored on purpose. Concurrency comes from threads, and each open
+# progress stream holds a thread for its lifetime.
+workers = 1
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# Workers are never recycled: that would kill running campaigns and their browsers
+max_requests = 0
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
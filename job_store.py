@@ -0,0 +1,415 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from config import CONFIG
+
+# Recipient statuses
+PENDING = 'pending'
+SENDING = 'sending'    # Claimed by a session; written through before the send happens
+SENT = 'sent'
+INVALID = 'invalid'
+FAILED = 'failed'
+UNKNOWN = 'unknown'    # Was being sent when the process died; never re-sent automatically
+
+# Errors of campaigns whose recipient list never finished loading; the stored list is partial
+LOAD_INTERRUPTED = 'Interrupted while loading recipients'  # The process stopped while the file streamed in
+LOAD_FAILED = 'Invalid recipients file'  # Prefix of the reason a file couldn't be read
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    file_name TEXT,
+    attachment_path TEXT,
+    settings TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    loading INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    retry_of TEXT,
+    next_run_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipients (
+    campaign_id TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    contact TEXT NOT NULL,
+    message TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    claimed_at REAL,
+    profile TEXT,
+    updated_at REAL,
+    PRIMARY KEY (campaign_id, row_index)
+);
+CREATE INDEX IF NOT EXISTS idx_recipients_status ON recipients (campaign_id, status);
+CREATE TABLE IF NOT EXISTS invalid_numbers (
+    contact TEXT PRIMARY KEY,
+    reason TEXT,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+class JobStore:
+    """SQLite-backed campaign and per-recipient state with batched checkpoints"""
+
+    def __init__(self, path=None, batch_size=None, flush_interval=None):
+        self.path = path or CONFIG['job_store_path']
+        self.batch_size = batch_size or CONFIG['checkpoint_batch_size']
+        self.flush_interval = flush_interval or CONFIG['checkpoint_interval']
+        self.invalid_cache_ttl = CONFIG['invalid_cache_days'] * 86400
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')  # WAL commits survive a process crash
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        # Loads run in this process, so a campaign still marked loading was cut short by a restart. It may
+        # already have been queued or sending its first chunks; either way its recipient list is incomplete
+        self.conn.execute(
+            "UPDATE campaigns SET status = 'failed', error = ?, loading = 0 WHERE loading = 1", (LOAD_INTERRUPTED,)
+        )
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.recipients_added = threading.Condition(self.lock)
+        self.pending_updates = []
+        self.last_flush = time.monotonic()
+
+    def _migrate(self):
+        """Add columns introduced after a database was first created"""
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(campaigns)')}
+        if 'priority' not in columns:
+            self.conn.execute('ALTER TABLE campaigns ADD COLUMN priority INTEGER NOT NULL DEFAULT 0')
+        if 'loading' not in columns:
+            self.conn.execute('ALTER TABLE campaigns ADD COLUMN loading INTEGER NOT NULL DEFAULT 0')
+        if 'error' not in columns:
+            self.conn.execute('ALTER TABLE campaigns ADD COLUMN error TEXT')
+        if 'retry_of' not in columns:
+            self.conn.execute('ALTER TABLE campaigns ADD COLUMN retry_of TEXT')
+        if 'next_run_at' not in columns:
+            self.conn.execute('ALTER TABLE campaigns ADD COLUMN next_run_at REAL')
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(recipients)')}
+        if 'claimed_at' not in columns:
+            self.conn.execute('ALTER TABLE recipients ADD COLUMN claimed_at REAL')
+        if 'profile' not in columns:
+            self.conn.execute('ALTER TABLE recipients ADD COLUMN profile TEXT')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_recipients_profile ON recipients (profile, status, updated_at)')
+
+    def create_campaign(self, recipients, attachment_path=None, settings=None, file_name=None, priority=0,
+                        loading=False, status='queued'):
+        """Store a campaign and its recipients, returning the campaign ID
+
+        Recipients are (contact, message) pairs, stored as pending, or (contact, message, status, error) rows.
+
+        With loading=True more recipients are expected through append_recipients until finish_loading.
+        """
+        campaign_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT INTO campaigns (id, file_name, attachment_path, settings, status, priority, total, loading, '
+                'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (campaign_id, file_name, attachment_path, json.dumps(settings or {}), status, priority,
+                 0, int(loading), now, now)
+            )
+            self._insert_recipients(campaign_id, 0, recipients)
+            self.conn.commit()
+        return campaign_id
+
+    def create_retry_campaign(self, campaign_id, statuses=(FAILED,)):
+        """Queue a new campaign with the recipients of campaign_id in the given statuses, returning its ID
+
+        Rows are copied inside SQLite, so large campaigns aren't read into memory. Raises KeyError
+        for an unknown campaign and returns None if no recipient matches.
+        """
+        now = time.time()
+        new_id = uuid.uuid4().hex[:12]
+        with self.lock:
+            self._flush_locked()
+            source = self.conn.execute('SELECT * FROM campaigns WHERE id = ?', (campaign_id,)).fetchone()
+            if source is None:
+                raise KeyError(campaign_id)
+            copied = self.conn.execute(
+                'INSERT INTO recipients (campaign_id, row_index, contact, message, status, updated_at) '
+                'SELECT ?, ROW_NUMBER() OVER (ORDER BY row_index) - 1, contact, message, ?, ? FROM recipients '
+                'WHERE campaign_id = ? AND status IN (SELECT value FROM json_each(?))',
+                (new_id, PENDING, now, campaign_id, json.dumps(list(statuses)))
+            ).rowcount
+            if not copied:
+                self.conn.rollback()
+                return None
+            self.conn.execute(
+                'INSERT INTO campaigns (id, file_name, attachment_path, settings, status, priority, total, retry_of, '
+                'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (new_id, source['file_name'], source['attachment_path'], source['settings'], 'queued',
+                 source['priority'], copied, campaign_id, now, now)
+            )
+            self.conn.commit()
+        return new_id
+
+    def iter_results(self, campaign_id, statuses=None, chunk_size=None):
+        """Per-recipient outcomes in row order, as lists of at most chunk_size rows
+
+        Each chunk is a separate short query, so sends can checkpoint while a large export streams.
+        """
+        chunk_size = chunk_size or CONFIG['report_chunk_size']
+        query = ('SELECT row_index, contact, message, status, error, attempts, claimed_at, updated_at '
+                 'FROM recipients WHERE campaign_id = ? AND row_index > ?')
+        if statuses:
+            query += ' AND status IN (SELECT value FROM json_each(?))'
+        query += ' ORDER BY row_index LIMIT ?'
+        with self.lock:
+            self._flush_locked()
+        after = -1
+        while True:
+            params = [campaign_id, after] + ([json.dumps(list(statuses))] if statuses else []) + [chunk_size]
+            with self.lock:
+                rows = [tuple(row) for row in self.conn.execute(query, params).fetchall()]
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+
+    def outcome_history(self, campaigns=5):
+        """{status: (recipients, attempts)} for recipients a session actually tried in the latest finished campaigns"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT status, COUNT(*), SUM(attempts) FROM recipients WHERE campaign_id IN '
+                "(SELECT id FROM campaigns WHERE status IN ('completed', 'stopped', 'paused', 'cancelled') "
+                'ORDER BY created_at DESC LIMIT ?) AND attempts > 0 AND status IN (?, ?, ?) GROUP BY status',
+                (campaigns, SENT, INVALID, FAILED)
+            ).fetchall()
+        return {status: (count, attempts) for status, count, attempts in rows}
+
+    def _insert_recipients(self, campaign_id, start, recipients):
+        now = time.time()
+        rows = [
+            (campaign_id, row_index, str(contact).strip(), str(message).strip() if message else '',
+             outcome[0] if outcome else PENDING, outcome[1] if outcome else None, now)
+            for row_index, (contact, message, *outcome) in enumerate(recipients, start)
+        ]
+        self.conn.executemany(
+            'INSERT INTO recipients (campaign_id, row_index, contact, message, status, error, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        self.conn.execute(
+            'UPDATE campaigns SET total = total + ?, updated_at = ? WHERE id = ?', (len(rows), now, campaign_id)
+        )
+
+    def append_recipients(self, campaign_id, recipients):
+        """Add the next chunk of a campaign that is still loading and wake runners waiting for it"""
+        with self.lock:
+            start = self.conn.execute(
+                'SELECT total FROM campaigns WHERE id = ?', (campaign_id,)
+            ).fetchone()['total']
+            self._insert_recipients(campaign_id, start, recipients)
+            self._flush_locked()
+            self.recipients_added.notify_all()
+
+    def finish_loading(self, campaign_id):
+        """Mark a campaign's recipient list as complete"""
+        with self.lock:
+            self.conn.execute('UPDATE campaigns SET loading = 0 WHERE id = ?', (campaign_id,))
+            self._flush_locked()
+            self.recipients_added.notify_all()
+
+    def wait_for_recipients(self, campaign_id, after, timeout=None):
+        """Recipients past row index after, waiting for the loader if there are none yet
+
+        Returns (rows, loading) with (row_index, contact, message, status) rows; loading is False
+        once no more rows will be appended.
+        """
+        with self.lock:
+            while True:
+                loading = bool(self.conn.execute(
+                    'SELECT loading FROM campaigns WHERE id = ?', (campaign_id,)
+                ).fetchone()['loading'])
+                rows = self.conn.execute(
+                    'SELECT row_index, contact, message, status FROM recipients '
+                    'WHERE campaign_id = ? AND row_index > ? ORDER BY row_index',
+                    (campaign_id, after)
+                ).fetchall()
+                if rows or not loading or not self.recipients_added.wait(timeout):
+                    return [tuple(row) for row in rows], loading
+
+    def get_campaign(self, campaign_id):
+        """Campaign row as a dict with per-status counts, or None"""
+        with self.lock:
+            row = self.conn.execute('SELECT * FROM campaigns WHERE id = ?', (campaign_id,)).fetchone()
+            if row is None:
+                return None
+            counts = self.conn.execute(
+                'SELECT status, COUNT(*) FROM recipients WHERE campaign_id = ? GROUP BY status', (campaign_id,)
+            ).fetchall()
+        campaign = dict(row)
+        campaign['settings'] = json.loads(campaign['settings'])
+        campaign['counts'] = {status: count for status, count in counts}
+        return campaign
+
+    def list_campaigns(self, status=None, limit=100):
+        """Most recent campaigns first, optionally filtered by status"""
+        query = 'SELECT * FROM campaigns'
+        params = []
+        if status:
+            query += ' WHERE status = ?'
+            params.append(status)
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        campaigns = []
+        for row in rows:
+            campaign = dict(row)
+            campaign['settings'] = json.loads(campaign['settings'])
+            campaigns.append(campaign)
+        return campaigns
+
+    def set_campaign_status(self, campaign_id, status, error=None, expected=None):
+        """Record a campaign's status and optional error; with expected, only if it is still in that status
+
+        Returns whether the campaign was updated.
+        """
+        query = 'UPDATE campaigns SET status = ?, error = COALESCE(?, error), updated_at = ? WHERE id = ?'
+        params = [status, error, time.time(), campaign_id]
+        if expected is not None:
+            query += ' AND status = ?'
+            params.append(expected)
+        with self.lock:
+            self._flush_locked()
+            updated = self.conn.execute(query, params).rowcount
+            self.conn.commit()
+        return bool(updated)
+
+    def schedule_campaign(self, campaign_id, run_at, expected=None):
+        """Park a campaign as scheduled until run_at (epoch seconds); with expected, only from that status"""
+        query = "UPDATE campaigns SET status = 'scheduled', next_run_at = ?, updated_at = ? WHERE id = ?"
+        params = [run_at, time.time(), campaign_id]
+        if expected is not None:
+            query += ' AND status = ?'
+            params.append(expected)
+        with self.lock:
+            self._flush_locked()
+            updated = self.conn.execute(query, params).rowcount
+            self.conn.commit()
+        return bool(updated)
+
+    def sent_since(self, profile, since):
+        """Messages a Chrome profile sent at or after since (epoch seconds), across every campaign"""
+        with self.lock:
+            self._flush_locked()
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM recipients WHERE profile = ? AND status = ? AND updated_at >= ?',
+                (profile, SENT, since)
+            ).fetchone()[0]
+
+    def prepare_resume(self, campaign_id):
+        """Park recipients caught mid-send by a crash and return the ones still pending
+
+        Returns (rows, counts, total, attempted) read together, so rows a loader appends later all come
+        after total. attempted counts recipients a session has claimed, unlike ones the loader skipped.
+        """
+        with self.lock:
+            self._flush_locked()
+            self.conn.execute(
+                'UPDATE recipients SET status = ?, updated_at = ? WHERE campaign_id = ? AND status = ?',
+                (UNKNOWN, time.time(), campaign_id, SENDING)
+            )
+            self.conn.commit()
+            rows = self.conn.execute(
+                'SELECT row_index, contact, message FROM recipients '
+                'WHERE campaign_id = ? AND status = ? ORDER BY row_index',
+                (campaign_id, PENDING)
+            ).fetchall()
+            counts = self.conn.execute(
+                'SELECT status, COUNT(*) FROM recipients WHERE campaign_id = ? GROUP BY status', (campaign_id,)
+            ).fetchall()
+            total = self.conn.execute('SELECT total FROM campaigns WHERE id = ?', (campaign_id,)).fetchone()['total']
+            attempted = self.conn.execute(
+                'SELECT COUNT(*) FROM recipients WHERE campaign_id = ? AND claimed_at IS NOT NULL', (campaign_id,)
+            ).fetchone()[0]
+        return [(row['row_index'], row['contact'], row['message']) for row in rows], dict(counts), total, attempted
+
+    def claim(self, campaign_id, row_index, profile=None):
+        """Durably mark a recipient as being sent by a profile, committing any buffered outcomes with it"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'UPDATE recipients SET status = ?, claimed_at = COALESCE(claimed_at, ?), profile = ?, updated_at = ? '
+                'WHERE campaign_id = ? AND row_index = ?',
+                (SENDING, now, profile, now, campaign_id, row_index)
+            )
+            self._flush_locked()
+
+    def record(self, campaign_id, row_index, status, attempts, error=None):
+        """Buffer a recipient's outcome; flushed in batches or on the next claim"""
+        with self.lock:
+            self.pending_updates.append((status, attempts, error, time.time(), campaign_id, row_index))
+            if (len(self.pending_updates) >= self.batch_size
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def known_invalid(self, contacts):
+        """The subset of contacts found not on WhatsApp within the last invalid_cache_ttl days"""
+        contacts = list(contacts)
+        if not contacts:
+            return set()
+        since = time.time() - self.invalid_cache_ttl
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT contact FROM invalid_numbers '
+                'WHERE contact IN (SELECT value FROM json_each(?)) AND checked_at >= ?',
+                (json.dumps(contacts), since)
+            ).fetchall()
+        return {row['contact'] for row in rows}
+
+    def forget_invalid(self, contacts):
+        """Drop numbers from the invalid cache, e.g. after they were fixed or joined WhatsApp; returns how many were cached"""
+        with self.lock:
+            cursor = self.conn.executemany('DELETE FROM invalid_numbers WHERE contact = ?', [(c,) for c in contacts])
+            self.conn.commit()
+        return cursor.rowcount
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self.pending_updates:
+            self.conn.executemany(
+                'UPDATE recipients SET status = ?, attempts = ?, error = ?, updated_at = ? '
+                'WHERE campaign_id = ? AND row_index = ?',
+                self.pending_updates
+            )
+            # Remember numbers WhatsApp reported as unregistered for later campaigns
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO invalid_numbers (contact, reason, checked_at) '
+                'SELECT contact, ?, ? FROM recipients WHERE campaign_id = ? AND row_index = ?',
+                [(error, updated_at, campaign_id, row_index)
+                 for status, _, error, updated_at, campaign_id, row_index in self.pending_updates
+                 if status == INVALID and error == 'invalid']
+            )
+            # A cached number that a retry got through to has joined WhatsApp since
+            self.conn.executemany(
+                'DELETE FROM invalid_numbers WHERE contact = '
+                '(SELECT contact FROM recipients WHERE campaign_id = ? AND row_index = ?)',
+                [(campaign_id, row_index)
+                 for status, _, _, _, campaign_id, row_index in self.pending_updates if status == SENT]
+            )
+            self.pending_updates = []
+        self.conn.commit()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            self.conn.close()
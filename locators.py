@@ -0,0 +1,70 @@
+"""
+Every WhatsApp Web element the Selenium transport touches, in one place.
+
+Locators are (strategy, value) pairs using Selenium's By strings, so they can be
+passed straight to find_element(*LOCATORS[name]). CSS is used wherever the match
+doesn't depend on text content. When WhatsApp changes its markup, this is the only
+file that should need updating; verify_screen() reports which entries went stale.
+"""
+
+CSS = 'css selector'
+XPATH = 'xpath'
+
+LOCATORS = {
+    'chat_list': (CSS, '#pane-side'),
+    'chat_panel': (CSS, '#main'),
+    'composer': (CSS, '#main div[role="textbox"][contenteditable="true"]'),
+    # The composer of a chat opened after the previous one was marked stale by in-page navigation
+    'fresh_composer': (CSS, '#main div[role="textbox"][contenteditable="true"]:not([data-bulk-stale])'),
+    'invalid_number': (XPATH, '//div[contains(text(), "not on WhatsApp") or contains(text(), "shared via url is invalid")]'),
+    'attach_button': (CSS, 'div[title="Attach"]'),
+    'file_input': (CSS, 'input[accept="*"]'),
+    'send_button': (CSS, 'span[data-icon="send"]'),
+    'caption_box': (CSS, 'div[contenteditable="true"][data-tab="10"]'),
+    'delivered': (CSS, 'span[data-icon="msg-dblcheck"]'),
+}
+
+# Locators that must match once a screen has loaded, checked to catch markup drift early
+SCREENS = {
+    'main': ['chat_list'],
+    'chat': ['chat_panel', 'composer'],
+}
+
+# Returns the first [state, strategy, value] entry of arguments[0] whose element is on the page
+PROBE_SCRIPT = """
+for (const [state, strategy, value] of arguments[0]) {
+  const found = strategy === 'xpath'
+    ? document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+    : document.querySelector(value);
+  if (found) return state;
+}
+return null;
+"""
+
+
+# Opens a chat inside the running app: marks the current composer stale, then clicks an
+# injected send?phone= link so WhatsApp's own link handling switches chats without a reload
+NAVIGATE_SCRIPT = """
+const [phone, composerSelector] = arguments;
+const app = document.querySelector('#app');
+if (!app || !document.querySelector('#pane-side')) return false;
+const composer = document.querySelector(composerSelector);
+if (composer) composer.setAttribute('data-bulk-stale', '1');
+const link = document.createElement('a');
+link.href = 'https://web.whatsapp.com/send?phone=' + encodeURIComponent(phone);
+link.style.display = 'none';
+app.appendChild(link);
+link.click();
+link.remove();
+return true;
+"""
+
+
+def probe(driver, states):
+    """Which of several page states is showing, in one script call; states are (state, locator name) pairs"""
+    return driver.execute_script(PROBE_SCRIPT, [[state, *LOCATORS[name]] for state, name in states])
+
+
+def verify_screen(driver, screen):
+    """Names of the screen's locators that match nothing on the current page"""
+    return [name for name in SCREENS[screen] if probe(driver, [(name, name)]) is None]
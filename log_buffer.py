@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import threading
+from array import array
+from itertools import islice
+from collections import deque
+
+
+class LogBuffer:
+    """Fixed-capacity ring buffer of structured log records; evicted records spill to a JSONL file"""
+
+    def __init__(self, capacity=500, spill_path=None):
+        self.capacity = capacity
+        self.records = deque(maxlen=capacity)
+        self.spill_path = spill_path
+        self.spill_file = None
+        self.spill_offsets = array('q')  # Byte offset of each spilled record; record seq is at index seq - 1
+        self.spill_size = 0
+        self.next_seq = 1
+        self.lock = threading.Lock()
+
+    def append(self, message, level='info', contact=None, event=None, session=None):
+        """Add a record and return it; the oldest record goes to disk once the buffer is full"""
+        record = {
+            'seq': 0,
+            'time': time.time(),
+            'level': level,
+            'event': event,
+            'contact': contact,
+            'session': session,
+            'message': message
+        }
+        with self.lock:
+            record['seq'] = self.next_seq
+            self.next_seq += 1
+            if len(self.records) == self.capacity:
+                self._spill(self.records[0])
+            self.records.append(record)
+        return record
+
+    def _spill(self, record):
+        if not self.spill_path:
+            return
+        if self.spill_file is None:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.spill_file = open(self.spill_path, 'wb')  # Sequence numbers restart each run
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        self.spill_file.write(line)
+        self.spill_offsets.append(self.spill_size)
+        self.spill_size += len(line)
+
+    @property
+    def last_seq(self):
+        return self.next_seq - 1
+
+    def since(self, seq=0, limit=None):
+        """Records with a sequence number after seq, oldest first, at most limit of them"""
+        with self.lock:
+            if seq >= self.next_seq or seq < 0:
+                seq = 0  # Cursor from an earlier run
+            first_seq = self.records[0]['seq'] if self.records else self.next_seq
+            older = []
+            if seq + 1 < first_seq:
+                if self.spill_offsets and os.path.exists(self.spill_path):
+                    if self.spill_file is not None:
+                        self.spill_file.flush()
+                    older = self._read_spilled(seq, first_seq, limit)
+                else:
+                    seq = first_seq - 1  # Dropped for good; resume at the oldest kept record
+            if limit is not None:
+                limit -= len(older)
+                if limit <= 0:
+                    return older
+            start = max(0, seq + 1 - first_seq) if not older else 0
+            stop = start + limit if limit is not None else None
+            return older + list(islice(self.records, start, stop))
+
+    def tail(self, limit):
+        """The most recent limit records"""
+        with self.lock:
+            start = max(0, len(self.records) - limit)
+            return list(islice(self.records, start, None))
+
+    def _read_spilled(self, seq, first_seq, limit):
+        """Spilled records after seq and before first_seq, read from the first one's offset on, not the file's start"""
+        count = min(first_seq, len(self.spill_offsets) + 1) - 1 - seq
+        if limit is not None:
+            count = min(count, limit)
+        with open(self.spill_path, 'rb') as f:
+            f.seek(self.spill_offsets[seq])
+            return [json.loads(f.readline()) for _ in range(count)]
+
+    @staticmethod
+    def format(record):
+        """Render a record the way the old string logs looked"""
+        return f"[{time.strftime('%H:%M:%S', time.localtime(record['time']))}] {record['message']}"
+
+    def close(self):
+        with self.lock:
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
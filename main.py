@@ -1,4 +1,6 @@
+import os
 from app import app
 
+# Production: gunicorn -c gunicorn.conf.py main:app
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
@@ -0,0 +1,97 @@
+import io
+import os
+import shutil
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from config import CONFIG
+
+# An attachment ready to send; digest identifies the content whatever the upload was called
+PreparedMedia = namedtuple('PreparedMedia', 'path digest size')
+
+# Formats Pillow re-encodes; GIFs are left alone so animations survive
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in 1MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MediaCache:
+    """Content-addressed store of attachments, with images shrunk to a target size once per file"""
+
+    def __init__(self, cache_dir=None, max_dimension=None, target_size=None, quality=None):
+        self.cache_dir = cache_dir or CONFIG['media_cache_dir']
+        self.max_dimension = max_dimension or CONFIG['media_max_dimension']
+        self.target_size = target_size or CONFIG['media_target_size']
+        self.quality = quality or CONFIG['media_jpeg_quality']
+        self.lock = threading.Lock()
+
+    def prepare(self, path):
+        """Hash an attachment and return its cached, compressed copy, processing it only the first time"""
+        digest = file_digest(path)
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in IMAGE_EXTENSIONS:
+            return PreparedMedia(path, digest, os.path.getsize(path))
+
+        entry_dir = os.path.join(self.cache_dir, digest[:32])
+        with self.lock:
+            cached = [name for name in os.listdir(entry_dir) if not name.startswith('.')] if os.path.isdir(entry_dir) else []
+            if not cached:
+                os.makedirs(entry_dir, exist_ok=True)
+                try:
+                    cached = [self._compress(path, entry_dir)]
+                except Exception as e:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    logging.error(f"Could not compress {os.path.basename(path)}, sending it as is: {str(e)}")
+                    return PreparedMedia(path, digest, os.path.getsize(path))
+        prepared = os.path.join(entry_dir, cached[0])
+        return PreparedMedia(prepared, digest, os.path.getsize(prepared))
+
+    def _compress(self, path, entry_dir):
+        """Resize and re-encode an image into entry_dir, returning the new file name"""
+        from PIL import Image, ImageOps
+
+        name, extension = os.path.splitext(os.path.basename(path))
+        with Image.open(path) as original:
+            image = ImageOps.exif_transpose(original)
+            resized = max(image.size) > self.max_dimension
+            if resized:
+                image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            if not resized and os.path.getsize(path) <= self.target_size:
+                # Already small enough; cache the original so it isn't looked at again
+                with open(path, 'rb') as f:
+                    data = f.read()
+            elif has_alpha:
+                data = self._encode(image, 'PNG', optimize=True)
+                extension = '.png'
+            else:
+                # Step JPEG quality down until the file fits the target size
+                image = image.convert('RGB')
+                quality = self.quality
+                data = self._encode(image, 'JPEG', quality=quality, optimize=True)
+                while len(data) > self.target_size and quality > 50:
+                    quality -= 10
+                    data = self._encode(image, 'JPEG', quality=quality, optimize=True)
+                extension = '.jpg'
+
+        file_name = name + extension
+        temp_path = os.path.join(entry_dir, '.' + file_name)
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, os.path.join(entry_dir, file_name))
+        logging.info(f"Cached {os.path.basename(path)} as {file_name} ({os.path.getsize(path)} -> {len(data)} bytes)")
+        return file_name
+
+    @staticmethod
+    def _encode(image, image_format, **options):
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **options)
+        return buffer.getvalue()
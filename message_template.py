@@ -0,0 +1,32 @@
+import re
+
+# {{ Field }} placeholders; the name is matched to a column case-insensitively
+PLACEHOLDER = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}')
+
+
+class MessageTemplate:
+    """A message with {{Column}} placeholders, parsed once and rendered a whole chunk at a time"""
+
+    def __init__(self, text):
+        self.text = text
+        self.parts = []   # Alternating literal text and field names; even indexes are literals
+        position = 0
+        for match in PLACEHOLDER.finditer(text):
+            self.parts.append(text[position:match.start()])
+            self.parts.append(match.group(1))
+            position = match.end()
+        self.parts.append(text[position:])
+        self.fields = list(dict.fromkeys(self.parts[1::2]))
+        # The same template as a str.format pattern over the field values, literal braces escaped
+        literals = [part.replace('{', '{{').replace('}', '}}') for part in self.parts[0::2]]
+        positions = [f'{{{self.fields.index(field)}}}' for field in self.parts[1::2]]
+        self.pattern = ''.join(literal + position for literal, position in zip(literals, positions + ['']))
+
+    def render_records(self, records):
+        """Turn (contact, message, *field values) records into (contact, rendered message) pairs
+
+        Loader records already hold cell text, so one str.format per row is cheaper than
+        building a DataFrame.
+        """
+        render = self.pattern.format
+        return [(record[0], render(*record[2:]).strip()) for record in records]
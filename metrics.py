@@ -0,0 +1,155 @@
+import json
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds, from a quick script call to a slow upload
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Recent durations kept per step for percentiles
+SAMPLE_SIZE = 2000
+
+# Window the messages-per-hour gauge is measured over
+RATE_WINDOW = 600
+
+
+class StepHistogram:
+    """Cumulative bucket counts for Prometheus plus a window of recent samples for percentiles"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.samples.append(seconds)
+
+    def percentiles(self):
+        """p50/p95/p99 of the recent samples, nearest rank"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {f'p{q}': round(ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))], 4) for q in (50, 95, 99)}
+
+
+class Metrics:
+    """Step timings, failure reasons and message counts for one campaign or the whole process
+
+    Everything recorded on a child is also recorded on its parent, so each campaign gets its own
+    report while /api/metrics keeps process-wide totals.
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.steps = {}
+        self.failures = {}
+        self.messages = {}
+        self.sent_times = deque()
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, step):
+        """Time the enclosed block as one observation of step, whether or not it raises"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(step, time.monotonic() - started)
+
+    def observe(self, step, seconds):
+        with self.lock:
+            self.steps.setdefault(step, StepHistogram()).observe(seconds)
+        if self.parent is not None:
+            self.parent.observe(step, seconds)
+
+    def count_failure(self, reason):
+        """Count one failed attempt by its reason (timeout, invalid, drift, error, ...)"""
+        with self.lock:
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+        if self.parent is not None:
+            self.parent.count_failure(reason)
+
+    def count_message(self, status):
+        """Count one recipient's final outcome"""
+        now = time.monotonic()
+        with self.lock:
+            self.messages[status] = self.messages.get(status, 0) + 1
+            if status == 'sent':
+                self.sent_times.append(now)
+        if self.parent is not None:
+            self.parent.count_message(status)
+
+    def messages_per_hour(self):
+        """Sent messages per hour over the last RATE_WINDOW seconds"""
+        now = time.monotonic()
+        with self.lock:
+            while self.sent_times and now - self.sent_times[0] > RATE_WINDOW:
+                self.sent_times.popleft()
+            sent = len(self.sent_times)
+        window = min(RATE_WINDOW, max(time.time() - self.started, 1))
+        return round(sent * 3600 / window, 1)
+
+    def report(self):
+        """JSON-friendly summary of every step, failure reason and outcome"""
+        with self.lock:
+            steps = {
+                step: dict(count=h.count, total_seconds=round(h.total, 3),
+                           mean_seconds=round(h.total / h.count, 4) if h.count else None, **h.percentiles())
+                for step, h in self.steps.items()
+            }
+            failures = dict(self.failures)
+            messages = dict(self.messages)
+        return {
+            'started': self.started,
+            'elapsed_seconds': round(time.time() - self.started, 1),
+            'messages_per_hour': self.messages_per_hour(),
+            'messages': messages,
+            'failures': failures,
+            'steps': steps
+        }
+
+    def write_report(self, path, **extra):
+        """Write report() plus extra fields to path as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.report(), **extra), f, indent=2)
+
+    def prometheus(self, active_campaigns=0):
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP whatsapp_step_duration_seconds Time spent in each phase of sending',
+            '# TYPE whatsapp_step_duration_seconds histogram'
+        ]
+        with self.lock:
+            for step, h in sorted(self.steps.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), h.counts):
+                    cumulative += count
+                    lines.append(f'whatsapp_step_duration_seconds_bucket{{step="{step}",le="{bound}"}} {cumulative}')
+                lines.append(f'whatsapp_step_duration_seconds_sum{{step="{step}"}} {h.total:.6f}')
+                lines.append(f'whatsapp_step_duration_seconds_count{{step="{step}"}} {h.count}')
+            lines += ['# HELP whatsapp_failures_total Failed send attempts by reason',
+                      '# TYPE whatsapp_failures_total counter']
+            lines += [f'whatsapp_failures_total{{reason="{reason}"}} {count}' for reason, count in sorted(self.failures.items())]
+            lines += ['# HELP whatsapp_messages_total Recipients finished by outcome',
+                      '# TYPE whatsapp_messages_total counter']
+            lines += [f'whatsapp_messages_total{{status="{status}"}} {count}' for status, count in sorted(self.messages.items())]
+        lines += [
+            '# HELP whatsapp_messages_per_hour Sent messages per hour over the last 10 minutes',
+            '# TYPE whatsapp_messages_per_hour gauge',
+            f'whatsapp_messages_per_hour {self.messages_per_hour()}',
+            '# HELP whatsapp_active_campaigns Campaigns currently sending',
+            '# TYPE whatsapp_active_campaigns gauge',
+            f'whatsapp_active_campaigns {active_campaigns}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide totals behind /api/metrics
+PROCESS_METRICS = Metrics()
@@ -0,0 +1,104 @@
+import time
+import random
+import threading
+
+# Failure reasons that say something about the account rather than the recipient
+THROTTLE_REASONS = ('timeout', 'error')
+
+
+class AdaptivePacer:
+    """Token bucket with jitter whose rate adapts to send latency and failure signals"""
+
+    def __init__(self, config):
+        self.base_rate = config.get('messages_per_hour', 0) / 3600.0
+        self.max_rate = max(config.get('max_messages_per_hour', 0) / 3600.0, self.base_rate)
+        self.min_rate = min(config.get('min_messages_per_hour', 0) / 3600.0, self.base_rate)
+        self.capacity = max(1, config.get('pacing_burst', 1))
+        self.jitter = config.get('pacing_jitter', 0.0)
+        self.latency_target = config.get('latency_target', 15)
+        self.ban_threshold = config.get('ban_failure_threshold', 3)
+        self.ban_cooldown = config.get('ban_cooldown', 300)
+        self.retry_delay = config.get('retry_delay', 2)
+        self.max_retry_delay = config.get('max_retry_delay', 60)
+        self.rate = self.base_rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.latency = None
+        self.lock = threading.Lock()
+
+    @property
+    def unlimited(self):
+        return self.base_rate <= 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_next(self):
+        """Seconds until the next send slot opens, without jitter"""
+        if self.unlimited:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, (1.0 - self.tokens) / self.rate)
+            return max(wait, self.cooldown_until - now)
+
+    def acquire(self, cancel=None):
+        """Block until a send slot is available or cancel (a CancelToken) fires; returns the seconds waited"""
+        if self.unlimited:
+            return 0.0
+        wait = self.time_until_next()
+        if wait > 0 and self.jitter:
+            wait *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if cancel is not None:
+            cancel.wait(wait)
+        elif wait > 0:
+            time.sleep(wait)
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1.0  # May go negative after jitter, which keeps the average rate
+        return wait
+
+    def record_success(self, latency):
+        """Speed up additively while sends stay fast, ease off when they slow down"""
+        with self.lock:
+            self.consecutive_failures = 0
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if self.unlimited:
+                return
+            if self.latency <= self.latency_target:
+                self.rate = min(self.max_rate, self.rate + self.base_rate * 0.05)
+            else:
+                self.rate = max(self.min_rate, self.rate * 0.9)
+
+    def record_failure(self, reason):
+        """Back off multiplicatively on throttle-like failures; returns True on a ban signal"""
+        if reason not in THROTTLE_REASONS:
+            return False  # "Not on WhatsApp" says nothing about our pace
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.unlimited:
+                return False
+            self.rate = max(self.min_rate, self.rate * 0.7)
+            if self.consecutive_failures >= self.ban_threshold:
+                self.rate = self.min_rate
+                self.cooldown_until = time.monotonic() + self.ban_cooldown
+                self.consecutive_failures = 0
+                return True
+            return False
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with jitter before retry number attempt + 1"""
+        delay = min(self.max_retry_delay, self.retry_delay * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def get_state(self):
+        with self.lock:
+            return {
+                'messages_per_hour': round(self.rate * 3600, 1) if not self.unlimited else None,
+                'avg_send_latency': round(self.latency, 2) if self.latency is not None else None,
+                'cooling_down': self.cooldown_until > time.monotonic()
+            }
@@ -0,0 +1,102 @@
+import re
+import pandas as pd
+from config import CONFIG
+from job_store import PENDING, INVALID
+
+# Reasons recorded on recipients skipped before sending
+INVALID_FORMAT = 'invalid_format'
+KNOWN_INVALID = 'known_invalid'    # Found "not on WhatsApp" by an earlier campaign
+
+# E.164 allows at most 15 digits; real numbers are never shorter than 8 including the country code
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+
+NON_DIGITS = re.compile(r'\D')
+SEPARATORS = str.maketrans('', '', '+-() .')  # What people type between digits; deleted without a regex
+
+
+def normalize_numbers(raw, country_code=None, national_length=None):
+    """E.164 normalization of a Series of typed numbers to country-code-first digits
+
+    Returns (numbers, valid); numbers written with a leading + or 00 are taken as international,
+    anything else of exactly national_length digits gets country_code prepended. One pass of
+    plain string methods per number; a chain of Series.str calls walks the column ten times.
+    """
+    country_code = CONFIG['default_country_code'] if country_code is None else country_code
+    national_length = CONFIG['national_number_length'] if national_length is None else national_length
+    numbers, valid = [], []
+    for value in raw.tolist():
+        text = str(value).strip()
+        double_zero = text.startswith('00')
+        digits = text.translate(SEPARATORS)
+        if not digits.isascii() or not digits.isdigit():
+            digits = NON_DIGITS.sub('', digits)
+        if double_zero:
+            digits = digits[2:]
+        national = not (double_zero or text.startswith('+'))
+        if national:
+            # National numbers lose their trunk prefix and gain the default country code
+            national_digits = digits.lstrip('0')
+            national = len(national_digits) <= national_length
+            if national and len(national_digits) == national_length and country_code:
+                digits, national = country_code + national_digits, False
+        numbers.append(digits)
+        valid.append(MIN_DIGITS <= len(digits) <= MAX_DIGITS and not digits.startswith('0') and not national)
+    return pd.Series(numbers, index=raw.index, dtype=object), pd.Series(valid, index=raw.index, dtype=bool)
+
+
+class RecipientCleaner:
+    """Normalizes, deduplicates and pre-validates recipient chunks before they are stored"""
+
+    def __init__(self, job_store=None, country_code=None, national_length=None):
+        self.job_store = job_store
+        self.country_code = country_code
+        self.national_length = national_length
+        self.seen = set()
+        self.duplicates = 0
+        self.invalid = 0
+        self.known_invalid = 0
+
+    def clean(self, records):
+        """Turn (contact, message) records into (contact, message, status, error) rows
+
+        Duplicates of an earlier row are dropped; malformed numbers and numbers cached as
+        not on WhatsApp come back already marked invalid so no session ever opens them.
+        """
+        if not records:
+            return []
+        chunk = pd.DataFrame(records, columns=['Contact', 'Message'])
+        numbers, valid = normalize_numbers(chunk['Contact'], self.country_code, self.national_length)
+        chunk['Contact'] = numbers.where(valid, chunk['Contact'].astype(str).str.strip())
+        chunk['Error'] = None
+        chunk.loc[~valid, 'Error'] = INVALID_FORMAT
+
+        # Keep the first row for each number, across chunks as well as within this one
+        # A set lookup per row; Series.isin would copy the whole growing set into an array every chunk.
+        # Lists rather than Series iteration, which boxes every element
+        seen = self.seen
+        earlier = pd.Series([contact in seen for contact in chunk['Contact'].tolist()], index=chunk.index)
+        duplicate = chunk['Contact'].duplicated() | earlier
+        self.duplicates += int(duplicate.sum())
+        chunk = chunk[~duplicate]
+        seen.update(chunk['Contact'].tolist())
+
+        if self.job_store is not None:
+            cached = chunk['Contact'].isin(self.job_store.known_invalid(chunk.loc[chunk['Error'].isna(), 'Contact']))
+            chunk.loc[cached, 'Error'] = KNOWN_INVALID
+            self.known_invalid += int(cached.sum())
+        self.invalid += int((chunk['Error'] == INVALID_FORMAT).sum())
+
+        status = chunk['Error'].isna().map({True: PENDING, False: INVALID})
+        return list(zip(chunk['Contact'].tolist(), chunk['Message'].tolist(), status.tolist(), chunk['Error'].tolist()))
+
+    def summary(self):
+        """One line describing what was dropped or skipped, or None if nothing was"""
+        parts = []
+        if self.duplicates:
+            parts.append(f"{self.duplicates} duplicate(s) removed")
+        if self.invalid:
+            parts.append(f"{self.invalid} malformed number(s) skipped")
+        if self.known_invalid:
+            parts.append(f"{self.known_invalid} number(s) already known not to be on WhatsApp skipped")
+        return ", ".join(parts) or None
@@ -0,0 +1,47 @@
+import threading
+from collections import namedtuple
+
+# One consistent view of a campaign's counters; current is always success + failure
+ProgressSnapshot = namedtuple('ProgressSnapshot', 'total success_count failure_count')
+
+
+class ProgressState:
+    """Campaign counters published as immutable snapshots
+
+    Writers serialize on a lock and swap in a new ProgressSnapshot; readers just take the
+    current reference, so any number of request threads get consistent counters without
+    locking or ever seeing a half-applied update.
+    """
+
+    def __init__(self, total=0, success_count=0, failure_count=0):
+        self.snapshot = ProgressSnapshot(total, success_count, failure_count)
+        self.lock = threading.Lock()
+
+    def reset(self, total, success_count=0, failure_count=0):
+        with self.lock:
+            self.snapshot = ProgressSnapshot(total, success_count, failure_count)
+
+    def record(self, success):
+        """Count one finished recipient"""
+        with self.lock:
+            total, success_count, failure_count = self.snapshot
+            if success:
+                success_count += 1
+            else:
+                failure_count += 1
+            self.snapshot = ProgressSnapshot(total, success_count, failure_count)
+
+    def grow_total(self, total):
+        """Raise the total as a still-loading file adds recipients"""
+        with self.lock:
+            if total > self.snapshot.total:
+                self.snapshot = self.snapshot._replace(total=total)
+
+    def as_dict(self):
+        snapshot = self.snapshot
+        return {
+            'current': snapshot.success_count + snapshot.failure_count,
+            'total': snapshot.total,
+            'success_count': snapshot.success_count,
+            'failure_count': snapshot.failure_count
+        }
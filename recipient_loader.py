@@ -0,0 +1,199 @@
+import os
+import csv
+import logging
+import threading
+from itertools import chain, islice
+from config import CONFIG
+from job_store import LOAD_FAILED
+
+# Header names recognised as the contact column
+CONTACT_COLUMNS = ['contact', 'phone', 'number', 'mobile']
+
+# Upload formats the loader can stream
+SUPPORTED_FORMATS = ['xlsx', 'xls', 'csv', 'parquet']
+
+
+def _cell_text(value):
+    """Render a cell the way a person typed it; whole-number floats lose their '.0'"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ''
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+
+class RecipientLoader:
+    """Streams (contact, message) records out of an Excel, CSV or Parquet file in chunks"""
+
+    def __init__(self, file_path, chunk_size=None, log=None):
+        self.file_path = file_path
+        self.chunk_size = chunk_size or CONFIG['loader_chunk_size']
+        self.log = log
+        self.format = os.path.splitext(file_path)[1].lstrip('.').lower()
+        if self.format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported recipients file format: .{self.format}")
+        self.workbook = None
+        self.rows = self._open()
+        self.header = [str(cell).strip() if cell is not None else '' for cell in next(self.rows, None) or []]
+        if not any(self.header):
+            self.close()
+            raise ValueError("Recipients file is empty")
+        self.contact_index = self._find_contact_column()
+        self.message_index = self.header.index('Message') if 'Message' in self.header else None
+        self.field_indexes = []
+        self.rows_read = 0
+        self.loaded = 0
+
+    def _open(self):
+        """Row iterator over the raw file, header row first"""
+        if self.format == 'xlsx':
+            import openpyxl
+            self.workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+            return self.workbook.active.iter_rows(values_only=True)
+        if self.format == 'csv':
+            self.workbook = open(self.file_path, newline='', encoding='utf-8-sig')
+            return csv.reader(self.workbook)
+        if self.format == 'parquet':
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ValueError("Parquet recipients files need pyarrow installed")
+            parquet = pq.ParquetFile(self.file_path)
+            return self._parquet_rows(parquet)
+        # Legacy .xls has no streaming reader; fall back to one pandas parse
+        import pandas as pd
+        df = pd.read_excel(self.file_path, dtype=object)
+        return chain([list(df.columns)], df.itertuples(index=False, name=None))
+
+    def _parquet_rows(self, parquet):
+        yield parquet.schema_arrow.names
+        for batch in parquet.iter_batches(batch_size=self.chunk_size):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    def _find_contact_column(self):
+        for index, name in enumerate(self.header):
+            if name.lower() in CONTACT_COLUMNS:
+                return index
+        # Use first column if no contact column found
+        if self.log is not None:
+            self.log(f"No 'Contact' column found. Using '{self.header[0]}' column")
+        return 0
+
+    def select_fields(self, fields):
+        """Also yield these columns (matched case-insensitively) after contact and message; returns the missing ones"""
+        columns = {name.lower(): index for index, name in reversed(list(enumerate(self.header)))}
+        columns.setdefault('contact', self.contact_index)
+        self.field_indexes = [columns.get(field.lower()) for field in fields]
+        return [field for field, index in zip(fields, self.field_indexes) if index is None]
+
+    def __iter__(self):
+        """Raw (contact, message, *selected fields) records as typed; rows with an empty contact cell are skipped"""
+        contact_index, message_index, field_indexes = self.contact_index, self.message_index, self.field_indexes
+        text = str if self.format == 'csv' else _cell_text  # CSV cells are already text, never None or numbers
+        for row in self.rows:
+            self.rows_read += 1
+            width = len(row)
+            if contact_index >= width:
+                continue
+            contact = text(row[contact_index]).strip()
+            if not contact:
+                continue
+            message = text(row[message_index]).strip() if message_index is not None and message_index < width else ''
+            self.loaded += 1
+            if field_indexes:
+                yield (contact, message, *[
+                    text(row[index]) if index is not None and index < width else '' for index in field_indexes
+                ])
+            else:
+                yield contact, message
+
+    def chunks(self):
+        """Lists of at most chunk_size records, closing the file once it is exhausted"""
+        records = iter(self)
+        try:
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+
+def prepared_chunks(loader, cleaner, template=None):
+    """Loader chunks rendered through template (if any) and cleaned, ready to store"""
+    for chunk in loader.chunks():
+        if template is not None:
+            chunk = template.render_records(chunk)
+        yield cleaner.clean(chunk)
+
+
+def open_recipients(path, template_text='', chunk_size=None):
+    """Open a recipients file with the template's fields selected; ValueError if any are missing
+
+    Returns (loader, MessageTemplate or None).
+    """
+    from message_template import MessageTemplate
+    template = MessageTemplate(template_text) if template_text.strip() else None
+    loader = RecipientLoader(path, chunk_size)
+    if template is not None:
+        missing = loader.select_fields(template.fields)
+        if missing:
+            loader.close()
+            raise ValueError(f"Template fields not found in the file: {', '.join(missing)}")
+    return loader, template
+
+
+def start_campaign_load(path, job_store, on_ready, attachment_path=None, settings=None, file_name=None, priority=0,
+                        template_text=''):
+    """Create a campaign in 'loading' status and parse its file on a background thread
+
+    Once the first cleaned chunk is stored the campaign becomes 'queued' and on_ready(campaign_id)
+    is called; the rest of the file keeps streaming in behind it. A file that can't be read, has
+    no valid contacts or breaks partway through leaves the campaign 'failed' with the reason in
+    its error, even if it was already queued or sending.
+    Returns the campaign ID straight away.
+    """
+    from phone_numbers import RecipientCleaner
+    campaign_id = job_store.create_campaign([], attachment_path, settings, file_name, priority,
+                                            loading=True, status='loading')
+
+    def _load():
+        loader = None
+        try:
+            loader, template = open_recipients(path, template_text)
+            cleaner = RecipientCleaner(job_store)
+            chunks = prepared_chunks(loader, cleaner, template)
+            first = next(chunks, [])
+            if not first:
+                raise ValueError("Recipients file is empty or has no valid contacts")
+            job_store.append_recipients(campaign_id, first)
+            # Paused or cancelled while the first chunk was parsed: keep loading, just don't queue it
+            if job_store.set_campaign_status(campaign_id, 'queued', expected='loading'):
+                on_ready(campaign_id)
+            for chunk in chunks:
+                if chunk:
+                    job_store.append_recipients(campaign_id, chunk)
+            summary = cleaner.summary()
+            logging.info(f"Loaded {loader.loaded} recipients for campaign {campaign_id}" + (f": {summary}" if summary else ""))
+        except Exception as e:
+            logging.error(f"Loading recipients for campaign {campaign_id} stopped early: {str(e)}")
+            # Already queued or sending the rows read so far: fail it anyway, rather than quietly send a truncated list
+            job_store.set_campaign_status(campaign_id, 'failed', f"{LOAD_FAILED}: {str(e)}")
+        finally:
+            if loader is not None:
+                loader.close()
+            job_store.finish_loading(campaign_id)
+
+    thread = threading.Thread(target=_load)
+    thread.daemon = True
+    thread.start()
+    return campaign_id
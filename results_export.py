@@ -0,0 +1,100 @@
+import io
+import os
+import csv
+import tempfile
+from datetime import datetime, timezone
+from job_store import PENDING, SENDING
+
+# Report formats, with their content types
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+REPORT_COLUMNS = ['row', 'contact', 'status', 'failure_reason', 'attempts', 'first_attempt_at', 'finished_at', 'message']
+
+# Bytes per block when streaming a finished XLSX/Parquet file
+BLOCK_SIZE = 1024 * 1024
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def report_rows(chunks):
+    """Job store result chunks as report rows in REPORT_COLUMNS order"""
+    for chunk in chunks:
+        yield [
+            (row_index + 1, contact, status, error or '', attempts, _timestamp(claimed_at),
+             _timestamp(finished_at) if status not in (PENDING, SENDING) else '', message)
+            for row_index, contact, message, status, error, attempts, claimed_at, finished_at in chunk
+        ]
+
+
+def _csv_blocks(rows):
+    yield '\ufeff'.encode('utf-8')  # BOM so Excel opens non-Latin messages correctly
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REPORT_COLUMNS)
+    for chunk in rows:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _file_blocks(write, suffix):
+    """Build a report with write(path) into a temporary file, then stream and delete it"""
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    os.close(handle)
+    try:
+        write(path)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+                yield block
+    finally:
+        os.remove(path)
+
+
+def _write_xlsx(rows, path):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)  # Rows go straight to disk instead of a cell tree
+    sheet = workbook.create_sheet('Results')
+    sheet.append(REPORT_COLUMNS)
+    for chunk in rows:
+        for row in chunk:
+            sheet.append(row)
+    workbook.save(path)
+
+
+def _write_parquet(rows, path, pa, pq):
+    schema = pa.schema([
+        ('row', pa.int64()), ('contact', pa.string()), ('status', pa.string()), ('failure_reason', pa.string()),
+        ('attempts', pa.int64()), ('first_attempt_at', pa.string()), ('finished_at', pa.string()), ('message', pa.string())
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in rows:
+            writer.write_table(pa.Table.from_pylist([dict(zip(REPORT_COLUMNS, row)) for row in chunk], schema=schema))
+
+
+def export_report(chunks, file_format):
+    """Iterator of report file bytes for job store result chunks, written one chunk at a time
+
+    Raises ValueError for an unknown format or a missing optional dependency, before anything is read.
+    """
+    rows = report_rows(chunks)
+    if file_format == 'csv':
+        return _csv_blocks(rows)
+    if file_format == 'xlsx':
+        return _file_blocks(lambda path: _write_xlsx(rows, path), '.xlsx')
+    if file_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet reports need pyarrow installed")
+        return _file_blocks(lambda path: _write_parquet(rows, path, pa, pq), '.parquet')
+    raise ValueError(f"Unsupported report format: {file_format}")
@@ -0,0 +1,361 @@
+import os
+import time
+import logging
+from selenium import webdriver
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.service import Service
+from locators import LOCATORS, NAVIGATE_SCRIPT, probe, verify_screen
+from cancellation import Cancelled
+from transport import BaseTransport, CHAT_READY, CHAT_INVALID, CHAT_TIMEOUT, CHAT_DRIFT, resolve_chromedriver_path, process_tree_rss_mb
+
+# Puts a whole message into WhatsApp's contenteditable composer in one call: a synthetic paste
+# first (the editor turns newlines into line breaks itself), then execCommand('insertText').
+# Returns the method that worked, or null if the box doesn't hold the text afterwards.
+INSERT_TEXT_SCRIPT = """
+const box = arguments[0], text = arguments[1];
+const expected = text.replace(/\\s+/g, '');
+const inserted = () => box.innerText.replace(/\\s+/g, '') === expected;
+const clear = () => { box.focus(); document.execCommand('selectAll', false, null); document.execCommand('delete', false, null); };
+clear();
+const data = new DataTransfer();
+data.setData('text/plain', text);
+box.dispatchEvent(new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true}));
+if (inserted()) return 'paste';
+clear();
+document.execCommand('insertText', false, text);
+if (inserted()) return 'insertText';
+clear();
+return null;
+"""
+
+# States the chat probe looks for, first match wins
+CHAT_STATES = [(CHAT_READY, 'fresh_composer'), (CHAT_INVALID, 'invalid_number'), ('panel', 'chat_panel')]
+
+class SeleniumTransport(BaseTransport):
+    """Drives web.whatsapp.com through Chrome WebDriver"""
+
+    name = 'selenium'
+
+    def __init__(self, config, log=None):
+        super().__init__(config, log)
+        self.driver = None
+        self.service = None
+        self.chat_verified = False
+        self.in_page_failures = 0     # Consecutive in-page navigations that had to fall back
+        self.needs_reload = False     # A dialog may still be open after an invalid number
+        self.navigation = {'in_page': [0, 0.0], 'reload': [0, 0.0], 'fallbacks': 0}
+
+    def start(self):
+        """Initialize Chrome WebDriver with profile support"""
+        self.log("Initializing Chrome WebDriver...")
+        options = webdriver.ChromeOptions()
+
+        # Add existing profile configuration
+        user_data_dir = self.config.get('user_data_dir', '')
+        profile_name = self.config.get('profile_name', 'Default')
+
+        if user_data_dir and os.path.exists(user_data_dir):
+            if profile_name and profile_name != 'Default':
+                profile_path = os.path.join(user_data_dir, profile_name)
+            else:
+                profile_path = user_data_dir
+            options.add_argument(f'--user-data-dir={profile_path}')
+            self.log(f"Using Chrome profile: {profile_path}")
+
+        # Chrome options for automation
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-infobars')
+        options.add_argument('--disable-notifications')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--log-level=3')
+        options.add_experimental_option('excludeSwitches', ['enable-logging'])
+        lean = self.config.get('browser_mode', 'full') == 'lean'
+        if lean:
+            self._add_lean_options(options)
+        else:
+            options.add_argument('--start-maximized')
+
+        try:
+            self.service = Service(resolve_chromedriver_path(self.config))
+            self.driver = webdriver.Chrome(service=self.service, options=options)
+            if lean:
+                # WhatsApp Web turns away browsers that announce themselves as headless
+                user_agent = self.driver.execute_script('return navigator.userAgent')
+                self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+                    'userAgent': user_agent.replace('HeadlessChrome', 'Chrome')
+                })
+            self.log(f"Chrome WebDriver initialized successfully{' (lean headless mode)' if lean else ''}")
+            return True
+        except Exception as e:
+            self.log(f"Failed to initialize WebDriver: {str(e)}", "error")
+            return False
+
+    def _add_lean_options(self, options):
+        """Headless Chrome trimmed to what sending needs, to fit more sessions on one host"""
+        options.add_argument('--headless=new')
+        options.add_argument(f"--window-size={self.config['window_size']}")
+        options.add_argument(f"--renderer-process-limit={self.config['renderer_process_limit']}")
+        options.add_argument(f"--js-flags=--max-old-space-size={self.config['js_heap_limit_mb']}")
+        options.add_argument('--autoplay-policy=user-gesture-required')
+        options.add_argument('--force-prefers-reduced-motion')  # WhatsApp skips its UI animations
+        options.add_argument('--mute-audio')
+        # Headless pages count as hidden; keep WhatsApp's timers and sockets running at full speed
+        options.add_argument('--disable-background-timer-throttling')
+        options.add_argument('--disable-renderer-backgrounding')
+        options.add_argument('--disable-backgrounding-occluded-windows')
+        for flag in ('--disable-extensions', '--disable-background-networking', '--disable-component-update',
+                     '--disable-default-apps', '--disable-sync', '--no-first-run', '--disable-translate'):
+            options.add_argument(flag)
+        options.add_argument('--disable-features=Translate,MediaRouter,OptimizationHints,BackForwardCache')
+        if self.config.get('block_images', True):
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    def memory_usage_mb(self):
+        """Resident memory of chromedriver and every browser process under it, or None off Linux"""
+        process = self.service.process if self.service is not None else None
+        return process_tree_rss_mb(process.pid) if process is not None else None
+
+    def login(self):
+        """Login to WhatsApp Web"""
+        self.log("Connecting to WhatsApp Web...")
+        if self.driver is None:
+            self.log("WebDriver not initialized", "error")
+            return False
+        self.driver.get('https://web.whatsapp.com')
+
+        # Check if already logged in
+        try:
+            WebDriverWait(self.driver, 15).until(
+                EC.presence_of_element_located(LOCATORS['chat_list'])
+            )
+            self.log("Using existing WhatsApp session")
+            return self.check_locators()
+        except TimeoutException:
+            self.log("No existing session found - QR scan required")
+            if self.config.get('browser_mode', 'full') == 'lean':
+                self.log("The QR code can't be scanned in lean headless mode; log this profile in once with BROWSER_MODE=full", "error")
+                return False
+
+        # Wait for QR scan
+        self.log("Please scan QR code in the browser window...")
+        try:
+            WebDriverWait(self.driver, 120).until(
+                EC.presence_of_element_located(LOCATORS['chat_list'])
+            )
+            self.log("Login successful!")
+            return self.check_locators()
+        except TimeoutException:
+            self.log("Login timed out. Please try again.", "error")
+            return False
+
+    def check_locators(self):
+        """Fail at startup, not per contact, if WhatsApp's markup no longer matches locators.py"""
+        missing = verify_screen(self.driver, 'main')
+        if missing:
+            self.log(f"WhatsApp Web markup changed, locators not found: {', '.join(missing)}", "error")
+            return False
+        # Chat locators can only be checked inside a chat; a known-good number makes that happen now
+        check_phone = self.config.get('drift_check_phone')
+        if check_phone:
+            state = self.open_chat(check_phone)
+            if state == CHAT_DRIFT:
+                return False
+            if state == CHAT_TIMEOUT:
+                self.log(f"Locator check chat {check_phone} did not load; checking on the first send instead")
+        return True
+
+    def open_chat(self, contact):
+        """Open the chat inside the running app when possible, reloading the page only as a fallback"""
+        self.cancel.check()
+        if (self.config.get('navigation_mode', 'in_page') == 'in_page' and not self.needs_reload
+                and self.in_page_failures < self.config['in_page_max_failures']):
+            started = time.monotonic()
+            state = self._open_chat_in_page(contact)
+            if state is not None:
+                self.in_page_failures = 0
+                self._record_navigation('in_page', started, state)
+                return state
+            self.in_page_failures += 1
+            self.navigation['fallbacks'] += 1
+            if self.in_page_failures == self.config['in_page_max_failures']:
+                self.log("In-page navigation keeps failing, reloading WhatsApp Web for each chat instead", "error")
+
+        started = time.monotonic()
+        self.driver.get(f'https://web.whatsapp.com/send?phone={contact}')
+        self.needs_reload = False
+        state = self._wait_for_chat(self.config['chat_load_timeout'], detect_drift=True)
+        self._record_navigation('reload', started, state)
+        return state
+
+    def _open_chat_in_page(self, contact):
+        """Switch chats without a reload; None means it didn't work and the caller should reload"""
+        if not self.driver.execute_script(NAVIGATE_SCRIPT, contact, LOCATORS['composer'][1]):
+            return None
+        state = self._wait_for_chat(self.config['in_page_timeout'])
+        if state == CHAT_INVALID:
+            self.needs_reload = True  # Clears the "invalid number" dialog before the next chat
+        return None if state == CHAT_TIMEOUT else state
+
+    def _wait_for_chat(self, timeout, detect_drift=False):
+        """Poll one combined probe until the chat is ready, invalid or clearly broken"""
+        deadline = time.monotonic() + timeout
+        panel_since = None
+        while True:
+            state = probe(self.driver, CHAT_STATES)
+            if state == CHAT_INVALID:
+                return CHAT_INVALID
+            if state == CHAT_READY:
+                return self._verify_chat()
+            now = time.monotonic()
+            if state == 'panel' and detect_drift:
+                # The chat opened but nothing we know how to use is in it
+                panel_since = panel_since or now
+                if now - panel_since >= self.config['drift_grace']:
+                    self.log(f"WhatsApp Web markup changed, locators not found: {', '.join(verify_screen(self.driver, 'chat'))}", "error")
+                    return CHAT_DRIFT
+            if now >= deadline:
+                return CHAT_TIMEOUT
+            if self.cancel.wait(self.config['probe_interval']):
+                raise Cancelled()
+
+    def _record_navigation(self, mode, started, state):
+        """Track time-to-textbox per navigation mode"""
+        elapsed = time.monotonic() - started
+        if state == CHAT_READY:
+            self.navigation[mode][0] += 1
+            self.navigation[mode][1] += elapsed
+        logging.debug(f"Chat opened by {mode} navigation in {elapsed:.2f}s ({state})")
+
+    def get_stats(self):
+        """Average time-to-textbox for each navigation mode"""
+        stats = {'navigation_fallbacks': self.navigation['fallbacks']}
+        for mode in ('in_page', 'reload'):
+            count, total = self.navigation[mode]
+            stats[f'{mode}_chats'] = count
+            stats[f'{mode}_time_to_textbox'] = round(total / count, 3) if count else None
+        return stats
+
+    def _verify_chat(self):
+        """Check the chat screen's locators once per browser, the first time a chat opens"""
+        if not self.chat_verified:
+            missing = verify_screen(self.driver, 'chat')
+            if missing:
+                self.log(f"WhatsApp Web markup changed, locators not found: {', '.join(missing)}", "error")
+                return CHAT_DRIFT
+            self.chat_verified = True
+        return CHAT_READY
+
+    def send_text(self, message):
+        """Send text message"""
+        self.cancel.check()
+
+        # Find message input box
+        text_box = WebDriverWait(self.driver, 10).until(
+            EC.element_to_be_clickable(LOCATORS['composer'])
+        )
+
+        # Insert the whole message in one script call where the editor accepts it
+        if self.config.get('text_input_mode', 'paste') == 'paste' and self.insert_text(text_box, message):
+            text_box.send_keys(Keys.ENTER)
+            return True
+
+        # Fall back to typing it; clear and send message
+        text_box.send_keys(Keys.CONTROL + "a")
+        text_box.send_keys(Keys.DELETE)
+
+        # Handle multiline messages
+        lines = message.split('\n')
+        for i, line in enumerate(lines):
+            text_box.send_keys(line)
+            if i < len(lines) - 1:  # Not the last line
+                text_box.send_keys(Keys.SHIFT + Keys.ENTER)
+
+        # Send message
+        text_box.send_keys(Keys.ENTER)
+        return True
+
+    def insert_text(self, text_box, message):
+        """Replace the composer's contents with message in one WebDriver call, False if it didn't take"""
+        try:
+            return self.driver.execute_script(INSERT_TEXT_SCRIPT, text_box, message) is not None
+        except Exception as e:
+            logging.debug(f"Bulk text insertion failed, typing instead: {str(e)}")
+            return False
+
+    def send_attachment(self, media, caption):
+        """Send attachment with optional caption"""
+        self.cancel.check()
+        try:
+            if not self._upload_attachment(media):
+                return False
+        except Cancelled:
+            self.needs_reload = True  # Leaves the media preview open; reload before the next chat
+            raise
+
+        # Add caption if provided
+        if caption:
+            try:
+                caption_box = self.driver.find_element(*LOCATORS['caption_box'])
+                if self.config.get('text_input_mode', 'paste') != 'paste' or not self.insert_text(caption_box, caption):
+                    caption_box.send_keys(caption)
+            except:
+                pass  # Caption box might not be available for all file types
+
+        # Send
+        send_btn = self.driver.find_element(*LOCATORS['send_button'])
+        send_btn.click()
+        return True
+
+    def _upload_attachment(self, media):
+        """Choose the file and wait for its preview; the last point a stop can still abandon the send"""
+        # Click attach button
+        clip_btn = WebDriverWait(self.driver, 10).until(
+            EC.element_to_be_clickable(LOCATORS['attach_button'])
+        )
+        clip_btn.click()
+
+        # Upload file
+        file_input = self.driver.find_element(*LOCATORS['file_input'])
+        file_input.send_keys(os.path.abspath(media.path))
+
+        # Wait for upload to complete
+        try:
+            WebDriverWait(self.driver, self.config['upload_timeout'], self.config['probe_interval']).until(
+                lambda driver: self.cancel.check() or probe(driver, [('uploaded', 'send_button')])
+            )
+        except TimeoutException:
+            self.log("Attachment upload timed out", "error")
+            return False
+        return True
+
+    def wait_for_delivery(self, timeout):
+        """Wait for the double check icon on the last message"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_element_located(LOCATORS['delivered'])
+            )
+            return True
+        except TimeoutException:
+            return False
+
+    def is_healthy(self):
+        """The chat list pane is only present while logged in"""
+        if self.driver is None:
+            return False
+        try:
+            return bool(self.driver.find_elements(*LOCATORS['chat_list']))
+        except Exception:
+            return False
+
+    def close(self):
+        """Quit the browser"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except:
+                pass
+            self.driver = None
@@ -0,0 +1,125 @@
+import time
+from datetime import datetime, timedelta, time as day_time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Campaign settings that control when a campaign may send, parsed by parse_schedule
+SCHEDULE_SETTINGS = ('start_at', 'send_window', 'timezone', 'daily_cap')
+
+
+def _parse_window(text):
+    """'HH:MM-HH:MM' as a pair of datetime.time; the end may be earlier for windows past midnight"""
+    try:
+        start, end = (day_time.fromisoformat(part.strip()) for part in text.split('-'))
+    except ValueError:
+        raise ValueError("send_window must look like 09:00-18:00")
+    if start == end:
+        raise ValueError("send_window must not start and end at the same time")
+    return start, end
+
+
+def _zone(name):
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def parse_schedule(values, default_timezone='UTC'):
+    """Validate schedule overrides from a form into JSON-friendly campaign settings, raising ValueError
+
+    start_at is ISO 8601, read in the campaign's timezone when it has no offset, and stored as epoch seconds.
+    """
+    settings = {}
+    timezone = values.get('timezone') or ''
+    if timezone:
+        _zone(timezone)
+        settings['timezone'] = timezone
+    window = values.get('send_window') or ''
+    if window:
+        _parse_window(window)
+        settings['send_window'] = window
+    cap = values.get('daily_cap') or ''
+    if cap != '':
+        try:
+            settings['daily_cap'] = int(cap)
+        except ValueError:
+            raise ValueError("daily_cap must be a number")
+        if settings['daily_cap'] < 0:
+            raise ValueError("daily_cap must not be negative")
+    start_at = values.get('start_at') or ''
+    if start_at:
+        try:
+            start = datetime.fromisoformat(start_at)
+        except ValueError:
+            raise ValueError("start_at must be an ISO 8601 date and time")
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=_zone(timezone or default_timezone))
+        settings['start_at'] = start.timestamp()
+    return settings
+
+
+class SendSchedule:
+    """When a campaign may send: not before start_at, only inside a daily window, up to daily_cap per session
+
+    Times are epoch seconds; the window is wall-clock time in the campaign's timezone, so it
+    follows daylight saving changes. The daily cap resets when each window opens, or at local
+    midnight for campaigns without a window.
+    """
+
+    def __init__(self, start_at=None, send_window='', timezone='UTC', daily_cap=0):
+        self.start_at = start_at or 0
+        self.window = _parse_window(send_window) if send_window else None
+        self.zone = _zone(timezone)
+        self.daily_cap = daily_cap or 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('start_at'), config.get('send_window', ''), config.get('timezone', 'UTC'),
+                   config.get('daily_cap', 0))
+
+    @property
+    def is_limited(self):
+        """Whether any rule can hold a campaign back"""
+        return bool(self.start_at or self.window or self.daily_cap)
+
+    def _periods(self, now):
+        """(open, close) epoch pairs of the periods around now, earliest first"""
+        today = datetime.fromtimestamp(now, self.zone).date()
+        for offset in range(-1, 9):
+            day = today + timedelta(days=offset)
+            if self.window is None:
+                opens = datetime.combine(day, day_time(), self.zone)
+                closes = datetime.combine(day + timedelta(days=1), day_time(), self.zone)
+            else:
+                start, end = self.window
+                opens = datetime.combine(day, start, self.zone)
+                closes = datetime.combine(day + timedelta(days=1) if end < start else day, end, self.zone)
+            yield opens.timestamp(), closes.timestamp()
+
+    def current_period(self, now=None):
+        """(open, close) of the period now falls in, or None between windows"""
+        now = time.time() if now is None else now
+        for opens, closes in self._periods(now):
+            if opens <= now < closes:
+                return opens, closes
+        return None
+
+    def next_open(self, now=None, cap_reached=False):
+        """Earliest time sending may (re)start; now if it may send right away
+
+        With cap_reached the rest of the current period is skipped.
+        """
+        now = time.time() if now is None else now
+        earliest = max(now, self.start_at)
+        for opens, closes in self._periods(earliest):
+            if closes <= earliest or (cap_reached and opens <= now):
+                continue
+            return max(opens, earliest)
+        return earliest
+
+    def window_close(self, now=None):
+        """When the current window closes, or None if sending isn't limited to a window"""
+        if self.window is None:
+            return None
+        period = self.current_period(now)
+        return period[1] if period else None
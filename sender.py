@@ -1,366 +1,621 @@
 import os
 import time
-import pandas as pd
+import queue
 import threading
 import logging
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from datetime import datetime
 from config import CONFIG
+from transport import create_transport, CHAT_INVALID, CHAT_TIMEOUT, CHAT_DRIFT
+from pacing import AdaptivePacer
+from log_buffer import LogBuffer
+from media_cache import MediaCache
+from metrics import Metrics, PROCESS_METRICS
+from progress_state import ProgressState
+from cancellation import CancelToken, Cancelled
+from job_store import PENDING, SENT, INVALID, FAILED
+from send_windows import SendSchedule, parse_schedule
+from startup import STARTUP
 
-class WhatsAppBulkSender:
-    def __init__(self):
-        self.driver = None
-        self.config = CONFIG
+# Campaign settings that /api/send may override, with their types
+CAMPAIGN_SETTINGS = {
+    'messages_per_hour': float,
+    'max_messages_per_hour': float,
+    'min_messages_per_hour': float,
+    'pacing_jitter': float,
+    'max_retries': int,
+    'retry_delay': float,
+}
+
+def session_configs(config=CONFIG, profiles=None):
+    """One config per Chrome profile, each on its own user data dir"""
+    profiles = profiles or config.get('profiles') or [config.get('profile_name', 'Default')]
+    return [dict(config, profile_name=profile) for profile in profiles]
+
+
+class SendSession:
+    """One browser session (Chrome profile) working through the shared recipient queue"""
+
+    def __init__(self, sender, session_id, config):
+        self.sender = sender
+        self.session_id = session_id
+        self.config = config
+        self.transport = None
+        self.pacer = AdaptivePacer(config)
+        self.last_failure = None
+        self.awaiting_delivery = None
         self.is_active = False
-        self.current = 0
-        self.total = 0
         self.success_count = 0
         self.failure_count = 0
-        self.logs = []
+        self.daily_budget = None    # Messages this session may still send today, None for no cap
+        self.cap_reached = False
         self.thread = None
 
-    def add_log(self, message, log_type="info"):
-        """Add a log entry with timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}"
-        self.logs.append(log_entry)
-        logging.info(f"{log_type.upper()}: {message}")
+    def add_log(self, message, log_type="info", contact=None, event=None):
+        """Log through the sender, tagged with the session when several are running"""
+        if len(self.sender.sessions) > 1:
+            message = f"[{self.session_id}] {message}"
+        self.sender.add_log(message, log_type, contact, event, self.session_id)
 
     def initialize_driver(self):
-        """Initialize Chrome WebDriver with profile support"""
-        self.add_log("Initializing Chrome WebDriver...")
-        options = webdriver.ChromeOptions()
-        
-        # Add existing profile configuration
-        user_data_dir = self.config.get('user_data_dir', '')
-        profile_name = self.config.get('profile_name', 'Default')
-        
-        if user_data_dir and os.path.exists(user_data_dir):
-            if profile_name and profile_name != 'Default':
-                profile_path = os.path.join(user_data_dir, profile_name)
-            else:
-                profile_path = user_data_dir
-            options.add_argument(f'--user-data-dir={profile_path}')
-            self.add_log(f"Using Chrome profile: {profile_path}")
-        
-        # Chrome options for automation
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-infobars')
-        options.add_argument('--disable-notifications')
-        options.add_argument('--start-maximized')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--log-level=3')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=options)
-            self.add_log("Chrome WebDriver initialized successfully")
-            return True
-        except Exception as e:
-            self.add_log(f"Failed to initialize WebDriver: {str(e)}", "error")
-            return False
+        """Start the configured transport (Chrome WebDriver by default)"""
+        self.transport = create_transport(self.config, self.add_log)
+        with self.sender.metrics.span('driver_start'):
+            return self.transport.start()
 
     def login_to_whatsapp(self):
         """Login to WhatsApp Web"""
-        self.add_log("Connecting to WhatsApp Web...")
         try:
-            if self.driver is None:
+            if self.transport is None:
                 self.add_log("WebDriver not initialized", "error")
                 return False
-            self.driver.get('https://web.whatsapp.com')
-            
-            # Check if already logged in
-            try:
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.XPATH, '//div[@id="pane-side"]'))
-                )
-                self.add_log("Using existing WhatsApp session")
-                return True
-            except TimeoutException:
-                self.add_log("No existing session found - QR scan required")
-            
-            # Wait for QR scan
-            self.add_log("Please scan QR code in the browser window...")
-            try:
-                WebDriverWait(self.driver, 120).until(
-                    EC.presence_of_element_located((By.ID, 'pane-side'))
-                )
-                self.add_log("Login successful!")
-                return True
-            except TimeoutException:
-                self.add_log("Login timed out. Please try again.", "error")
-                return False
+            with self.sender.metrics.span('login'):
+                return self.transport.login()
         except Exception as e:
             self.add_log(f"Login failed: {str(e)}", "error")
             return False
 
-    def load_recipient_data(self, file_path):
-        """Load recipient data from Excel file"""
-        self.add_log(f"Loading recipients from {os.path.basename(file_path)}...")
-        try:
-            # Read Excel file
-            df = pd.read_excel(file_path)
-            
-            # Find contact column
-            contact_column = None
-            for col in df.columns:
-                if col.strip().lower() in ['contact', 'phone', 'number', 'mobile']:
-                    contact_column = col
-                    break
-            
-            if contact_column is None:
-                # Use first column if no contact column found
-                contact_column = df.columns[0]
-                self.add_log(f"No 'Contact' column found. Using '{contact_column}' column")
-            
-            # Rename to standard 'Contact' column
-            df.rename(columns={contact_column: 'Contact'}, inplace=True)
-            
-            # Clean contact numbers
-            df['Contact'] = df['Contact'].astype(str).str.replace(r'\D', '', regex=True)
-            
-            # Add Message column if not exists
-            if 'Message' not in df.columns:
-                df['Message'] = ''
-            
-            df['Message'] = df['Message'].fillna('').astype(str)
-            
-            # Filter out empty contacts
-            df = df[df['Contact'].str.len() > 0]
-            
-            self.add_log(f"Successfully loaded {len(df)} recipients")
-            return df
-        except Exception as e:
-            self.add_log(f"Error loading recipient data: {str(e)}", "error")
-            raise
+    def send_message(self, contact, message, attachment=None):
+        """Send message to a contact, with attachment as a PreparedMedia"""
+        with self.sender.metrics.span('send_message'):
+            return self._send_message(contact, message, attachment)
 
-    def send_message(self, contact, message, attachment_path=None):
-        """Send message to a contact"""
+    def _send_message(self, contact, message, attachment):
         try:
-            if self.driver is None:
+            if self.transport is None:
                 self.add_log("WebDriver not initialized", "error")
                 return False
                 
-            self.add_log(f"Sending message to {contact}...")
+            self.add_log(f"Sending message to {contact}...", contact=contact, event='send_start')
+            self.last_failure = 'error'
             
-            # Navigate to chat
-            self.driver.get(f'https://web.whatsapp.com/send?phone={contact}')
+            # Navigate to chat and wait for it to load
+            with self.sender.metrics.span('open_chat'):
+                state = self.transport.open_chat(contact)
+            if state == CHAT_TIMEOUT:
+                self.last_failure = 'timeout'
+                self.add_log(f"Chat loading timed out for {contact}", "error", contact, 'chat_timeout')
+                return False
             
-            # Wait for chat to load
-            try:
-                if self.driver is None:
-                    return False
-                WebDriverWait(self.driver, self.config['chat_load_timeout']).until(
-                    EC.any_of(
-                        EC.presence_of_element_located((By.XPATH, '//div[@role="textbox" and @contenteditable="true"]')),
-                        EC.presence_of_element_located((By.XPATH, '//div[contains(text(), "not on WhatsApp")]'))
-                    )
-                )
-            except TimeoutException:
-                self.add_log(f"Chat loading timed out for {contact}", "error")
+            # Every other chat would fail the same way, so stop instead of timing out per contact
+            if state == CHAT_DRIFT:
+                self.last_failure = 'drift'
+                self.add_log("WhatsApp Web layout changed; stopping the campaign until locators.py is updated", "error", contact, 'locator_drift')
+                self.sender.stop_process('failed')
                 return False
             
             # Check if number is invalid
-            invalid_number = self.driver.find_elements(By.XPATH, '//div[contains(text(), "not on WhatsApp")]')
-            if invalid_number:
-                self.add_log(f"❌ {contact} is not registered on WhatsApp", "error")
+            if state == CHAT_INVALID:
+                self.last_failure = 'invalid'
+                self.add_log(f"❌ {contact} is not registered on WhatsApp", "error", contact, 'invalid_number')
                 return False
             
             # Send attachment if provided
-            if attachment_path and os.path.exists(attachment_path):
-                if not self._send_attachment(attachment_path, message):
+            if attachment is not None:
+                if not self._send_attachment(attachment, message):
                     return False
             elif message:
                 if not self._send_text_message(message):
                     return False
             
-            # Wait for message delivery confirmation
-            try:
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, '//span[@data-icon="msg-dblcheck"]'))
-                )
-            except TimeoutException:
-                pass  # Message might still be sent
+            # Delivery confirmation is checked while waiting for the next send slot
+            self.awaiting_delivery = contact
+            self.last_failure = None
             
-            self.add_log(f"✅ Message sent successfully to {contact}")
+            self.add_log(f"✅ Message sent successfully to {contact}", "success", contact, 'sent')
             return True
             
+        except Cancelled:
+            self.last_failure = 'cancelled'
+            self.add_log(f"Stopped before sending to {contact}", contact=contact, event='send_cancelled')
+            return False
         except Exception as e:
-            self.add_log(f"❌ Failed to send message to {contact}: {str(e)}", "error")
+            self.add_log(f"❌ Failed to send message to {contact}: {str(e)}", "error", contact, 'send_error')
             return False
 
-    def _send_attachment(self, file_path, caption):
+    def _send_attachment(self, attachment, caption):
         """Send attachment with optional caption"""
         try:
-            # Click attach button
-            clip_btn = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, '//div[@title="Attach"]'))
-            )
-            clip_btn.click()
-            
-            # Upload file
-            file_input = self.driver.find_element(By.XPATH, '//input[@accept="*"]')
-            file_input.send_keys(os.path.abspath(file_path))
-            
-            # Wait for upload to complete
-            try:
-                WebDriverWait(self.driver, self.config['upload_timeout']).until(
-                    EC.element_to_be_clickable((By.XPATH, "//span[@data-icon='send']"))
-                )
-            except TimeoutException:
-                self.add_log("Attachment upload timed out", "error")
-                return False
-            
-            # Add caption if provided
-            if caption:
-                try:
-                    caption_box = self.driver.find_element(
-                        By.XPATH, '//div[@contenteditable="true" and @data-tab="10"]'
-                    )
-                    caption_box.send_keys(caption)
-                except:
-                    pass  # Caption box might not be available for all file types
-            
-            # Send
-            send_btn = self.driver.find_element(By.XPATH, "//span[@data-icon='send']")
-            send_btn.click()
-            
-            time.sleep(self.config['delay_between_messages'])
-            return True
+            with self.sender.metrics.span('attachment'):
+                return self.transport.send_attachment(attachment, caption)
             
+        except Cancelled:
+            raise
         except Exception as e:
-            self.add_log(f"Attachment sending failed: {str(e)}", "error")
+            self.add_log(f"Attachment sending failed: {str(e)}", "error", event='attachment_error')
             return False
 
     def _send_text_message(self, message):
         """Send text message"""
         try:
-            # Find message input box
-            text_box = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, '//div[@role="textbox" and @contenteditable="true"]'))
-            )
-            
-            # Clear and send message
-            text_box.send_keys(Keys.CONTROL + "a")
-            text_box.send_keys(Keys.DELETE)
-            
-            # Handle multiline messages
-            lines = message.split('\n')
-            for i, line in enumerate(lines):
-                text_box.send_keys(line)
-                if i < len(lines) - 1:  # Not the last line
-                    text_box.send_keys(Keys.SHIFT + Keys.ENTER)
-            
-            # Send message
-            text_box.send_keys(Keys.ENTER)
-            time.sleep(self.config['delay_between_messages'])
-            return True
+            with self.sender.metrics.span('text'):
+                return self.transport.send_text(message)
             
+        except Cancelled:
+            raise
         except Exception as e:
-            self.add_log(f"Text message sending failed: {str(e)}", "error")
+            self.add_log(f"Text message sending failed: {str(e)}", "error", event='text_error')
             return False
 
-    def process_recipients(self, recipients_df, attachment_path=None):
-        """Process all recipients in a separate thread"""
-        def _process():
-            try:
-                self.is_active = True
-                self.current = 0
-                self.total = len(recipients_df)
-                self.success_count = 0
-                self.failure_count = 0
-                self.logs = []
-                
-                self.add_log(f"Starting to process {self.total} recipients...")
-                
+    def run(self, work_queue, attachment=None):
+        """Start the session and send to recipients until the queue is empty"""
+        try:
+            self.is_active = True
+            if self.check_daily_cap():
+                return
+            
+            if self.sender.driver_manager is not None:
+                # Borrow an already logged-in browser from the warm pool
+                with self.sender.metrics.span('session_acquire'):
+                    self.transport = self.sender.driver_manager.acquire(self.config, self.add_log)
+                if self.transport is None:
+                    self.add_log("No warm WhatsApp session available", "error", event='session_unavailable')
+                    return
+            else:
                 # Initialize WebDriver
                 if not self.initialize_driver():
-                    self.add_log("Failed to initialize WebDriver", "error")
+                    self.add_log("Failed to initialize WebDriver", "error", event='driver_error')
                     return
                 
                 # Login to WhatsApp
                 if not self.login_to_whatsapp():
-                    self.add_log("Failed to login to WhatsApp", "error")
+                    self.add_log("Failed to login to WhatsApp", "error", event='login_error')
                     return
+                STARTUP.record('first_session_ready', profile_name=self.config.get('profile_name', 'Default'))
+            
+            # Transports check the campaign's token between WebDriver steps
+            self.transport.cancel = self.sender.cancel
+            
+            # Upload the attachment once; later chats reuse it where the transport can
+            if attachment is not None and not self.transport.stage_attachment(attachment):
+                self.add_log("Could not stage the attachment, uploading it with each message", "error", event='attachment_error')
+            
+            # Process recipients from the shared queue
+            processed = 0
+            while not self.sender.cancel.cancelled and not self.check_daily_cap():
+                try:
+                    row_index, contact, message = work_queue.get(block=self.sender.loading, timeout=0.5)
+                except queue.Empty:
+                    if self.sender.loading or not work_queue.empty():
+                        continue  # The loader is still streaming rows in
+                    break
                 
-                # Process each recipient
-                for index, row in recipients_df.iterrows():
-                    if not self.is_active:  # Check if stopped
-                        break
-                        
-                    contact = str(row['Contact']).strip()
-                    message = str(row['Message']).strip() if row['Message'] else ""
-                    
-                    if not contact:
-                        continue
-                    
-                    self.current = index + 1
-                    
-                    # Attempt to send message with retries
-                    success = False
-                    for attempt in range(self.config['max_retries']):
-                        try:
-                            if self.send_message(contact, message, attachment_path):
-                                success = True
-                                self.success_count += 1
+                # Attempt to send message with retries
+                success = False
+                attempts = 0
+                for attempt in range(self.config['max_retries']):
+                    if attempt > 0:
+                        with self.sender.metrics.span('retry_backoff'):
+                            if self.sender.cancel.wait(self.pacer.backoff_delay(attempt - 1)):  # Wait before retry
                                 break
-                            else:
-                                if attempt < self.config['max_retries'] - 1:
-                                    time.sleep(2)  # Wait before retry
-                        except Exception as e:
-                            self.add_log(f"Attempt {attempt + 1} failed for {contact}: {str(e)}", "error")
-                            time.sleep(2)
-                    
-                    if not success:
-                        self.failure_count += 1
-                    
-                    # Small delay between contacts
-                    time.sleep(1)
+                    self.wait_for_slot()
+                    if self.sender.cancel.cancelled:
+                        break
+                    if attempts == 0:
+                        self.sender.claim(row_index, self.config.get('profile_name'))  # Checkpoint before anything reaches WhatsApp
+                    attempts += 1
+                    started = time.monotonic()
+                    try:
+                        success = self.send_message(contact, message, attachment)
+                    except Exception as e:
+                        self.last_failure = 'error'
+                        self.add_log(f"Attempt {attempt + 1} failed for {contact}: {str(e)}", "error", contact, 'attempt_failed')
+                    if success:
+                        self.pacer.record_success(time.monotonic() - started)
+                        break
+                    if self.last_failure == 'cancelled':
+                        break
+                    self.sender.metrics.count_failure(self.last_failure)
+                    if self.last_failure == 'invalid':
+                        break  # Not on WhatsApp; retrying would only open the same chat again
+                    if self.pacer.record_failure(self.last_failure):
+                        self.add_log("Repeated failures look like throttling, slowing down this session", "error", event='throttled')
                 
-                self.add_log(f"Process completed! Success: {self.success_count}, Failed: {self.failure_count}")
+                if attempts == 0:
+                    continue  # Stopped before trying, stays pending for a resume
+                if success:
+                    self.success_count += 1
+                    status = SENT
+                elif self.last_failure == 'invalid':
+                    self.failure_count += 1
+                    status = INVALID
+                elif attempts < self.config['max_retries'] or self.last_failure == 'cancelled':
+                    status = PENDING  # Stopped between retries or before anything was sent, try again on resume
+                else:
+                    self.failure_count += 1
+                    status = FAILED
+                self.sender.record_result(row_index, status, attempts, None if success else self.last_failure)
+                
+                # Restart a browser that has grown past its memory cap, between recipients
+                processed += 1
+                if processed % self.config['memory_check_every'] == 0 and not self.check_memory(attachment):
+                    break
+        
+        except Exception as e:
+            self.add_log(f"Session failed: {str(e)}", "error", event='session_error')
+        finally:
+            self.is_active = False
+            self.close()
+
+    def check_daily_cap(self):
+        """Whether this session has used its daily budget; logs it the first time"""
+        if self.cap_reached or self.daily_budget is None or self.success_count < self.daily_budget:
+            return self.cap_reached
+        self.cap_reached = True
+        self.add_log(f"Reached the daily cap of {self.config['daily_cap']} messages", event='daily_cap')
+        return True
+
+    def check_memory(self, attachment=None):
+        """Restart the browser if it uses more than browser_memory_limit_mb; False if it couldn't be replaced"""
+        limit = self.config.get('browser_memory_limit_mb', 0)
+        usage = self.transport.memory_usage_mb() if limit else None
+        if usage is None or usage <= limit:
+            return True
+        self.add_log(f"Browser uses {usage:.0f}MB (limit {limit}MB), restarting it", event='browser_restart')
+        self.awaiting_delivery = None
+        with self.sender.metrics.span('browser_restart'):
+            if self.sender.driver_manager is not None:
+                self.transport = self.sender.driver_manager.restart(self.transport, self.add_log)
+                restarted = self.transport is not None
+            else:
+                self.transport.close()
+                restarted = self.initialize_driver() and self.login_to_whatsapp()
+        if not restarted:
+            self.add_log("Could not restart the browser, stopping this session", "error", event='session_error')
+            return False
+        self.transport.cancel = self.sender.cancel
+        if attachment is not None:
+            self.transport.stage_attachment(attachment)
+        return True
+
+    def wait_for_slot(self):
+        """Wait for the pacer, spending the gap on the previous message's delivery check"""
+        if self.awaiting_delivery and not self.sender.cancel.cancelled:
+            timeout = min(self.pacer.time_until_next(), self.config['delivery_timeout'])
+            try:
+                with self.sender.metrics.span('delivery_wait'):
+                    if not self.transport.wait_for_delivery(timeout):
+                        logging.debug(f"No delivery confirmation yet for {self.awaiting_delivery}")
+            except Exception:
+                pass  # Message might still be sent
+            self.awaiting_delivery = None
+        with self.sender.metrics.span('pacing_wait'):
+            self.pacer.acquire(self.sender.cancel)
+
+    def close(self):
+        """Release the session's transport, keeping warm browsers open"""
+        if self.transport:
+            self.transport.cancel = CancelToken()  # Warm browsers outlive this campaign's stop
+            if self.sender.driver_manager is not None:
+                self.sender.driver_manager.release(self.transport)
+            else:
+                self.transport.close()
+            self.transport = None
+
+    def get_progress(self):
+        """Get this session's counters"""
+        return {
+            'session_id': self.session_id,
+            'profile_name': self.config.get('profile_name', ''),
+            'is_active': self.is_active,
+            'success_count': self.success_count,
+            'failure_count': self.failure_count,
+            'pacing': self.pacer.get_state(),
+            'transport': self.transport.get_stats() if self.transport is not None else {}
+        }
+
+
+class WhatsAppBulkSender:
+    def __init__(self, driver_manager=None, job_store=None, media_cache=None):
+        self.driver_manager = driver_manager
+        self.job_store = job_store
+        self.media_cache = media_cache or MediaCache()
+        self.campaign_id = None
+        self.profiles = None
+        self.stop_status = 'stopped'
+        self.cap_reached = False
+        self.config = CONFIG
+        self.is_active = False
+        self.loading = False
+        self.progress = ProgressState()
+        self.cancel = CancelToken()
+        self.logs = LogBuffer(CONFIG['log_buffer_size'])
+        self.metrics = Metrics(PROCESS_METRICS)
+        self.sessions = []
+        self.version = 0
+        self.changed = threading.Condition()
+        self.thread = None
+
+    # Read-only views of the latest progress snapshot
+    @property
+    def current(self):
+        snapshot = self.progress.snapshot
+        return snapshot.success_count + snapshot.failure_count
+
+    @property
+    def total(self):
+        return self.progress.snapshot.total
+
+    @property
+    def success_count(self):
+        return self.progress.snapshot.success_count
+
+    @property
+    def failure_count(self):
+        return self.progress.snapshot.failure_count
+
+    def add_log(self, message, log_type="info", contact=None, event=None, session=None):
+        """Add a structured log record to the bounded buffer"""
+        self.logs.append(message, log_type, contact, event, session)
+        logging.info(f"{log_type.upper()}: {message}")
+        self._notify()
+
+    def _notify(self):
+        """Wake progress streams waiting for a change"""
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        """Block until progress moves past version or timeout; returns the current version"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def session_configs(self, profiles=None):
+        """Build one config per Chrome profile, each on its own user data dir"""
+        return session_configs(self.config, profiles)
+
+    def claim(self, row_index, profile=None):
+        """Checkpoint that a recipient is about to be sent by a profile"""
+        if self.job_store is not None and self.campaign_id:
+            self.job_store.claim(self.campaign_id, row_index, profile)
+
+    def record_result(self, row_index, status, attempts, error=None):
+        """Merge one recipient's outcome from any session into the campaign counters and checkpoint"""
+        if status != PENDING:
+            self.metrics.count_message(status)
+            self.progress.record(status == SENT)
+        if self.job_store is not None and self.campaign_id:
+            self.job_store.record(self.campaign_id, row_index, status, attempts, error)
+        self._notify()
+
+    @staticmethod
+    def parse_settings(values):
+        """Pick and convert per-campaign overrides of CAMPAIGN_SETTINGS, raising ValueError"""
+        settings = {}
+        for key, cast in CAMPAIGN_SETTINGS.items():
+            value = values.get(key)
+            if value in (None, ''):
+                continue
+            try:
+                settings[key] = cast(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a number")
+            if settings[key] < 0:
+                raise ValueError(f"{key} must not be negative")
+        if settings.get('max_retries') == 0:
+            raise ValueError("max_retries must be at least 1")
+        settings.update(parse_schedule(values, CONFIG['timezone']))
+        return settings
+
+    def process_recipients(self, recipients_df, attachment_path=None, settings=None, file_name=None):
+        """Store a new campaign and process its recipients in a separate thread"""
+        recipients = list(zip(recipients_df['Contact'], recipients_df['Message']))
+        if self.job_store is not None:
+            campaign_id = self.job_store.create_campaign(recipients, attachment_path, settings, file_name)
+        else:
+            campaign_id = None
+        rows = [
+            (row_index, str(contact).strip(), str(message).strip() if message else "")
+            for row_index, (contact, message) in enumerate(recipients)
+        ]
+        self._start(campaign_id, rows, attachment_path, settings, len(recipients_df))
+        return campaign_id
+
+    def resume_campaign(self, campaign_id, profiles=None, on_finish=None):
+        """Run a stored campaign from its last checkpoint; returns the number of recipients left"""
+        campaign = self.job_store.get_campaign(campaign_id)
+        if campaign is None:
+            raise KeyError(campaign_id)
+        rows, counts, total, attempted = self.job_store.prepare_resume(campaign_id)
+        done = (counts.get(SENT, 0), sum(count for status, count in counts.items() if status not in (SENT, PENDING)))
+        self._start(campaign_id, rows, campaign['attachment_path'], campaign['settings'], total, done,
+                    profiles, on_finish, campaign['loading'], resumed=attempted > 0)
+        return len(rows)
+
+    def _start(self, campaign_id, rows, attachment_path, settings, total, done=(0, 0), profiles=None, on_finish=None,
+               loading=False, resumed=False):
+        """Run the session pool over rows in a separate thread, calling on_finish(sender, status) at the end
+
+        With loading=True the campaign's file is still being parsed; more rows are followed from the job store.
+        resumed=True means sessions already worked on the campaign in an earlier run.
+        """
+        self.config = dict(CONFIG, **(settings or {}))
+        self.campaign_id = campaign_id
+        self.profiles = profiles
+        self.stop_status = 'stopped'
+        self.cap_reached = False
+        self.cancel = CancelToken()
+        self.is_active = True
+        self.loading = bool(loading)
+        
+        def _process():
+            status = 'failed'
+            try:
+                self.progress.reset(total, *done)
+                self.logs.close()
+                spill_path = os.path.join(CONFIG['log_spill_dir'], f"{campaign_id}.jsonl") if campaign_id else None
+                self.logs = LogBuffer(CONFIG['log_buffer_size'], spill_path)
+                self.metrics = Metrics(PROCESS_METRICS)
+                
+                if self.job_store is not None and campaign_id:
+                    self.job_store.set_campaign_status(campaign_id, 'running')
+                
+                # Shard recipients across sessions through a shared work queue
+                work_queue = queue.Queue()
+                for row_index, contact, message in rows:
+                    if contact:
+                        work_queue.put((row_index, contact, message))
+                if self.loading:
+                    self._follow_loader(work_queue, total - 1)
+                
+                # Hash and compress the attachment once for every session
+                attachment = None
+                if attachment_path and os.path.exists(attachment_path):
+                    attachment = self.media_cache.prepare(attachment_path)
+                
+                self.sessions = [
+                    SendSession(self, f"session-{i + 1}", config)
+                    for i, config in enumerate(self.session_configs(profiles))
+                ]
+                self._set_daily_budgets()
+                if resumed:
+                    self.add_log(f"Resuming campaign {campaign_id}: {work_queue.qsize()} of {self.total} recipients left", event='campaign_resume')
+                self.add_log(f"Starting to process {self.total} recipients with {len(self.sessions)} session(s)...", event='campaign_start')
+                
+                for session in self.sessions:
+                    session.thread = threading.Thread(target=session.run, args=(work_queue, attachment))
+                    session.thread.daemon = True
+                    session.thread.start()
+                for session in self.sessions:
+                    session.thread.join()
+                
+                left = not work_queue.empty() or self.loading
+                self.cap_reached = any(session.cap_reached for session in self.sessions)
+                if self.cancel.cancelled:
+                    # A closing send window with nothing left to send has simply finished
+                    status = 'completed' if self.stop_status == 'scheduled' and not left else self.stop_status
+                elif self.cap_reached and left:
+                    status = 'scheduled'
+                    self.cancel.cancel()  # Stop following the loader; the next run reads its rows from the job store
+                    self.add_log("Every session reached its daily cap, waiting for the next window", event='daily_cap')
+                elif not work_queue.empty():
+                    status = 'failed'
+                    self.add_log(f"No session available for {work_queue.qsize()} remaining recipients", "error", event='session_unavailable')
+                else:
+                    status = 'completed'
+                if self.job_store is not None and campaign_id:
+                    self.job_store.set_campaign_status(campaign_id, status)
+                
+                self.add_log(f"Process completed! Success: {self.success_count}, Failed: {self.failure_count}", "success", event='campaign_done')
                 
             except Exception as e:
-                self.add_log(f"Process failed: {str(e)}", "error")
+                self.add_log(f"Process failed: {str(e)}", "error", event='campaign_error')
+                if self.job_store is not None and campaign_id:
+                    self.job_store.set_campaign_status(campaign_id, status)
             finally:
                 self.is_active = False
-                if self.driver:
-                    try:
-                        self.driver.quit()
-                    except:
-                        pass
-                    self.driver = None
+                self.logs.close()
+                self._write_timing_report(status)
+                if on_finish is not None:
+                    on_finish(self, status)
+                self._notify()
         
         # Start processing in a new thread
         self.thread = threading.Thread(target=_process)
         self.thread.daemon = True
         self.thread.start()
 
-    def get_progress(self):
-        """Get current progress status"""
+    def _set_daily_budgets(self):
+        """Give each session what is left of daily_cap for its profile, counting every campaign's sends this window"""
+        schedule = SendSchedule.from_config(self.config)
+        if not schedule.daily_cap:
+            return
+        period = schedule.current_period()
+        for session in self.sessions:
+            sent = 0
+            if period is not None and self.job_store is not None:
+                sent = self.job_store.sent_since(session.config.get('profile_name'), period[0])
+            session.daily_budget = max(0, schedule.daily_cap - sent)
+
+    def _write_timing_report(self, status):
+        """Save the campaign's step timings next to its log spill file"""
+        if not self.campaign_id:
+            return
+        try:
+            os.makedirs(CONFIG['log_spill_dir'], exist_ok=True)
+            path = os.path.join(CONFIG['log_spill_dir'], f"{self.campaign_id}.timings.json")
+            self.metrics.write_report(path, campaign_id=self.campaign_id, status=status, sessions=len(self.sessions))
+        except Exception as e:
+            logging.error(f"Could not write timing report for {self.campaign_id}: {str(e)}")
+
+    def _follow_loader(self, work_queue, last_row):
+        """Feed rows into the work queue as the loader appends them to the job store"""
+        def _follow(last_row):
+            try:
+                while not self.cancel.cancelled:
+                    rows, loading = self.job_store.wait_for_recipients(self.campaign_id, last_row, timeout=1)
+                    for row_index, contact, message, status in rows:
+                        if status == PENDING:
+                            work_queue.put((row_index, contact, message))
+                        else:
+                            self.metrics.count_message(status)
+                            self.progress.record(False)  # Skipped by the loader's pre-validation
+                    if rows:
+                        last_row = rows[-1][0]
+                        self.progress.grow_total(last_row + 1)
+                        self._notify()
+                    if not loading:
+                        campaign = self.job_store.get_campaign(self.campaign_id)
+                        if campaign is not None and campaign['status'] == 'failed':
+                            # The rest of the file couldn't be read; don't finish the truncated list as if complete
+                            self.add_log(f"Stopping: {campaign['error']}", "error", event='load_error')
+                            self.stop_process('failed')
+                        break
+            except Exception as e:
+                self.add_log(f"Stopped following the recipients loader: {str(e)}", "error", event='load_error')
+            finally:
+                self.loading = False
+
+        thread = threading.Thread(target=_follow, args=(last_row,))
+        thread.daemon = True
+        thread.start()
+
+    def get_progress(self, since=None, limit=None):
+        """Get current progress status merged across sessions with a page of log records"""
+        limit = limit or CONFIG['log_page_size']
+        logs = self.logs.tail(limit) if since is None else self.logs.since(since, limit)
         return {
+            'campaign_id': self.campaign_id,
             'is_active': self.is_active,
-            'current': self.current,
-            'total': self.total,
-            'success_count': self.success_count,
-            'failure_count': self.failure_count,
-            'logs': self.logs.copy()
+            **self.progress.as_dict(),
+            'sessions': [session.get_progress() for session in list(self.sessions)],
+            'logs': logs,
+            'log_cursor': logs[-1]['seq'] if logs else (since or 0)
         }
 
-    def stop_process(self):
-        """Stop the current process"""
-        self.is_active = False
-        if self.driver:
-            try:
-                self.driver.quit()
-            except:
-                pass
-            self.driver = None
+    def get_changes(self, since=0):
+        """Counters plus only the log records after sequence number since, for streaming clients"""
+        version = self.version
+        progress = self.get_progress(since, CONFIG['log_page_size'])
+        new_logs = progress.pop('logs')
+        progress.pop('log_cursor')
+        return version, progress, new_logs
+
+    def stop_process(self, status='stopped'):
+        """Stop the current process, recording status (stopped/paused/cancelled/scheduled) on the campaign
+
+        Only signals the sessions; each finishes or abandons its current step at the next
+        checkpoint and releases its own browser, so no driver is closed mid-command.
+        """
+        self.stop_status = status
+        self.cancel.cancel()
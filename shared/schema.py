@@ -4,19 +4,41 @@ Shared schema definitions for API responses
 
 from typing import List, Optional
 
+class LogRecord:
+    def __init__(self, seq: int, time: float, level: str, message: str, event: Optional[str] = None,
+                 contact: Optional[str] = None, session: Optional[str] = None):
+        self.seq = seq
+        self.time = time
+        self.level = level
+        self.event = event
+        self.contact = contact
+        self.session = session
+        self.message = message
+
+class SessionProgress:
+    def __init__(self, session_id: str, profile_name: str, is_active: bool,
+                 success_count: int, failure_count: int):
+        self.session_id = session_id
+        self.profile_name = profile_name
+        self.is_active = is_active
+        self.success_count = success_count
+        self.failure_count = failure_count
+
 class ProgressResponse:
     def __init__(self, is_active: bool, current: int, total: int, 
-                 success_count: int, failure_count: int, logs: List[str]):
+                 success_count: int, failure_count: int, logs: List[LogRecord],
+                 sessions: Optional[List[SessionProgress]] = None):
         self.is_active = is_active
         self.current = current
         self.total = total
         self.success_count = success_count
         self.failure_count = failure_count
         self.logs = logs
+        self.sessions = sessions or []
 
 class StatusResponse:
     def __init__(self, is_active: bool, completed: bool, total_processed: int,
-                 success_count: int, failure_count: int, logs: List[str]):
+                 success_count: int, failure_count: int, logs: List[LogRecord]):
         self.is_active = is_active
         self.completed = completed
         self.total_processed = total_processed
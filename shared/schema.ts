@@ -1,24 +1,122 @@
+export interface SessionProgress {
+  session_id: string;
+  profile_name: string;
+  is_active: boolean;
+  success_count: number;
+  failure_count: number;
+}
+
+export type LogLevel = 'info' | 'success' | 'error';
+
+export interface LogRecord {
+  seq: number;
+  time: number;  // epoch seconds
+  level: LogLevel;
+  event: string | null;
+  contact: string | null;
+  session: string | null;
+  message: string;
+}
+
+export type CampaignStatus =
+  | 'loading' | 'queued' | 'scheduled' | 'running' | 'paused' | 'stopped' | 'cancelled' | 'completed' | 'failed';
+
 export interface ProgressResponse {
+  campaign_id: string | null;
+  status?: CampaignStatus | null;
   is_active: boolean;
   current: number;
   total: number;
   success_count: number;
   failure_count: number;
-  logs: string[];
+  sessions?: SessionProgress[];
+  logs: LogRecord[];
+  log_cursor?: number;
+  error?: string | null;  // why a campaign failed before it started, e.g. an unreadable file
+  next_run_at?: number | null;  // epoch seconds a 'scheduled' campaign starts or resumes sending
 }
 
 export interface StatusResponse {
+  campaign_id: string | null;
   is_active: boolean;
   completed: boolean;
   total_processed: number;
   success_count: number;
   failure_count: number;
-  logs: string[];
+  logs: LogRecord[];
+  log_cursor?: number;
 }
 
 export interface SendResponse {
   message: string;
-  total_recipients: number;
+  campaign_id: string | null;
+  status: CampaignStatus;  // 'loading' until the first chunk of the file is stored
+  retry_of?: string;       // set for campaigns made by /api/campaigns/<id>/retry
+}
+
+export type ReportFormat = 'csv' | 'xlsx' | 'parquet';
+
+// Columns of /api/campaigns/<id>/report; timestamps are UTC
+export interface ReportRow {
+  row: number;
+  contact: string;
+  status: 'pending' | 'sending' | 'sent' | 'invalid' | 'failed' | 'unknown';
+  failure_reason: string;
+  attempts: number;
+  first_attempt_at: string;
+  finished_at: string;
+  message: string;
+}
+
+export interface TemplatePreviewResponse {
+  fields: string[];
+  missing_fields: string[];
+  blank_fields?: Record<string, number>;
+  rows: { contact: string; message: string }[];
+}
+
+export interface DryRunEstimate {
+  sessions: number;
+  messages_per_hour: number;
+  seconds_per_attempt: number;
+  attempts_per_recipient: number;
+  eta_seconds: number;
+  eta_best_seconds: number;  // every send on the first try at max_messages_per_hour
+  expected_sent: number;
+  expected_invalid: number;
+  expected_failed: number;
+  latency_source: string;    // 'live', a saved timings report, or 'defaults'
+  history_recipients: number;
+}
+
+// POST /api/send?dry_run=1
+export interface DryRunResponse {
+  dry_run: true;
+  rows: number;
+  duplicates: number;
+  invalid_format: number;
+  known_invalid: number;
+  to_send: number;
+  empty_messages: number;
+  fields: string[];
+  blank_fields: Record<string, number>;
+  preview: { contact: string; message: string; status: string; error: string | null }[];
+  problems: { contact: string; message: string; status: string; error: string | null }[];
+  estimate: DryRunEstimate;
+  elapsed_seconds: number;
+}
+
+// DELETE /api/invalid-numbers
+export interface ForgetInvalidResponse {
+  message: string;
+  forgotten: number;  // contacts that were in the invalid cache
+}
+
+export interface StartupResponse {
+  uptime_seconds: number;
+  phases: Record<string, number>;   // app setup step -> seconds
+  imports: Record<string, number>;  // module imported on first use -> seconds
+  events: Record<string, { at_seconds: number; [detail: string]: unknown }>;  // api_ready, chromedriver, first_session_ready
 }
 
 export interface ErrorResponse {
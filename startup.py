@@ -0,0 +1,95 @@
+"""
+Startup timing: where the API's cold start goes and how long until the first session is ready.
+
+app.py wraps each setup step in STARTUP.phase(), modules deferred until first use are timed
+by STARTUP.load(), and one-off events (the API answering, chromedriver being resolved, the
+first WhatsApp session logging in) are recorded with STARTUP.record(). GET /api/startup
+returns the report.
+"""
+
+import os
+import sys
+import time
+import logging
+import importlib
+import threading
+from contextlib import contextmanager
+
+
+def _process_age():
+    """Seconds since this process was started, including interpreter startup; None off Linux"""
+    try:
+        with open('/proc/self/stat') as f:
+            started_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return max(0.0, uptime - started_ticks / os.sysconf('SC_CLK_TCK'))
+
+
+class StartupReport:
+    """Timings of the app's setup phases, deferred imports and first-time events"""
+
+    def __init__(self):
+        self.started = time.perf_counter() - (_process_age() or 0.0)
+        self.phases = {}     # Setup step -> seconds
+        self.imports = {}    # Deferred module -> seconds to import it
+        self.events = {}     # Event -> seconds after process start, plus details
+        self.lock = threading.Lock()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name):
+        """Time one setup step"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = round(time.perf_counter() - started, 3)
+
+    def record(self, event, **details):
+        """Note the first time an event happens; later ones are ignored"""
+        with self.lock:
+            if event not in self.events:
+                self.events[event] = dict(details, at_seconds=round(self.elapsed(), 3))
+
+    def load(self, module):
+        """Import a module, timing it if this is the first import"""
+        if module in sys.modules:
+            return sys.modules[module]
+        started = time.perf_counter()
+        loaded = importlib.import_module(module)
+        with self.lock:
+            self.imports.setdefault(module, round(time.perf_counter() - started, 3))
+        return loaded
+
+    def preload(self, modules):
+        """Import modules in a background thread so the first request that needs them doesn't wait"""
+        def _preload():
+            for module in modules:
+                try:
+                    self.load(module)
+                except Exception as e:
+                    logging.warning(f"Could not preload {module}: {str(e)}")
+            self.record('preloaded')
+
+        thread = threading.Thread(target=_preload)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def report(self):
+        with self.lock:
+            return {
+                'uptime_seconds': round(self.elapsed(), 3),
+                'phases': dict(self.phases),
+                'imports': dict(self.imports),
+                'events': {event: dict(details) for event, details in self.events.items()}
+            }
+
+
+STARTUP = StartupReport()
@@ -0,0 +1,143 @@
+import os
+import gzip
+import logging
+import mimetypes
+import threading
+from flask import request, send_file
+from config import CONFIG
+
+# Text formats worth precompressing; images and fonts are already compressed
+COMPRESSIBLE = ('.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.map', '.xml', '.ico', '.webmanifest')
+MIN_COMPRESS_SIZE = 1024
+
+# Preferred first when the client accepts both
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticAsset:
+    def __init__(self, path, stat):
+        self.path = path
+        self.etag = f"{int(stat.st_mtime_ns):x}-{stat.st_size:x}"
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.variants = {}   # Content-Encoding -> precompressed file
+
+
+def _precompress(path):
+    """Write path.gz, and path.br when the brotli module is installed, unless they are up to date"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    compressors = [('.gz', lambda raw: gzip.compress(raw, 9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+    for suffix, compress in compressors:
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            continue
+        temp_path = target + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(compress(data))
+        os.replace(temp_path, target)
+
+
+class StaticFiles:
+    """The built frontend indexed once, served with ETags, cache headers and precompressed variants
+
+    Requests are answered from the in-memory index instead of touching the disk per request.
+    A miss (a client-side route, or a new build) re-indexes only if index.html has changed.
+    """
+
+    def __init__(self, folder=None, max_age=None, precompress=None):
+        self.folder = folder or CONFIG['static_folder']
+        self.max_age = CONFIG['static_max_age'] if max_age is None else max_age
+        self.precompress = CONFIG['static_precompress'] if precompress is None else precompress
+        self.assets = {}
+        self.built_at = None
+        self.lock = threading.Lock()
+        self.refresh()
+
+    def _index_mtime(self):
+        try:
+            return os.stat(os.path.join(self.folder, 'index.html')).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Re-index the folder if the build has changed since it was last indexed"""
+        built_at = self._index_mtime()
+        with self.lock:
+            if built_at == self.built_at and self.assets:
+                return
+            assets = {}
+            for root, _, files in os.walk(self.folder):
+                for name in files:
+                    if name.endswith(('.gz', '.br', '.tmp')):
+                        continue
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                    stat = os.stat(path)
+                    if self.precompress and name.endswith(COMPRESSIBLE) and stat.st_size >= MIN_COMPRESS_SIZE:
+                        try:
+                            _precompress(path)
+                        except OSError as e:
+                            logging.warning(f"Could not precompress {relative}: {str(e)}")
+                    asset = StaticAsset(path, stat)
+                    for encoding, suffix in ENCODINGS:
+                        if os.path.exists(path + suffix):
+                            asset.variants[encoding] = path + suffix
+                    assets[relative] = asset
+            self.assets = assets
+            self.built_at = built_at
+
+    def get(self, path):
+        """The asset for a URL path, or None"""
+        asset = self.assets.get(path)
+        if asset is None and path:
+            self.refresh()
+            asset = self.assets.get(path)
+        return asset
+
+    def serve(self, path):
+        """Response for an asset, or index.html for client-side routes; None if there is no build"""
+        asset = self.get(path) if path else None
+        if asset is None:
+            path = 'index.html'
+            asset = self.get(path)
+            if asset is None:
+                return None
+
+        accepted = request.accept_encodings
+        file_path, etag, encoding = asset.path, asset.etag, None
+        for name, _ in ENCODINGS:
+            if name in asset.variants and accepted[name]:
+                file_path, etag, encoding = asset.variants[name], f"{asset.etag}-{name}", name
+                break
+
+        response = send_file(file_path, mimetype=asset.mimetype, etag=etag, conditional=True, max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        if path.startswith('assets/'):
+            # Vite puts a content hash in these file names, so they never change in place
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = self.max_age
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
+
+
+def main():
+    """Precompress a build ahead of deployment: python static_files.py [folder]"""
+    import sys
+    folder = sys.argv[1] if len(sys.argv) > 1 else CONFIG['static_folder']
+    StaticFiles(folder, precompress=True)
+    print(f"Precompressed static files in {folder}")
+
+
+if __name__ == '__main__':
+    main()
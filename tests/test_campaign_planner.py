@@ -0,0 +1,22 @@
+from config import CONFIG
+from campaign_planner import plan_campaign
+
+
+def test_dry_run_counts_every_row_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'dry_run_chunk_size', 1000)
+    rows = [f'98{i:08d},Name {i}' for i in range(3000)]
+    rows[2500] = '+91 9800000010,Name dup'  # Row 10's number written internationally, two chunks later
+    rows[2900] = '12345,Name short'         # Malformed, long after the first chunk
+    rows[2950] = '9800002950,'              # Blank template field
+    path = tmp_path / 'recipients.csv'
+    path.write_text('Phone,Name\n' + '\n'.join(rows) + '\n')
+
+    plan = plan_campaign(str(path), 'Hi {{Name}}')
+
+    assert plan['rows'] == 3000
+    assert plan['duplicates'] == 1
+    assert plan['invalid_format'] == 1
+    assert plan['to_send'] == 2998
+    assert plan['blank_fields'] == {'Name': 1}
+    assert [row['contact'] for row in plan['problems']] == ['12345']
+    assert plan['preview'][0] == {'contact': '919800000000', 'message': 'Hi Name 0', 'status': 'pending', 'error': None}
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from config import CONFIG
+from job_store import JobStore, SENT, PENDING
+from sender import WhatsAppBulkSender
+
+SETTINGS = {
+    'transport': 'fake', 'fake_failure_rate': 0, 'fake_invalid_rate': 0, 'messages_per_hour': 0,
+    'pacing_jitter': 0, 'retry_delay': 0, 'delivery_timeout': 0.1, 'profiles': ['Default'], 'daily_cap': 10
+}
+
+
+def run_campaign(job_store, contacts):
+    sender = WhatsAppBulkSender(job_store=job_store)
+    df = pd.DataFrame({'Contact': contacts, 'Message': ['hi'] * len(contacts)})
+    campaign_id = sender.process_recipients(df, None, SETTINGS)
+    sender.thread.join(60)
+    return job_store.get_campaign(campaign_id), sender
+
+
+def test_daily_cap_is_shared_by_campaigns_on_one_profile(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'log_spill_dir', str(tmp_path / 'logs'))
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        first, first_sender = run_campaign(job_store, [f'9198{i:08d}' for i in range(15)])
+        second, second_sender = run_campaign(job_store, [f'9197{i:08d}' for i in range(15)])
+    finally:
+        job_store.close()
+
+    assert first['counts'] == {SENT: 10, PENDING: 5}
+    assert first['status'] == 'scheduled' and first_sender.cap_reached
+    # The profile already used its cap today, so the second campaign sends nothing
+    assert second['counts'] == {PENDING: 15}
+    assert second['status'] == 'scheduled' and second_sender.cap_reached
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from config import CONFIG
+from fake_whatsapp import FakeWhatsAppServer
+from job_store import JobStore, SENT
+from sender import WhatsAppBulkSender
+
+
+def test_attachments_reach_recipients_with_their_captions(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'log_spill_dir', str(tmp_path / 'logs'))
+    monkeypatch.setitem(CONFIG, 'media_cache_dir', str(tmp_path / 'media'))
+    attachment = tmp_path / 'brochure.pdf'
+    attachment.write_bytes(b'%PDF-1.4\n' + b'0' * 1024)
+    server = FakeWhatsAppServer().start()
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        contacts = [f'9198{i:08d}' for i in range(4)]
+        captions = [f'Hi #{i} & welcome + 10% off, café' for i in range(4)]
+        settings = {
+            'transport': 'fake', 'fake_whatsapp_url': server.url, 'messages_per_hour': 0, 'pacing_jitter': 0,
+            'retry_delay': 0, 'delivery_timeout': 0.1, 'profiles': ['Default']
+        }
+        sender = WhatsAppBulkSender(job_store=job_store)
+        campaign_id = sender.process_recipients(
+            pd.DataFrame({'Contact': contacts, 'Message': captions}), str(attachment), settings
+        )
+        sender.thread.join(60)
+
+        assert job_store.get_campaign(campaign_id)['counts'] == {SENT: 4}
+        assert server.get_stats()['attachments'] == 4
+        assert server.texts == dict(zip(contacts, captions))
+    finally:
+        job_store.close()
+        server.stop()
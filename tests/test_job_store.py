@@ -0,0 +1,51 @@
+import time
+
+from config import CONFIG
+from campaigns import CampaignScheduler
+from job_store import JobStore, SENT, INVALID, PENDING, LOAD_INTERRUPTED
+
+
+def test_invalid_cache_is_forgotten_on_request_and_after_a_successful_retry(tmp_path):
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        campaign_id = job_store.create_campaign([('919800000001', 'hi'), ('919800000002', 'hi')])
+        job_store.record(campaign_id, 0, INVALID, 1, 'invalid')
+        job_store.record(campaign_id, 1, INVALID, 1, 'invalid')
+        job_store.flush()
+        assert job_store.known_invalid(['919800000001', '919800000002']) == {'919800000001', '919800000002'}
+
+        assert job_store.forget_invalid(['919800000001', '919800000003']) == 1
+        assert job_store.known_invalid(['919800000001', '919800000002']) == {'919800000002'}
+
+        # The retry reaches the other number, so it is no longer cached as invalid
+        retry_id = job_store.create_retry_campaign(campaign_id, [INVALID])
+        job_store.record(retry_id, 1, SENT, 1)  # Rows are copied in order, so the second is 919800000002
+        job_store.flush()
+        assert job_store.known_invalid(['919800000002']) == set()
+    finally:
+        job_store.close()
+
+
+def test_campaign_queued_while_loading_fails_when_the_store_is_reopened(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    job_store = JobStore(path)
+    # The first chunk is stored and the campaign queued while the rest of the file is still streaming in
+    campaign_id = job_store.create_campaign([('919800000001', 'hi'), ('919800000002', 'hi')],
+                                            loading=True, status='loading')
+    job_store.set_campaign_status(campaign_id, 'queued', expected='loading')
+    job_store.close()
+
+    reopened = JobStore(path)
+    try:
+        scheduler = CampaignScheduler(reopened, config=dict(CONFIG, profiles=['Default']))
+        scheduler.start()
+        time.sleep(0.5)
+
+        campaign = reopened.get_campaign(campaign_id)
+        assert campaign['status'] == 'failed'
+        assert campaign['error'] == LOAD_INTERRUPTED
+        assert not campaign['loading']
+        assert campaign_id not in scheduler.runners
+        assert campaign['counts'] == {PENDING: 2}
+    finally:
+        reopened.close()
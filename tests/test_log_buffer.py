@@ -0,0 +1,23 @@
+from log_buffer import LogBuffer
+
+
+def test_spilled_records_stay_readable_after_close(tmp_path):
+    logs = LogBuffer(capacity=10, spill_path=str(tmp_path / 'campaign.jsonl'))
+    for i in range(1, 101):
+        logs.append(f'message {i}')
+    logs.close()
+
+    assert [record['seq'] for record in logs.since(0)] == list(range(1, 101))
+    # Paging from a cursor inside the spilled part, across into the ring
+    assert [record['seq'] for record in logs.since(40, 5)] == [41, 42, 43, 44, 45]
+    assert [record['seq'] for record in logs.since(85, 10)] == list(range(86, 96))
+    assert logs.since(89, 1)[0]['message'] == 'message 90'
+    assert [record['seq'] for record in logs.since(95)] == list(range(96, 101))
+
+
+def test_without_a_spill_file_old_cursors_start_at_the_oldest_kept_record():
+    logs = LogBuffer(capacity=10)
+    for i in range(1, 31):
+        logs.append(f'message {i}')
+
+    assert [record['seq'] for record in logs.since(5, 3)] == [21, 22, 23]
@@ -0,0 +1,28 @@
+import time
+
+from config import CONFIG
+from job_store import JobStore
+from recipient_loader import start_campaign_load
+
+
+def test_file_corrupt_partway_fails_an_already_queued_campaign(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'loader_chunk_size', 100)
+    path = tmp_path / 'recipients.csv'
+    rows = ''.join(f'98{i:08d},hi\n' for i in range(2000))
+    # Valid UTF-8 for the first 2000 rows, then bytes the CSV reader can't decode
+    path.write_bytes(b'Phone,Message\n' + rows.encode() + b'\xff\xfe\xfa,broken\n')
+
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        queued = []
+        campaign_id = start_campaign_load(str(path), job_store, queued.append)
+        deadline = time.time() + 30
+        while job_store.get_campaign(campaign_id)['loading'] and time.time() < deadline:
+            time.sleep(0.05)
+
+        campaign = job_store.get_campaign(campaign_id)
+        assert queued == [campaign_id]  # The first chunk was queued before the file broke
+        assert campaign['status'] == 'failed'
+        assert campaign['error'].startswith('Invalid recipients file:')
+    finally:
+        job_store.close()
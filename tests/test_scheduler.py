@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from config import CONFIG
+from campaigns import CampaignScheduler
+from job_store import JobStore, SENT, INVALID, LOAD_INTERRUPTED, LOAD_FAILED
+
+SETTINGS = {
+    'transport': 'fake', 'fake_failure_rate': 0, 'fake_invalid_rate': 0, 'messages_per_hour': 0,
+    'pacing_jitter': 0, 'retry_delay': 0, 'delivery_timeout': 0.1
+}
+
+
+def test_two_schedulers_dispatch_a_campaign_once(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'log_spill_dir', str(tmp_path / 'logs'))
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        recipients = [(f'9198{i:08d}', 'hi') for i in range(10)]
+        campaign_id = job_store.create_campaign(recipients, settings=SETTINGS)
+        schedulers = [CampaignScheduler(job_store, config=dict(CONFIG, profiles=['Default'])) for _ in range(2)]
+        for scheduler in schedulers:
+            scheduler.submit(campaign_id)
+        for scheduler in schedulers:
+            scheduler.start()
+
+        deadline = time.time() + 30
+        while job_store.get_campaign(campaign_id)['status'] != 'completed' and time.time() < deadline:
+            time.sleep(0.05)
+
+        assert job_store.get_campaign(campaign_id)['counts'] == {SENT: 10}
+        assert sum(campaign_id in scheduler.runners for scheduler in schedulers) == 1
+    finally:
+        job_store.close()
+
+
+def test_resume_keeps_the_requested_session_count(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'log_spill_dir', str(tmp_path / 'logs'))
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        recipients = [(f'9198{i:08d}', 'hi') for i in range(4)]
+        campaign_id = job_store.create_campaign(recipients, settings=dict(SETTINGS, sessions=1), status='paused')
+        scheduler = CampaignScheduler(job_store, config=dict(CONFIG, profiles=['A', 'B']))
+        scheduler.start()
+        assert scheduler.resume(campaign_id)
+
+        deadline = time.time() + 30
+        while job_store.get_campaign(campaign_id)['status'] != 'completed' and time.time() < deadline:
+            time.sleep(0.05)
+
+        assert job_store.get_campaign(campaign_id)['counts'] == {SENT: 4}
+        assert scheduler.runners[campaign_id].profiles == ['A']
+    finally:
+        job_store.close()
+
+
+def test_campaigns_that_never_finished_loading_cannot_be_resumed(tmp_path):
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        scheduler = CampaignScheduler(job_store, config=dict(CONFIG, profiles=['Default']))
+        for error in (LOAD_INTERRUPTED, f'{LOAD_FAILED}: bad row'):
+            campaign_id = job_store.create_campaign([('919800000001', 'hi')], settings=SETTINGS)
+            job_store.set_campaign_status(campaign_id, 'failed', error)
+            with pytest.raises(ValueError):
+                scheduler.resume(campaign_id)
+            assert job_store.get_campaign(campaign_id)['status'] == 'failed'
+    finally:
+        job_store.close()
+
+
+def test_only_campaigns_sessions_already_worked_on_log_a_resume(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'log_spill_dir', str(tmp_path / 'logs'))
+    job_store = JobStore(str(tmp_path / 'jobs.db'))
+    try:
+        # A new campaign whose loader already skipped one malformed number
+        fresh_id = job_store.create_campaign(
+            [('919800000001', 'hi'), ('12345', 'hi', INVALID, 'invalid_format')], settings=SETTINGS
+        )
+        # A paused campaign that sent its first recipient before it stopped
+        resumed_id = job_store.create_campaign([('919800000002', 'hi'), ('919800000003', 'hi')],
+                                               settings=SETTINGS, status='paused')
+        job_store.claim(resumed_id, 0, 'Default')
+        job_store.record(resumed_id, 0, SENT, 1)
+        job_store.flush()
+
+        scheduler = CampaignScheduler(job_store, config=dict(CONFIG, profiles=['Default']))
+        scheduler.start()
+        scheduler.submit(fresh_id)
+        scheduler.resume(resumed_id)
+        deadline = time.time() + 30
+        while (any(job_store.get_campaign(i)['status'] != 'completed' for i in (fresh_id, resumed_id))
+               and time.time() < deadline):
+            time.sleep(0.05)
+
+        def events(campaign_id):
+            return [record['event'] for record in scheduler.runners[campaign_id].logs.since(0)]
+        assert 'campaign_resume' not in events(fresh_id)
+        assert 'campaign_resume' in events(resumed_id)
+    finally:
+        job_store.close()
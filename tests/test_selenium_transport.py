@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from config import CONFIG
+from selenium_transport import SeleniumTransport
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason="memory is read from /proc")
+def test_memory_usage_mb_measures_driver_process_tree():
+    # Stand-in for chromedriver with one child, like chromedriver and its Chrome
+    process = subprocess.Popen([sys.executable, '-c',
+                                'import subprocess, sys, time; subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"]); time.sleep(30)'])
+    try:
+        transport = SeleniumTransport(dict(CONFIG))
+        transport.service = SimpleNamespace(process=process)
+        usage = transport.memory_usage_mb()
+        assert usage is not None and usage > 0
+    finally:
+        subprocess.run(['pkill', '-P', str(process.pid)])
+        process.kill()
+        process.wait()
+
+
+def test_memory_usage_mb_without_a_driver():
+    assert SeleniumTransport(dict(CONFIG)).memory_usage_mb() is None
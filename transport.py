@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from cancellation import CancelToken
+from startup import STARTUP
+
+# Chat states returned by open_chat()
+CHAT_READY = 'ready'
+CHAT_INVALID = 'invalid'
+CHAT_TIMEOUT = 'timeout'
+CHAT_DRIFT = 'drift'     # The page loaded but the locators no longer match it
+
+# Records the downloaded chromedriver in chromedriver_cache_dir so later starts skip webdriver_manager
+PIN_FILE = 'chromedriver.json'
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+
+def _driver_version(path):
+    """Version reported by a chromedriver binary, e.g. '120.0.6099.109', or None"""
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    parts = output.split()
+    return parts[1] if len(parts) > 1 else None
+
+
+def pinned_chromedriver(config):
+    """The pinned chromedriver if it still exists and matches chromedriver_version; no network involved"""
+    try:
+        with open(os.path.join(config['chromedriver_cache_dir'], PIN_FILE), encoding='utf-8') as f:
+            pin = json.load(f)
+    except (OSError, ValueError):
+        return None
+    version = config.get('chromedriver_version')
+    if not os.path.isfile(pin.get('path', '')) or (version and pin.get('version') != version):
+        return None
+    return pin['path']
+
+
+def install_chromedriver(config):
+    """Download chromedriver into chromedriver_cache_dir and pin it; the only step that needs the network"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    from webdriver_manager.core.driver_cache import DriverCacheManager
+    cache_dir = os.path.abspath(config['chromedriver_cache_dir'])
+    path = ChromeDriverManager(
+        driver_version=config.get('chromedriver_version') or None,
+        cache_manager=DriverCacheManager(root_dir=cache_dir)
+    ).install()
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = os.path.join(cache_dir, PIN_FILE + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'path': path, 'version': _driver_version(path), 'installed_at': time.time()}, f)
+    os.replace(temp_path, os.path.join(cache_dir, PIN_FILE))
+    return path
+
+
+def resolve_chromedriver_path(config):
+    """Resolve the chromedriver binary once per process and reuse it for every session
+
+    Tries chromedriver_path, then the pinned download, then chromedriver on PATH (unless a
+    version is pinned), and only then downloads one.
+    """
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path is None:
+            started = time.perf_counter()
+            source, path = 'config', config.get('chromedriver_path')
+            if not path:
+                source, path = 'pinned', pinned_chromedriver(config)
+            if not path and not config.get('chromedriver_version'):
+                source, path = 'path', shutil.which('chromedriver')
+            if not path:
+                source, path = 'download', install_chromedriver(config)
+            STARTUP.record('chromedriver', source=source, path=path, seconds=round(time.perf_counter() - started, 3))
+            _chromedriver_path = path
+        return _chromedriver_path
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants in MB, read from /proc; None off Linux"""
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class BaseTransport:
+    """Interface WhatsAppBulkSender uses to talk to a WhatsApp session"""
+
+    name = 'base'
+
+    def __init__(self, config, log=None):
+        self.config = config
+        self.log = log or (lambda message, log_type="info": logging.info(message))
+        self.cancel = CancelToken()  # Replaced with the campaign's token while a session uses it
+
+    def start(self):
+        """Start the underlying session, return True on success"""
+        raise NotImplementedError
+
+    def login(self):
+        """Make sure the session is logged in, return True on success"""
+        raise NotImplementedError
+
+    def open_chat(self, contact):
+        """Open the chat for a contact, return one of the CHAT_* states"""
+        raise NotImplementedError
+
+    def send_text(self, message):
+        """Type and send a text message in the open chat"""
+        raise NotImplementedError
+
+    def stage_attachment(self, media):
+        """Upload a PreparedMedia once for this session so later sends can reuse it"""
+        return True
+
+    def get_stats(self):
+        """Transport-specific timing counters for progress reports"""
+        return {}
+
+    def memory_usage_mb(self):
+        """Memory used by the session's browser, or None if it can't be measured"""
+        return None
+
+    def send_attachment(self, media, caption):
+        """Send a PreparedMedia with an optional caption in the open chat"""
+        raise NotImplementedError
+
+    def wait_for_delivery(self, timeout):
+        """Wait for the last message to be delivered, return True if confirmed"""
+        raise NotImplementedError
+
+    def is_healthy(self):
+        """Cheap check that the session is still logged in"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the session"""
+        raise NotImplementedError
+
+
+def create_transport(config, log=None):
+    """Build the transport selected by config['transport'], in a worker process if session_isolation is 'process'"""
+    if config.get('session_isolation', 'thread') == 'process':
+        from worker_process import WorkerProcessTransport
+        return WorkerProcessTransport(config, log)
+    name = config.get('transport', 'selenium')
+    if name == 'selenium':
+        # Selenium is only imported once a browser is needed
+        return STARTUP.load('selenium_transport').SeleniumTransport(config, log)
+    if name == 'fake':
+        from fake_whatsapp import FakeWhatsAppTransport
+        return FakeWhatsAppTransport(config, log)
+    raise ValueError(f"Unknown transport: {name}")
+
+
+def main():
+    """Download and pin chromedriver ahead of deployment, so no browser launch needs the network"""
+    from config import CONFIG
+    print(f"Pinned chromedriver: {install_chromedriver(CONFIG)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 import os
-import pandas as pd
+from recipient_loader import RecipientLoader
 from werkzeug.utils import secure_filename
 
 def allowed_file(filename, allowed_extensions):
@@ -8,27 +8,14 @@ def allowed_file(filename, allowed_extensions):
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 def validate_excel_file(file_path):
-    """Validate Excel file structure"""
+    """Validate a recipients file's structure from its header and first chunk"""
     try:
-        # Try to read the Excel file
-        df = pd.read_excel(file_path)
-        
-        if df.empty:
-            raise ValueError("Excel file is empty")
-        
-        # Check if there's at least one column that could be contacts
-        if len(df.columns) == 0:
-            raise ValueError("Excel file has no columns")
-        
-        # Look for contact-like columns
-        contact_columns = []
-        for col in df.columns:
-            col_lower = str(col).lower().strip()
-            if any(keyword in col_lower for keyword in ['contact', 'phone', 'number', 'mobile']):
-                contact_columns.append(col)
-        
-        if not contact_columns and len(df.columns) < 1:
-            raise ValueError("No valid contact column found")
+        loader = RecipientLoader(file_path)
+        try:
+            if not next(loader.chunks(), None):
+                raise ValueError("Excel file has no valid contacts")
+        finally:
+            loader.close()
         
         return True, "Valid Excel file"
         
@@ -0,0 +1,335 @@
+"""
+Session workers: each browser runs in its own process, driven over a local socket.
+
+With session_isolation = 'process', create_transport() returns a WorkerProcessTransport.
+It forwards every transport call to a child process (this file run as a script) that owns
+the real transport, so a hung WebDriver call, a leaked Chrome or a memory blowup takes
+down one worker instead of the API server. The child starts its own process group, so
+killing it also kills chromedriver and Chrome. A worker that crashed or was killed is
+started again and logged back in on the next call.
+"""
+
+import os
+import sys
+import time
+import queue
+import pickle
+import signal
+import socket
+import atexit
+import logging
+import threading
+import subprocess
+from multiprocessing.connection import Connection
+from transport import BaseTransport, create_transport, resolve_chromedriver_path, process_tree_rss_mb
+from cancellation import Cancelled
+
+# Seconds between checks of the campaign's cancel token while a call is in flight
+POLL_INTERVAL = 0.1
+
+
+class WorkerError(RuntimeError):
+    """A worker crashed, hung or could not be started"""
+
+
+class Worker:
+    """A child process and the parent's end of its socket"""
+
+    def __init__(self, config):
+        parent_socket, child_socket = socket.socketpair()
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(child_socket.fileno())],
+                pass_fds=[child_socket.fileno()],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                start_new_session=True  # Own process group, so chromedriver and Chrome die with it
+            )
+        except Exception:
+            parent_socket.close()
+            raise
+        finally:
+            child_socket.close()
+        self.conn = Connection(parent_socket.detach())
+        self.profile_name = config.get('profile_name', 'Default')
+        self.started = time.time()
+        self.conn.send(('init', config))
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        """Kill the worker's whole process group, browser included"""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.process.wait()
+        self.conn.close()
+
+    def stop(self, timeout):
+        """Let the worker quit its browser, killing it if that takes longer than timeout"""
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        self.kill()
+
+
+class WorkerSupervisor:
+    """Tracks every live session worker so they can be reported on and killed at exit"""
+
+    def __init__(self):
+        self.transports = set()
+        self.lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def register(self, transport):
+        with self.lock:
+            self.transports.add(transport)
+
+    def unregister(self, transport):
+        with self.lock:
+            self.transports.discard(transport)
+
+    def get_status(self):
+        """One entry per worker, read without talking to it so busy workers answer instantly"""
+        with self.lock:
+            transports = list(self.transports)
+        status = []
+        for transport in transports:
+            worker = transport.worker
+            if worker is None:
+                continue
+            alive = worker.is_alive()
+            status.append({
+                'profile_name': worker.profile_name,
+                'pid': worker.pid,
+                'alive': alive,
+                'busy': transport.call_lock.locked(),
+                'memory_mb': round(transport.memory_usage_mb() or 0, 1) if alive else None,
+                'restarts': transport.restarts,
+                'uptime_seconds': round(time.time() - worker.started, 1)
+            })
+        return status
+
+    def shutdown(self):
+        """Kill every worker, e.g. when the API server exits"""
+        with self.lock:
+            transports = list(self.transports)
+            self.transports = set()
+        for transport in transports:
+            if transport.worker is not None:
+                transport.worker.kill()
+                transport.worker = None
+
+
+SUPERVISOR = WorkerSupervisor()
+
+
+class WorkerProcessTransport(BaseTransport):
+    """Runs the configured transport in a worker process and forwards calls to it"""
+
+    name = 'process'
+
+    def __init__(self, config, log=None):
+        super().__init__(config, log)
+        self.worker = None
+        self.started = False        # start() succeeded, so a dead worker should be brought back
+        self.sent_config = None
+        self.staged = None          # Attachment to stage again after a restart
+        self.stats = {}             # The worker's get_stats(), refreshed with every reply
+        self.restarts = 0
+        self.call_lock = threading.Lock()
+
+    def _spawn(self):
+        config = dict(self.config, session_isolation='thread')
+        if config.get('transport', 'selenium') == 'selenium':
+            config['chromedriver_path'] = resolve_chromedriver_path(config)  # Resolved once, not per worker
+        self.worker = Worker(config)
+        self.sent_config = self.config
+        SUPERVISOR.register(self)
+
+    def _request(self, method, *args):
+        """Send one call to the worker and wait for its result, relaying logs and cancellation"""
+        worker = self.worker
+        timeout = self.config.get('worker_call_timeout', 300)
+        config = self.config if self.config is not self.sent_config else None
+        try:
+            worker.conn.send(('call', method, args, self.cancel.cancelled, config))
+            self.sent_config = self.config
+            deadline = time.monotonic() + timeout
+            cancel_sent = False
+            while True:
+                if not worker.conn.poll(POLL_INTERVAL):
+                    if self.cancel.cancelled and not cancel_sent:
+                        worker.conn.send(('cancel',))
+                        cancel_sent = True
+                    if time.monotonic() > deadline:
+                        worker.kill()
+                        raise WorkerError(f"Session worker did not finish {method} within {timeout}s and was killed")
+                    continue
+                reply = worker.conn.recv()
+                if reply[0] == 'log':
+                    self.log(reply[1], reply[2])
+                elif reply[0] == 'result':
+                    self.stats = reply[2]
+                    return reply[1]
+                elif reply[0] == 'cancelled':
+                    raise Cancelled()
+                else:
+                    raise WorkerError(reply[1])
+        except (EOFError, OSError) as e:
+            worker.kill()
+            raise WorkerError(f"Session worker exited during {method} (exit code {worker.process.returncode})") from e
+
+    def _call(self, method, *args):
+        with self.call_lock:
+            if self.worker is None:
+                raise WorkerError("Session worker not started")
+            if self.started and not self.worker.is_alive():
+                self._restart()
+            return self._request(method, *args)
+
+    def _restart(self):
+        """Replace a dead worker with a new, logged-in one; caller holds call_lock"""
+        self.log(f"Session worker exited (exit code {self.worker.process.returncode}), restarting it", "error")
+        self.worker.kill()
+        self.restarts += 1
+        self._spawn()
+        if not (self._request('start') and self._request('login')):
+            raise WorkerError("Restarted session worker could not log in")
+        if self.staged is not None:
+            self._request('stage_attachment', self.staged)
+
+    def start(self):
+        """Start a worker process and the browser inside it"""
+        try:
+            with self.call_lock:
+                self._spawn()
+                self.started = self._request('start')
+        except Exception as e:
+            self.log(f"Failed to start session worker: {str(e)}", "error")
+            return False
+        return self.started
+
+    def login(self):
+        return self._call('login')
+
+    def open_chat(self, contact):
+        return self._call('open_chat', contact)
+
+    def send_text(self, message):
+        return self._call('send_text', message)
+
+    def stage_attachment(self, media):
+        self.staged = media
+        return self._call('stage_attachment', media)
+
+    def send_attachment(self, media, caption):
+        return self._call('send_attachment', media, caption)
+
+    def wait_for_delivery(self, timeout):
+        return self._call('wait_for_delivery', timeout)
+
+    def get_stats(self):
+        """The worker's counters as of its last reply, without waiting on a call in flight"""
+        return dict(self.stats, worker_pid=self.worker.pid if self.worker else None, worker_restarts=self.restarts)
+
+    def memory_usage_mb(self):
+        """Resident memory of the worker, chromedriver and Chrome together"""
+        if self.worker is None or not self.worker.is_alive():
+            return None
+        return process_tree_rss_mb(self.worker.pid)
+
+    def is_healthy(self):
+        if self.worker is None or not self.worker.is_alive():
+            return False
+        try:
+            with self.call_lock:
+                return self._request('is_healthy')
+        except Exception:
+            return False
+
+    def close(self):
+        """Ask the worker to quit its browser and exit, killing it if it doesn't"""
+        with self.call_lock:
+            worker, self.worker = self.worker, None
+            self.started = False
+            SUPERVISOR.unregister(self)
+            if worker is None:
+                return
+            if worker.is_alive():
+                try:
+                    worker.conn.send(('call', 'close', (), False, None))
+                except OSError:
+                    pass
+            worker.stop(self.config.get('worker_stop_timeout', 10))
+
+
+def _serve(conn):
+    """Worker side: run calls from the parent against a local transport until told to close"""
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    _, config = conn.recv()
+    transport = create_transport(config, lambda message, log_type="info": send(('log', message, log_type)))
+    calls = queue.Queue()
+
+    def read():
+        # Cancellation has to arrive while the main thread is busy inside a call
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                calls.put(None)  # Parent is gone
+                return
+            if message[0] == 'cancel':
+                transport.cancel.cancel()
+            else:
+                calls.put(message)
+
+    reader = threading.Thread(target=read)
+    reader.daemon = True
+    reader.start()
+
+    while True:
+        message = calls.get()
+        if message is None:
+            transport.close()
+            return
+        _, method, args, cancelled, new_config = message
+        if new_config is not None:
+            transport.config = dict(new_config, session_isolation='thread')
+        if cancelled:
+            transport.cancel.cancel()
+        else:
+            transport.cancel.event.clear()
+        try:
+            result = getattr(transport, method)(*args)
+            reply = ('result', result, transport.get_stats())
+        except Cancelled:
+            reply = ('cancelled',)
+        except Exception as e:
+            reply = ('error', f"{type(e).__name__}: {str(e)}")
+        if method == 'close':
+            return
+        try:
+            send(reply)
+        except (pickle.PicklingError, TypeError) as e:
+            send(('error', f"Unpicklable result from {method}: {str(e)}"))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - worker %(process)d - %(levelname)s - %(message)s')
+    _serve(Connection(int(sys.argv[1])))
+
+
+if __name__ == '__main__':
+    main()